@@ -0,0 +1,143 @@
+import time
+import uuid
+import threading
+from datetime import datetime, timezone
+
+from detector_backends import box_iou
+
+# --- CONFIG ---
+MATCH_IOU = 0.3        # a detection overlapping an open incident this much belongs to it
+CLOSE_AFTER = 10.0     # seconds without a hit before an incident is closed
+UPDATE_INTERVAL = 3.0  # minimum seconds between updates pushed for one incident
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+class Incident:
+    """One ongoing event: the same class seen in roughly the same place."""
+
+    def __init__(self, camera_id, cls, conf, bbox, now, track_id=None):
+        self.id = str(uuid.uuid4())  # also the id of the alert row
+        self.camera_id = camera_id
+        self.cls = cls
+        self.bbox = bbox
+        self.start = now
+        self.end = now
+        self.peak_conf = conf
+        self.last_conf = conf
+        self.hits = 1
+        self.track_id = track_id
+        self.last_pushed = None
+        self.closed = False
+
+    def hit(self, conf, bbox, now):
+        self.bbox = bbox
+        self.end = now
+        self.last_conf = conf
+        self.peak_conf = max(self.peak_conf, conf)
+        self.hits += 1
+
+    def to_data(self):
+        """Incident summary stored in the alert's ``data`` column."""
+        x1, y1, x2, y2 = self.bbox
+        data = {
+            "bbox": [x1, y1, x2 - x1, y2 - y1],
+            "conf": self.last_conf,
+            "incident": {
+                "start": _iso(self.start),
+                "end": _iso(self.end),
+                "peak_conf": self.peak_conf,
+                "hits": self.hits,
+                "open": not self.closed,
+            },
+        }
+        if self.track_id is not None:
+            data["track_id"] = self.track_id
+        return data
+
+
+class IncidentTracker:
+    """Turns a stream of per-frame detections into incidents.
+
+    Detections are grouped per (camera, class) and matched to open incidents
+    by IoU. :meth:`observe` and :meth:`expire` return ``(event, incident)``
+    pairs: ``"open"`` for a new incident, ``"update"`` when an open incident
+    has new hits (throttled to ``update_interval``) and ``"close"`` once it
+    has not been seen for ``close_after`` seconds. Callers create one alert on
+    ``"open"`` and update that same alert for the other events.
+    """
+
+    def __init__(self, match_iou=MATCH_IOU, close_after=CLOSE_AFTER,
+                 update_interval=UPDATE_INTERVAL):
+        self.match_iou = match_iou
+        self.close_after = close_after
+        self.update_interval = update_interval
+        self._open = {}  # (camera_id, cls) -> [Incident]
+        self._lock = threading.Lock()
+
+    def open_incidents(self, camera_id=None):
+        return [
+            inc for (cam, _), incidents in self._open.items()
+            for inc in incidents if camera_id is None or cam == camera_id
+        ]
+
+    def observe(self, camera_id, cls, conf, bbox, now=None, track_id=None):
+        """Record one ``[x1, y1, x2, y2]`` detection.
+
+        With a ``track_id`` the detection joins the incident carrying that
+        track before IoU matching is tried.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._observe(camera_id, cls, conf, bbox, now, track_id)
+
+    def _observe(self, camera_id, cls, conf, bbox, now, track_id):
+        incidents = self._open.setdefault((camera_id, cls), [])
+
+        best = None
+        if track_id is not None:
+            best = next((inc for inc in incidents if inc.track_id == track_id), None)
+        if best is None:
+            best_iou = self.match_iou
+            for inc in incidents:
+                iou = box_iou(inc.bbox, bbox)
+                if iou >= best_iou:
+                    best, best_iou = inc, iou
+
+        if best is None:
+            inc = Incident(camera_id, cls, conf, bbox, now, track_id)
+            inc.last_pushed = now
+            incidents.append(inc)
+            return [("open", inc)]
+
+        best.hit(conf, bbox, now)
+        if track_id is not None:
+            best.track_id = track_id
+        if now - best.last_pushed >= self.update_interval:
+            best.last_pushed = now
+            return [("update", best)]
+        return []
+
+    def expire(self, now=None):
+        """Close incidents that have not been seen for ``close_after`` seconds."""
+        now = time.time() if now is None else now
+        with self._lock:
+            return self._expire(now)
+
+    def _expire(self, now):
+        events = []
+        for key, incidents in list(self._open.items()):
+            still_open = []
+            for inc in incidents:
+                if now - inc.end >= self.close_after:
+                    inc.closed = True
+                    events.append(("close", inc))
+                else:
+                    still_open.append(inc)
+            if still_open:
+                self._open[key] = still_open
+            else:
+                del self._open[key]
+        return events
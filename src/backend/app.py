@@ -1,16 +1,25 @@
+import math
 import os
 import sys
 import uuid
+import time
+import threading
 import jwt
 import cv2
+from collections import OrderedDict, defaultdict
 from functools import wraps
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal, InvalidOperation
 
-from flask import Flask, request, jsonify, Response
+from flask import Flask, request, jsonify, Response, g, has_request_context, url_for
 from flask_cors import CORS
-from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_migrate import Migrate, upgrade
+from sqlalchemy import (DateTime, and_, case, delete, event, func, insert, inspect, literal,
+                        select, text, update)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.sql import Select
 
 try:
     from yolo_webcam import run_ai_on_frame
@@ -19,6 +28,24 @@ except ImportError:
 
 sys.path.append(os.path.dirname(__file__))
 
+from frame_transport import VisionPipeline
+from streaming import DEFAULT_MAX_FPS, FrameHub, multipart, stream_tier, throttle
+from thumbnails import REFRESH_INTERVAL, ThumbnailCache, ThumbnailRefresher
+from events import EventBroker
+from jobs import JobQueue, PeriodicJob, QueueFull
+from regions import DetectionConfig
+from models import (Alert, Camera, InventoryArchive, InventoryItem, InventoryStock, MachineEvent,
+                    MachineRollupCursor, MachineStateRollup, Order, OrderArchive, OrderItem,
+                    OrderItemArchive, Product, ProductionLine, ProductionRun, RecipeItem,
+                    StockReservation, User, Warehouse, db, Columns, iso, iso_or_text, number,
+                    or_default, or_empty, line_to_dict, recipe_item_to_dict, run_to_dict)
+from mrp import CycleError, gross_requirements, net_requirements
+from oee import (BUCKET, DOWN, IDLE, RUNNING, bucket_seconds, ceil_bucket, downtime_pareto,
+                 floor_bucket, line_metrics, state_intervals)
+from scheduling import MAINTENANCE_HOURS, Job, Line, line_summary, schedule
+from retention import (PARTITION_MONTHS_AHEAD, add_months, append_cold_rows, month_start,
+                       naive_utc, partition_ddl, partition_month, read_cold_rows)
+
 app = Flask(__name__)
 CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}}, supports_credentials=True)
 
@@ -36,13 +63,9 @@ app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "dev-secret-do-not-use")
 app.config["JWT_EXPIRATION_HOURS"] = 24
 
-db = SQLAlchemy(app)
+db.init_app(app)
 migrate = Migrate(app, db)
 
-if os.getenv("FLASK_ENV") != "testing":
-    with app.app_context():
-        upgrade()
-
 bcrypt = Bcrypt(app)
 
 UTC = timezone.utc
@@ -54,172 +77,402 @@ def create_access_token(identity):
     }
     return jwt.encode(payload, app.config["SECRET_KEY"], algorithm="HS256")
 
-class User(db.Model):
-    __tablename__ = "users"
-    id = db.Column(db.String(36), primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    password_hash = db.Column(db.String(255), nullable=False)
-    role = db.Column(db.String(20), nullable=False)
-    name = db.Column(db.String(100), nullable=False)
-    email = db.Column(db.String(120))
-    is_active = db.Column(db.Boolean, default=True)
-
-class Warehouse(db.Model):
-    __tablename__ = "warehouses"
-    id = db.Column(db.String(36), primary_key=True)
-    name = db.Column(db.String(100))
-    type = db.Column(db.String(50))
-
-class Product(db.Model):
-    __tablename__ = "products"
-    id = db.Column(db.String(36), primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
-    sku = db.Column(db.String(50), unique=True, nullable=False)
-    description = db.Column(db.Text)
-    category = db.Column(db.String(100))
-    price = db.Column(db.Numeric(10, 2))
-    cost = db.Column(db.Numeric(10, 2))
-
-class InventoryItem(db.Model):
-    __tablename__ = "inventory_items"
-    id = db.Column(db.String(36), primary_key=True)
-    product_id = db.Column(db.String(36), db.ForeignKey("products.id"), nullable=False)
-    warehouse_id = db.Column(db.String(36), db.ForeignKey("warehouses.id"), nullable=False)
-    quantity = db.Column(db.Integer, default=0)
-    min_stock = db.Column(db.Integer, default=0)
-    reorder_point = db.Column(db.Integer, default=0)
-    location = db.Column(db.String(100))
-    expiry_date = db.Column(db.Date)
-
-class InventoryArchive(db.Model):
-    __tablename__ = "inventory_archive"
-    id = db.Column(db.String(36), primary_key=True)
-    item_id = db.Column(db.String(36), nullable=False)
-    sku = db.Column(db.String(50))
-    field = db.Column(db.String(50))
-    old_value = db.Column(db.String(255))
-    new_value = db.Column(db.String(255))
-    edited_by = db.Column(db.String(80))
-    timestamp = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
-
-class Order(db.Model):
-    __tablename__ = "orders"
-    id = db.Column(db.String(36), primary_key=True)
-    order_number = db.Column(db.String(50))
-    customer_name = db.Column(db.String(200))
-    customer_email = db.Column(db.String(120))
-    total_amount = db.Column(db.Numeric(10, 2))
-    status = db.Column(db.String(20))
-    payment_status = db.Column(db.String(20))
-    created_by = db.Column(db.String(36))
-    order_date = db.Column(db.DateTime)
-    delivery_date = db.Column(db.Date)
-
-class OrderItem(db.Model):
-    __tablename__ = "order_items"
-    id = db.Column(db.String(36), primary_key=True)
-    order_id = db.Column(db.String(36), db.ForeignKey("orders.id"), nullable=False)
-    product_id = db.Column(db.String(36), db.ForeignKey("products.id"), nullable=False)
-    quantity = db.Column(db.Integer, nullable=False)
-    unit_price = db.Column(db.Numeric(10, 2), nullable=False)
-    total_price = db.Column(db.Numeric(10, 2), nullable=False)
-
-class OrderArchive(db.Model):
-    __tablename__ = "order_archive"
-    id = db.Column(db.String(36), primary_key=True)
-    order_id = db.Column(db.String(36), nullable=False)
-    customer_name = db.Column(db.String(200))
-    customer_email = db.Column(db.String(120))
-    action = db.Column(db.String(50), nullable=False)
-    performed_by = db.Column(db.String(80), nullable=False)
-    timestamp = db.Column(db.DateTime, default=lambda: datetime.now(UTC))
-    total_amount = db.Column(db.Numeric(10, 2))
-
-class OrderItemArchive(db.Model):
-    __tablename__ = "order_items_archive"
-    id = db.Column(db.String(36), primary_key=True)
-    order_archive_id = db.Column(db.String(36), db.ForeignKey("order_archive.id"), nullable=False)
-    product_id = db.Column(db.String(36))
-    quantity = db.Column(db.Integer)
-    unit_price = db.Column(db.Numeric(10, 2))
-    total_price = db.Column(db.Numeric(10, 2))
-
-# Production data
-
-class ProductionLine(db.Model):
-        __tablename__ = "production_lines"
-        id = db.Column(db.String(36), primary_key=True)   
-        name = db.Column(db.String(100), nullable=False)
-        product_id = db.Column(db.String(36), db.ForeignKey("products.id"), nullable=True)
-        status = db.Column(db.String(20), nullable=False) 
-        capacity_per_hour = db.Column(db.Integer, default=0)
-        location = db.Column(db.String(100))
-        last_maintenance = db.Column(db.DateTime)
-        next_maintenance = db.Column(db.DateTime)
-
-class ProductionRun(db.Model):
-    __tablename__ = "production_runs"
-
-    id = db.Column(db.String(36), primary_key=True)
-    run_number = db.Column(db.String(50))
-    product_id = db.Column(db.String(36), db.ForeignKey("products.id"), nullable=False)
-    production_line_id = db.Column(db.String(36), db.ForeignKey("production_lines.id"))
-    quantity = db.Column(db.Integer, nullable=False)
-    status = db.Column(db.String(20), nullable=False)
-    machine_stopped = db.Column(db.Boolean, default=False)
-    stop_reason = db.Column(db.Text)
-    start_date = db.Column(db.DateTime)
-    completion_date = db.Column(db.DateTime)
-    assigned_to = db.Column(db.String(100))
-    created_by = db.Column(db.String(36), nullable=False)
-  
-class RecipeItem(db.Model):
-    __tablename__ = "recipe_items"
-    id = db.Column(db.String(36), primary_key=True)
-    product_id = db.Column(db.String(36), db.ForeignKey("products.id"), nullable=False)
-    ingredient_id = db.Column(db.String(36), nullable=False)
-    quantity = db.Column(db.Numeric(10, 2), nullable=False)
-    unit = db.Column(db.String(20))
+# ============================================================================
+# INVENTORY CHANGE LOG
+# ============================================================================
+# Inventory changes are collected from SQLAlchemy attribute history at flush
+# time and written to inventory_archive in one executemany when the
+# transaction commits, so endpoints only change the objects.
+
+AUDITED_FIELDS = {
+    InventoryItem: ("quantity", "min_stock", "reorder_point", "location", "expiry_date", "warehouse_id"),
+    Product: ("price",),
+}
+
+def audit_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)[:255]
+
+def audit_changed(old, new):
+    if old is not None and new is not None:
+        try:
+            return Decimal(str(old)) != Decimal(str(new))  # 5 == "5" == 5.00
+        except InvalidOperation:
+            pass
+    return audit_value(old) != audit_value(new)
+
+def audit_user():
+    if has_request_context() and "current_user" in g:
+        return g.current_user.username
+    return "system"
+
+def log_inventory_change(item_id, product_id, field, old_value, new_value, session=None):
+    """Queue a change-log record; it is written with the rest at commit."""
+    session = session or db.session
+    session.info.setdefault("inventory_changes", []).append({
+        "item_id": item_id,
+        "product_id": product_id,
+        "field": field,
+        "old_value": audit_value(old_value),
+        "new_value": audit_value(new_value),
+    })
 
-    
+@event.listens_for(db.session, "before_flush")
+def collect_inventory_changes(session, flush_context, instances):
+    for obj in session.new:
+        if isinstance(obj, InventoryItem):
+            log_inventory_change(obj.id, obj.product_id, "created", None, obj.quantity, session)
+
+    for obj in session.dirty:
+        fields = AUDITED_FIELDS.get(type(obj))
+        if not fields:
+            continue
+        state = inspect(obj)
+        for field in fields:
+            history = state.attrs[field].history
+            if not history.added and not history.deleted:
+                continue
+            old = history.deleted[0] if history.deleted else None
+            new = history.added[0] if history.added else None
+            if audit_changed(old, new):
+                if isinstance(obj, Product):
+                    log_inventory_change(obj.id, obj.id, field, old, new, session)
+                else:
+                    log_inventory_change(obj.id, obj.product_id, field, old, new, session)
+
+    for obj in session.deleted:
+        if isinstance(obj, InventoryItem):
+            log_inventory_change(obj.id, obj.product_id, "deleted", obj.quantity, None, session)
+
+@event.listens_for(db.session, "before_commit")
+def write_inventory_changes(session):
+    session.flush()
+    changes = session.info.pop("inventory_changes", None)
+    if not changes:
+        return
+    skus = dict(session.execute(
+        select(Product.id, Product.sku).where(Product.id.in_({c["product_id"] for c in changes}))
+    ).all())
+    edited_by = audit_user()
+    now = datetime.now(UTC)
+    session.execute(insert(InventoryArchive), [
+        {
+            "id": str(uuid.uuid4()),
+            "item_id": c["item_id"],
+            "sku": skus.get(c["product_id"]),
+            "field": c["field"],
+            "old_value": c["old_value"],
+            "new_value": c["new_value"],
+            "edited_by": edited_by,
+            "timestamp": now,
+        }
+        for c in changes
+    ])
+
+@event.listens_for(db.session, "after_rollback")
+def discard_inventory_changes(session):
+    session.info.pop("inventory_changes", None)
+
+
+# ============================================================================
+# PRODUCTION EVENTS
+# ============================================================================
+# Run and line state changes are picked up from attribute history at flush
+# time, like the change log above, and published once the transaction
+# commits to the "line:<id>" topic of the line involved. Clients follow them
+# on /api/production/events.
 
+production_events = EventBroker()
 
-# Alerts data
-class Alert(db.Model):
-    __tablename__ = "alerts"
-
-    id = db.Column(db.String(36), primary_key=True)
-    type = db.Column(db.String(50), nullable=False)
-    severity = db.Column(db.String(20), nullable=False)
-    title = db.Column(db.String(200))
-    description = db.Column(db.Text, nullable=False)
-    camera_id = db.Column(db.String(36), nullable=False)
-    production_run_id = db.Column(db.String(36))
-    inventory_item_id = db.Column(db.String(36))
-    status = db.Column(db.String(20), default="new")
-    ai_confidence = db.Column(db.Numeric(5, 2))
-    data = db.Column(db.JSON)
-    acknowledged_by = db.Column(db.String(36))
-    acknowledged_at = db.Column(db.DateTime)
-    resolved_by = db.Column(db.String(36))
-    resolved_at = db.Column(db.DateTime)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-
-# Camera feeds data
-class Camera(db.Model):
-    __tablename__ = "cameras"
-
-    id = db.Column(db.String(36), primary_key=True)
-    name = db.Column(db.String(100))
-    location = db.Column(db.String(200))
-    ip_address = db.Column(db.String(45))
-    port = db.Column(db.Integer)
-    status = db.Column(db.String(20))
-    ai_enabled = db.Column(db.Boolean)
-    ai_model = db.Column(db.String(100))
-    last_active = db.Column(db.DateTime)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+RUN_EVENT_FIELDS = ("status", "machine_stopped", "stop_reason", "production_line_id", "start_date")
+LINE_EVENT_FIELDS = ("status", "product_id", "capacity_per_hour", "next_maintenance")
+UNASSIGNED_TOPIC = "line:unassigned"
+
+def line_topic(line_id):
+    return f"line:{line_id}" if line_id else UNASSIGNED_TOPIC
+
+def run_state(run):
+    """Event payload for a run; ``run`` is a model or a row with the same names."""
+    return {
+        "id": run.id,
+        "runNumber": run.run_number,
+        "productionLineId": run.production_line_id,
+        "status": run.status,
+        "machineStopped": bool(run.machine_stopped),
+        "stopReason": run.stop_reason,
+        "startDate": run.start_date.isoformat() if run.start_date else None,
+    }
+
+def line_state(line):
+    return {
+        "id": line.id,
+        "status": line.status,
+        "productId": line.product_id,
+        "capacityPerHour": line.capacity_per_hour,
+        "nextMaintenance": line.next_maintenance.isoformat() if line.next_maintenance else None,
+    }
+
+def queue_production_event(topics, name, key, data, session=None):
+    """Queue an event for commit; a later change to the same object replaces it."""
+    session = session or db.session
+    queued = session.info.setdefault("production_events", {})
+    if key in queued:
+        topics = queued[key][0] + topics
+    queued[key] = (topics, name, data)
+
+def publish_runs(run_ids):
+    """Publish the current state of runs changed outside the ORM (bulk updates)."""
+    for run in db.session.execute(
+        select(ProductionRun.id, ProductionRun.run_number, ProductionRun.production_line_id,
+               ProductionRun.status, ProductionRun.machine_stopped, ProductionRun.stop_reason,
+               ProductionRun.start_date)
+        .where(ProductionRun.id.in_(run_ids))
+    ):
+        production_events.publish(line_topic(run.production_line_id), "run", run_state(run))
+
+def changed_fields(obj, fields):
+    state = inspect(obj)
+    changed = {}
+    for field in fields:
+        history = state.attrs[field].history
+        if history.added or history.deleted:
+            changed[field] = history.deleted[0] if history.deleted else None
+    return changed
+
+@event.listens_for(db.session, "before_flush")
+def collect_production_events(session, flush_context, instances):
+    for obj in session.new:
+        if isinstance(obj, ProductionRun):
+            queue_production_event([line_topic(obj.production_line_id)], "run",
+                                   ("run", obj.id), run_state(obj), session)
+        elif isinstance(obj, ProductionLine):
+            queue_production_event([line_topic(obj.id)], "line", ("line", obj.id), line_state(obj), session)
+
+    for obj in session.dirty:
+        if isinstance(obj, ProductionRun):
+            changed = changed_fields(obj, RUN_EVENT_FIELDS)
+            if not changed:
+                continue
+            topics = [line_topic(obj.production_line_id)]
+            if "production_line_id" in changed:
+                topics.append(line_topic(changed["production_line_id"]))  # moved off that line
+            queue_production_event(topics, "run", ("run", obj.id), run_state(obj), session)
+        elif isinstance(obj, ProductionLine) and changed_fields(obj, LINE_EVENT_FIELDS):
+            queue_production_event([line_topic(obj.id)], "line", ("line", obj.id), line_state(obj), session)
+
+@event.listens_for(db.session, "after_commit")
+def publish_production_events(session):
+    for topics, name, data in session.info.pop("production_events", {}).values():
+        for topic in dict.fromkeys(topics):
+            production_events.publish(topic, name, data)
+
+@event.listens_for(db.session, "after_rollback")
+def discard_production_events(session):
+    session.info.pop("production_events", None)
+
+
+# ============================================================================
+# MACHINE STATE LOG
+# ============================================================================
+# Every change to a run's machine state is appended to machine_events as the
+# state of its line from then on, whichever endpoint made it. OEE and
+# downtime analytics are built on this log (see the production section).
+
+MACHINE_EVENT_FIELDS = ("status", "machine_stopped", "stop_reason", "production_line_id")
+
+def machine_state(status, machine_stopped, stop_reason):
+    """``(state, reason)`` of a line running a run in this state."""
+    if status in RUN_STARTED_STATUSES and not machine_stopped:
+        return RUNNING, ""
+    if status in RUN_STARTED_STATUSES or status == "stopped":
+        return DOWN, (stop_reason or "")[:255]
+    return IDLE, ""
+
+@event.listens_for(db.session, "before_flush")
+def log_machine_events(session, flush_context, instances):
+    now = naive_utc(datetime.now(UTC))
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, ProductionRun):
+            continue
+        if obj in session.new:
+            changed = {"status": None, "machine_stopped": False, "stop_reason": None, "production_line_id": None}
+        else:
+            changed = changed_fields(obj, MACHINE_EVENT_FIELDS)
+            if not changed:
+                continue
+        old = {field: changed.get(field, getattr(obj, field)) for field in MACHINE_EVENT_FIELDS}
+        was = machine_state(old["status"], old["machine_stopped"], old["stop_reason"])
+        state, reason = machine_state(obj.status, obj.machine_stopped, obj.stop_reason)
+        units = (obj.quantity or 0) if obj.status == "completed" and old["status"] != "completed" else 0
+        moved = old["production_line_id"] != obj.production_line_id
+
+        if moved and old["production_line_id"] and was[0] != IDLE:
+            session.add(MachineEvent(id=str(uuid.uuid4()), line_id=old["production_line_id"], run_id=obj.id,
+                                     state=IDLE, reason="", run_status=obj.status, units=0, at=now))
+        if (state, reason) != was or units or (moved and state != IDLE):
+            session.add(MachineEvent(id=str(uuid.uuid4()), line_id=obj.production_line_id, run_id=obj.id,
+                                     state=state, reason=reason, run_status=obj.status, units=units, at=now))
+
+
+# ============================================================================
+# RETENTION
+# ============================================================================
+# Audit and alert tables are range-partitioned by month on Postgres (plain
+# tables elsewhere). Rows older than their retention period are appended to
+# gzip NDJSON files under COLD_STORAGE_DIR, one per table and month, and then
+# deleted; emptied monthly partitions are dropped.
+
+ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", 365))
+ALERT_RETENTION_DAYS = int(os.getenv("ALERT_RETENTION_DAYS", 90))
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", 24 * 3600))
+RETENTION_CHUNK = 5000
+
+PARTITIONED_TABLES = {
+    # table: time column it is partitioned on
+    "inventory_archive": "timestamp",
+    "order_archive": "timestamp",
+    "order_items_archive": "archived_at",
+    "alerts": "created_at",
+}
+
+_retention_job = None
+_retention_lock = threading.Lock()
+
+def is_postgres():
+    return db.engine.dialect.name == "postgresql"
+
+def ensure_partitions(today=None):
+    """Create this month's and the next PARTITION_MONTHS_AHEAD monthly partitions."""
+    if not is_postgres():
+        return
+    month = month_start(today or datetime.now(UTC))
+    for table in PARTITIONED_TABLES:
+        for n in range(PARTITION_MONTHS_AHEAD + 1):
+            db.session.execute(text(partition_ddl(table, add_months(month, n))))
+    db.session.commit()
+
+def drop_old_partitions(table, cutoff):
+    """Drop empty monthly partitions of ``table`` that end on or before ``cutoff``."""
+    if not is_postgres():
+        return []
+    names = db.session.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table"
+    ), {"table": table}).scalars()
+    dropped = []
+    for name in names:
+        month = partition_month(table, name)
+        if not month or add_months(month, 1) > cutoff.date():
+            continue
+        if db.session.execute(text(f"SELECT 1 FROM {name} LIMIT 1")).first() is None:
+            db.session.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+    db.session.commit()
+    return dropped
+
+def compact_rows(model, column, *conditions, chunk_size=RETENTION_CHUNK):
+    """Move rows matching ``conditions`` to cold storage, ``chunk_size`` per transaction.
+
+    ``column`` is the table's time column, which picks the monthly file.
+    """
+    table = model.__table__
+    time_col = table.c[column]
+    moved = 0
+    while True:
+        rows = db.session.execute(
+            select(table).where(*conditions).order_by(time_col, table.c.id).limit(chunk_size)
+        ).mappings().all()
+        if not rows:
+            return moved
+        append_cold_rows(table.name, rows, column)
+        db.session.execute(delete(table).where(table.c.id.in_([row["id"] for row in rows])))
+        db.session.commit()
+        moved += len(rows)
+
+def run_retention(now=None):
+    """Compact every audit/alert table; returns rows moved per table."""
+    now = naive_utc(now or datetime.now(UTC))
+    archive_cutoff = now - timedelta(days=ARCHIVE_RETENTION_DAYS)
+    alert_cutoff = now - timedelta(days=ALERT_RETENTION_DAYS)
+
+    ensure_partitions(now)
+    old_orders = select(OrderArchive.id).where(OrderArchive.timestamp < archive_cutoff)
+    moved = {
+        "inventory_archive": compact_rows(
+            InventoryArchive, "timestamp", InventoryArchive.timestamp < archive_cutoff),
+        # items go with their order archive row, and before it since they reference it
+        "order_items_archive": compact_rows(
+            OrderItemArchive, "archived_at", OrderItemArchive.order_archive_id.in_(old_orders)),
+        "order_archive": compact_rows(
+            OrderArchive, "timestamp", OrderArchive.timestamp < archive_cutoff),
+        # open alerts stay hot however old they are
+        "alerts": compact_rows(
+            Alert, "created_at", Alert.created_at < alert_cutoff, Alert.status == "resolved"),
+    }
+    for table in ("inventory_archive", "order_items_archive", "order_archive"):
+        drop_old_partitions(table, archive_cutoff)
+    drop_old_partitions("alerts", alert_cutoff)
+    return moved
+
+def run_retention_job():
+    with app.app_context():
+        print("Retention:", run_retention())
+
+def start_retention_job():
+    global _retention_job
+    if os.getenv("FLASK_ENV") == "testing":
+        return
+    with _retention_lock:
+        if _retention_job is None:
+            _retention_job = PeriodicJob("retention", run_retention_job, RETENTION_INTERVAL).start()
+
+@app.cli.command("compact-archives")
+def compact_archives_command():
+    print(run_retention())
+
+def history_rows(model, column, columns):
+    """``columns`` rows of an append-only table, newest first, for ``since``/``until``/``limit``.
+
+    With ``include_cold=1`` matching rows from cold storage are merged in;
+    ``columns`` must then include ``id`` and ``column``. Raises ``ValueError`` for
+    malformed dates.
+    """
+    since = parse_date_arg("since")
+    until = parse_date_arg("until")
+    since = datetime.combine(since, datetime.min.time()) if since else None
+    until = datetime.combine(until + timedelta(days=1), datetime.min.time()) if until else None
+    limit = request.args.get("limit", type=int)
+
+    time_col = model.__table__.c[column]
+    query = columns.select().order_by(time_col.desc())
+    if since:
+        query = query.where(time_col >= since)
+    if until:
+        query = query.where(time_col < until)
+    if limit:
+        query = query.limit(limit)
+    rows = db.session.execute(query).all()
+
+    if flag_arg("include_cold"):
+        # A compaction that stopped between writing the file and deleting the
+        # rows leaves them in both places (and a rerun writes them again), so
+        # cold rows whose id was already seen are skipped.
+        id_at = columns.names.index("id")
+        seen = {row[id_at] for row in rows}
+        for row in map(columns.from_mapping, read_cold_rows(model.__tablename__, column, since, until)):
+            if row[id_at] not in seen:
+                seen.add(row[id_at])
+                rows.append(row)
+        at = columns.names.index(column)
+        rows.sort(key=lambda row: naive_utc(row[at]) or datetime.min, reverse=True)
+        if limit:
+            rows = rows[:limit]
+    return rows
 
 
 # ============================================================================
@@ -230,6 +483,8 @@ def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         token = request.headers.get('Authorization')
+        if not token and request.accept_mimetypes.best == 'text/event-stream':
+            token = request.args.get('access_token')  # EventSource cannot send headers
 
         if not token:
             return jsonify({'message': 'Token is missing'}), 401
@@ -242,6 +497,7 @@ def token_required(f):
 
             if not current_user or not current_user.is_active:
                 return jsonify({'message': 'User not found or inactive'}), 401
+            g.current_user = current_user
 
         except jwt.ExpiredSignatureError:
             return jsonify({'message': 'Token expired'}), 401
@@ -302,31 +558,498 @@ def login():
 
 
 
+INVENTORY_PAGE_SIZE = 100
+MAX_INVENTORY_PAGE_SIZE = 1000
+
+def adjust_stock(product_id, warehouse_id, quantity=0, items=0):
+    """Add ``quantity`` units and ``items`` rows to a product's stock summary in a warehouse."""
+    if not quantity and not items:
+        return
+    stmt = (
+        update(InventoryStock)
+        .where(InventoryStock.product_id == product_id,
+               InventoryStock.warehouse_id == warehouse_id)
+        .values(quantity=InventoryStock.quantity + quantity,
+                item_count=InventoryStock.item_count + items,
+                updated_at=datetime.now(UTC))
+    )
+    if db.session.execute(stmt).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(InventoryStock(
+                product_id=product_id,
+                warehouse_id=warehouse_id,
+                quantity=quantity,
+                item_count=items,
+            ))
+    except IntegrityError:
+        db.session.execute(stmt)  # a concurrent write created the row first
+
+def unreserved_stock(product_id, warehouse_id):
+    """Units of a product in a warehouse not held for orders or runs (None if untracked)."""
+    stock = db.session.get(InventoryStock, (product_id, warehouse_id))
+    return stock.quantity - stock.reserved if stock else None
+
+def release_stock(product_id, warehouse_id, quantity, items=0):
+    """Remove ``quantity`` units unless that would eat into reserved stock; False if it would.
+
+    The check and the decrement are one conditional UPDATE, so two edits
+    cannot both pass a stale availability read.
+    """
+    result = db.session.execute(
+        update(InventoryStock)
+        .where(InventoryStock.product_id == product_id,
+               InventoryStock.warehouse_id == warehouse_id,
+               InventoryStock.quantity - InventoryStock.reserved >= quantity)
+        .values(quantity=InventoryStock.quantity - quantity,
+                item_count=InventoryStock.item_count + items,
+                updated_at=datetime.now(UTC)),
+        execution_options={"synchronize_session": False},
+    )
+    if result.rowcount:
+        return True
+    if unreserved_stock(product_id, warehouse_id) is not None:
+        return False
+    adjust_stock(product_id, warehouse_id, -quantity, items)  # untracked until the next rebuild
+    return True
+
+def rebuild_inventory_stock():
+    """Recompute inventory_stock from inventory_items in one statement."""
+    db.session.execute(delete(InventoryStock))
+    db.session.execute(insert(InventoryStock).from_select(
+        ["product_id", "warehouse_id", "quantity", "item_count", "updated_at"],
+        select(
+            InventoryItem.product_id,
+            InventoryItem.warehouse_id,
+            func.coalesce(func.sum(InventoryItem.quantity), 0),
+            func.count(),
+            func.current_timestamp(),
+        ).group_by(InventoryItem.product_id, InventoryItem.warehouse_id),
+    ))
+    db.session.commit()
+
+@app.cli.command("rebuild-inventory-stock")
+def rebuild_inventory_stock_command():
+    rebuild_inventory_stock()
+    print("inventory_stock rebuilt")
+
+# ----------------------------------------------------------------------------
+# Stock alerts: one open "inventory" alert per item below min_stock or at its
+# reorder point, opened and closed as quantities change.
+# ----------------------------------------------------------------------------
+
+OPEN_ALERT_STATUSES = ("new", "acknowledged")
+STOCK_SWEEP_CHUNK = 1000
+
+STOCK_ALERT_LEVELS = {
+    # level: (severity, title)
+    "low_stock": ("high", "Low stock"),
+    "reorder": ("medium", "Reorder point reached"),
+}
+
+stock_level = case(
+    (InventoryItem.quantity < InventoryItem.min_stock, "low_stock"),
+    (and_(InventoryItem.reorder_point > 0, InventoryItem.quantity <= InventoryItem.reorder_point), "reorder"),
+    else_=None,
+)
+
+def stock_level_rows(*conditions, limit=None):
+    query = (
+        select(
+            InventoryItem.id,
+            InventoryItem.quantity,
+            InventoryItem.min_stock,
+            InventoryItem.reorder_point,
+            Product.sku,
+            Warehouse.type.label("warehouse"),
+            stock_level.label("level"),
+        )
+        .join(Product, InventoryItem.product_id == Product.id)
+        .join(Warehouse, InventoryItem.warehouse_id == Warehouse.id)
+        .where(*conditions)
+        .order_by(InventoryItem.id)
+    )
+    if limit:
+        query = query.limit(limit)
+    return db.session.execute(query).all()
+
+def stock_alert_fields(row):
+    severity, title = STOCK_ALERT_LEVELS[row.level]
+    return {
+        "severity": severity,
+        "title": f"{title}: {row.sku}",
+        "description": (f"{row.sku} in {row.warehouse} has {row.quantity} units "
+                        f"(min {row.min_stock}, reorder point {row.reorder_point})"),
+        "data": {
+            "level": row.level,
+            "quantity": row.quantity,
+            "min_stock": row.min_stock,
+            "reorder_point": row.reorder_point,
+            "warehouse": row.warehouse,
+        },
+    }
+
+def apply_stock_levels(item_ids, rows):
+    """Open, update or close alerts so they match ``rows`` for ``item_ids``.
+
+    Items in ``item_ids`` without a row (deleted) or with no level are closed.
+    Returns ``{"opened", "updated", "closed"}`` counts.
+    """
+    rows = {row.id: row for row in rows}
+    open_alerts = {
+        alert.inventory_item_id: alert
+        for alert in Alert.query.filter(
+            Alert.type == "inventory",
+            Alert.status.in_(OPEN_ALERT_STATUSES),
+            Alert.inventory_item_id.in_(item_ids),
+        )
+    }
+    now = datetime.now(UTC)
+    opened, updated, closed = [], 0, []
+    for item_id in item_ids:
+        row, alert = rows.get(item_id), open_alerts.get(item_id)
+        level = row.level if row else None
+        if level is None:
+            if alert:
+                closed.append(alert.id)
+        elif alert is None:
+            opened.append(dict(stock_alert_fields(row), id=str(uuid.uuid4()), type="inventory",
+                               inventory_item_id=item_id, status="new", created_at=now))
+        else:
+            fields = stock_alert_fields(row)
+            if alert.data != fields["data"]:
+                for field, value in fields.items():
+                    setattr(alert, field, value)
+                updated += 1
+
+    if opened:
+        db.session.execute(insert(Alert), opened)
+    if closed:
+        db.session.execute(
+            update(Alert).where(Alert.id.in_(closed)).values(status="resolved", resolved_at=now)
+        )
+    return {"opened": len(opened), "updated": updated, "closed": len(closed)}
+
+def evaluate_stock_alerts(*item_ids):
+    """Re-check the given items after a quantity change; call before commit."""
+    item_ids = list(dict.fromkeys(i for i in item_ids if i))
+    if not item_ids:
+        return None
+    return apply_stock_levels(item_ids, stock_level_rows(InventoryItem.id.in_(item_ids)))
+
+def sweep_stock_alerts(chunk_size=STOCK_SWEEP_CHUNK):
+    """Reconcile every item's alert, ``chunk_size`` items per transaction."""
+    totals = {"opened": 0, "updated": 0, "closed": 0}
+    last_id = ""
+    while True:
+        rows = stock_level_rows(InventoryItem.id > last_id, limit=chunk_size)
+        if not rows:
+            break
+        last_id = rows[-1].id
+        for key, value in apply_stock_levels([row.id for row in rows], rows).items():
+            totals[key] += value
+        db.session.commit()
+
+    # alerts for items that no longer exist
+    result = db.session.execute(
+        update(Alert)
+        .where(
+            Alert.type == "inventory",
+            Alert.status.in_(OPEN_ALERT_STATUSES),
+            Alert.inventory_item_id.isnot(None),
+            Alert.inventory_item_id.not_in(select(InventoryItem.id)),
+        )
+        .values(status="resolved", resolved_at=datetime.now(UTC))
+    )
+    totals["closed"] += result.rowcount
+    db.session.commit()
+    return totals
+
+@app.cli.command("sweep-stock-alerts")
+def sweep_stock_alerts_command():
+    print(sweep_stock_alerts())
+
+# ----------------------------------------------------------------------------
+# Expiry scanner: one "inventory" alert per warehouse summarising stock that
+# has expired or expires within EXPIRY_HORIZONS_DAYS.
+# ----------------------------------------------------------------------------
+
+EXPIRY_HORIZONS_DAYS = sorted(int(d) for d in os.getenv("EXPIRY_HORIZONS_DAYS", "7,30").split(","))
+EXPIRY_SCAN_INTERVAL = float(os.getenv("EXPIRY_SCAN_INTERVAL", 3600))
+EXPIRY_ALERT_ITEMS = 50  # items listed in an alert's data, soonest first
+
+_expiry_scanner = None
+_expiry_lock = threading.Lock()
+
+def expiry_bucket(expiry_date, today):
+    if expiry_date < today:
+        return "expired"
+    for days in EXPIRY_HORIZONS_DAYS:
+        if expiry_date <= today + timedelta(days=days):
+            return f"{days}d"
+    return None
+
+def expiry_label(bucket):
+    return "expired" if bucket == "expired" else f"within {bucket[:-1]} days"
+
+def expiry_severity(buckets):
+    if buckets.get("expired"):
+        return "critical"
+    if buckets.get(f"{EXPIRY_HORIZONS_DAYS[0]}d"):
+        return "high"
+    return "medium"
+
+def expiring_items_query(before):
+    """Stocked items expiring before ``before``, soonest first (range scan on expiry_date)."""
+    return (
+        db.session.query(InventoryItem, Product, Warehouse)
+        .join(Product, InventoryItem.product_id == Product.id)
+        .join(Warehouse, InventoryItem.warehouse_id == Warehouse.id)
+        .filter(InventoryItem.expiry_date < before, InventoryItem.quantity > 0)
+        .order_by(InventoryItem.expiry_date, InventoryItem.id)
+    )
+
+def scan_expiring_inventory(today=None):
+    """Open, update or close the per-warehouse expiry alerts; returns the counts."""
+    today = today or datetime.now(UTC).date()
+    before = today + timedelta(days=EXPIRY_HORIZONS_DAYS[-1] + 1)
+
+    warehouses = {}
+    for item, product, warehouse in expiring_items_query(before):
+        entry = warehouses.setdefault(warehouse.id, {
+            "kind": "expiry",
+            "warehouse_id": warehouse.id,
+            "warehouse": warehouse.type,
+            "buckets": {},
+            "items": [],
+        })
+        bucket = expiry_bucket(item.expiry_date, today)
+        entry["buckets"][bucket] = entry["buckets"].get(bucket, 0) + 1
+        if len(entry["items"]) < EXPIRY_ALERT_ITEMS:
+            entry["items"].append({
+                "id": item.id,
+                "sku": product.sku,
+                "quantity": item.quantity,
+                "expiry_date": item.expiry_date.isoformat(),
+            })
+
+    open_alerts = {
+        (alert.data or {}).get("warehouse_id"): alert
+        for alert in Alert.query.filter(
+            Alert.type == "inventory",
+            Alert.status.in_(OPEN_ALERT_STATUSES),
+            Alert.inventory_item_id.is_(None),
+        )
+        if (alert.data or {}).get("kind") == "expiry"
+    }
+
+    now = datetime.now(UTC)
+    counts = {"opened": 0, "updated": 0, "closed": 0}
+    for warehouse_id, data in warehouses.items():
+        buckets = data["buckets"]
+        summary = ", ".join(
+            f"{buckets[b]} {expiry_label(b)}"
+            for b in ["expired"] + [f"{d}d" for d in EXPIRY_HORIZONS_DAYS] if b in buckets
+        )
+        fields = {
+            "severity": expiry_severity(buckets),
+            "title": f"Expiring stock in {data['warehouse']}",
+            "description": f"{data['warehouse']}: {summary}",
+            "data": data,
+        }
+        alert = open_alerts.pop(warehouse_id, None)
+        if alert is None:
+            db.session.add(Alert(id=str(uuid.uuid4()), type="inventory", status="new", created_at=now, **fields))
+            counts["opened"] += 1
+        elif alert.data != data:
+            for field, value in fields.items():
+                setattr(alert, field, value)
+            counts["updated"] += 1
+
+    for alert in open_alerts.values():  # nothing expiring there any more
+        alert.status = "resolved"
+        alert.resolved_at = now
+        counts["closed"] += 1
+
+    db.session.commit()
+    return counts
+
+def run_expiry_scan():
+    with app.app_context():
+        scan_expiring_inventory()
+
+def start_expiry_scanner():
+    global _expiry_scanner
+    if os.getenv("FLASK_ENV") == "testing":
+        return
+    with _expiry_lock:
+        if _expiry_scanner is None:
+            _expiry_scanner = PeriodicJob("expiry-scanner", run_expiry_scan, EXPIRY_SCAN_INTERVAL).start()
+
+@app.before_request
+def start_background_jobs():
+    start_expiry_scanner()
+    start_retention_job()
+    start_machine_rollup_job()
+
+@app.cli.command("scan-expiring-inventory")
+def scan_expiring_inventory_command():
+    print(scan_expiring_inventory())
+
+def parse_date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+def flag_arg(name):
+    return request.args.get(name, "").lower() in ("1", "true", "yes")
+
+def page_args():
+    """``(page, per_page)`` from the query string, or ``None`` when not paginating."""
+    if "page" not in request.args and "per_page" not in request.args:
+        return None
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = request.args.get("per_page", INVENTORY_PAGE_SIZE, type=int)
+    return page, min(max(per_page, 1), MAX_INVENTORY_PAGE_SIZE)
+
+def paginate(query, paging):
+    """Rows for one page plus whether another page follows, without a COUNT(*).
+
+    ``query`` is an ORM query or a Core ``select()``.
+    """
+    page, per_page = paging
+    query = query.offset((page - 1) * per_page).limit(per_page + 1)
+    rows = db.session.execute(query).all() if isinstance(query, Select) else query.all()
+    return rows[:per_page], len(rows) > per_page
+
+def inventory_item_to_dict(item, product):
+    return {
+        "id": item.id,
+        "product_id": product.name,
+        "sku": product.sku,
+        "quantity": item.quantity,
+        "min_stock": item.min_stock,
+        "price": float(product.price) if product.price else 0,
+        "location": item.location or "",
+        "expiry_date": item.expiry_date.isoformat() if item.expiry_date else None
+    }
+
+# List endpoints read only the columns they return (see models.Columns).
+INVENTORY_COLUMNS = Columns(
+    ("id", InventoryItem.id),
+    ("product_id", Product.name),
+    ("sku", Product.sku),
+    ("quantity", InventoryItem.quantity),
+    ("min_stock", InventoryItem.min_stock),
+    ("price", Product.price, number),
+    ("location", InventoryItem.location, or_empty),
+    ("expiry_date", InventoryItem.expiry_date, iso),
+)
+
 @app.route('/api/inventory/<warehouse_type>', methods=['GET'])
 @token_required
 def get_inventory(current_user, warehouse_type):
-
-    results = (
-        db.session.query(InventoryItem, Product)
+    """Inventory of one warehouse type.
+
+    Optional filters: ``sku`` (prefix), ``low_stock=1`` (below min stock) and
+    ``expiring_before=YYYY-MM-DD``. With ``page``/``per_page`` the response is
+    ``{"items", "page", "per_page", "has_more"}`` instead of a plain list.
+    """
+    try:
+        expiring_before = parse_date_arg("expiring_before")
+    except ValueError:
+        return jsonify({"message": "expiring_before must be YYYY-MM-DD"}), 400
+
+    query = (
+        INVENTORY_COLUMNS.select()
+        .select_from(InventoryItem)
         .join(Warehouse, InventoryItem.warehouse_id == Warehouse.id)
         .join(Product, InventoryItem.product_id == Product.id)
-        .filter(Warehouse.type == warehouse_type)
-        .all()
+        .where(Warehouse.type == warehouse_type)
     )
+    if request.args.get("sku"):
+        query = query.where(Product.sku.startswith(request.args["sku"], autoescape=True))
+    if flag_arg("low_stock"):
+        query = query.where(InventoryItem.quantity < InventoryItem.min_stock)
+    if expiring_before:
+        query = query.where(InventoryItem.expiry_date < expiring_before)
+
+    paging = page_args()
+    if paging is None:
+        return jsonify(INVENTORY_COLUMNS.dicts(db.session.execute(query)))
+
+    rows, has_more = paginate(query.order_by(Product.sku, InventoryItem.id), paging)
+    return jsonify({
+        "items": INVENTORY_COLUMNS.dicts(rows),
+        "page": paging[0],
+        "per_page": paging[1],
+        "has_more": has_more,
+    })
 
-    return jsonify([
-        {
-            "id": item.id,
-            "product_id": product.name,
+@app.route('/api/inventory/expiring', methods=['GET'])
+@token_required
+def get_expiring_inventory(current_user):
+    """Stocked items expiring before ``before`` (default: the longest horizon), soonest first."""
+    try:
+        before = parse_date_arg("before")
+    except ValueError:
+        return jsonify({"message": "before must be YYYY-MM-DD"}), 400
+    today = datetime.now(UTC).date()
+    before = before or today + timedelta(days=EXPIRY_HORIZONS_DAYS[-1] + 1)
+
+    query = expiring_items_query(before)
+    if request.args.get("warehouse"):
+        query = query.filter(Warehouse.type == request.args["warehouse"])
+
+    def to_dict(item, product, warehouse):
+        return dict(inventory_item_to_dict(item, product),
+                    warehouse=warehouse.type,
+                    days_left=(item.expiry_date - today).days)
+
+    paging = page_args()
+    if paging is None:
+        return jsonify([to_dict(*row) for row in query.all()])
+    rows, has_more = paginate(query, paging)
+    return jsonify({
+        "items": [to_dict(*row) for row in rows],
+        "page": paging[0],
+        "per_page": paging[1],
+        "has_more": has_more,
+    })
+
+@app.route('/api/inventory/availability', methods=['GET'])
+@token_required
+def get_inventory_availability(current_user):
+    """Stock per product across warehouses, read from the inventory_stock summary."""
+    query = (
+        db.session.query(Product, Warehouse, InventoryStock)
+        .join(InventoryStock, InventoryStock.product_id == Product.id)
+        .join(Warehouse, InventoryStock.warehouse_id == Warehouse.id)
+    )
+    if request.args.get("product_id"):
+        query = query.filter(Product.id == request.args["product_id"])
+    if request.args.get("sku"):
+        query = query.filter(Product.sku.startswith(request.args["sku"], autoescape=True))
+    query = query.order_by(Product.sku, Warehouse.type)
+
+    products = {}
+    for product, warehouse, stock in query.all():
+        entry = products.setdefault(product.id, {
+            "product_id": product.id,
+            "name": product.name,
             "sku": product.sku,
-            "quantity": item.quantity,
-            "min_stock": item.min_stock,
-            "price": float(product.price) if product.price else 0,
-            "location": item.location or "",
-            "expiry_date": item.expiry_date.isoformat() if item.expiry_date else None
-        }
-        for item, product in results
-    ])
+            "total": 0,
+            "available": 0,
+            "warehouses": {},
+            "reserved": {},
+        })
+        entry["warehouses"][warehouse.type] = stock.quantity
+        entry["reserved"][warehouse.type] = stock.reserved
+        entry["total"] += stock.quantity
+        entry["available"] += stock.quantity - stock.reserved
+    return jsonify(list(products.values()))
 
 
 @app.route('/api/inventory/<warehouse_type>', methods=['POST'])
@@ -356,7 +1079,7 @@ def add_inventory_item(current_user, warehouse_type):
     expiry = None
     if data.get("expiry_date"):
         try:
-            expiry = datetime.datetime.strptime(
+            expiry = datetime.strptime(
                 data["expiry_date"], "%Y-%m-%d"
             ).date()
         except ValueError:
@@ -375,6 +1098,8 @@ def add_inventory_item(current_user, warehouse_type):
 
 
     db.session.add(item)
+    adjust_stock(product.id, warehouse.id, item.quantity, items=1)
+    evaluate_stock_alerts(item.id)
     db.session.commit()
 
     return jsonify({"message": "Product added successfully"}), 201
@@ -404,6 +1129,8 @@ def transfer_inventory_item(current_user):
 
     if item.quantity < qty:
         return jsonify({"message": "Not enough stock to transfer"}), 400
+    if not release_stock(item.product_id, source_warehouse.id, qty):
+        return jsonify({"message": "Stock is reserved for open orders"}), 400
 
     # Deduct from source
     item.quantity -= qty
@@ -425,21 +1152,16 @@ def transfer_inventory_item(current_user):
             expiry_date=item.expiry_date
         )
         db.session.add(target_item)
+        adjust_stock(item.product_id, target_warehouse.id, items=1)
 
     target_item.quantity += qty
+    adjust_stock(item.product_id, target_warehouse.id, qty)
 
-    # Archive log
-    archive = InventoryArchive(
-        id=str(uuid.uuid4()),
-        item_id=item.id,
-        sku=Product.query.get(item.product_id).sku,
-        field="transfer",
-        old_value=f"{qty} moved from {source_type}",
-        new_value=f"{qty} added to {target_type}",
-        edited_by=current_user.username,
-    )
-    db.session.add(archive)
+    # quantity changes are logged automatically; add what the transfer was
+    log_inventory_change(item.id, item.product_id, "transfer",
+                         f"{qty} moved from {source_type}", f"{qty} added to {target_type}")
 
+    evaluate_stock_alerts(item.id, target_item.id)
     db.session.commit()
     return jsonify({"message": "Transfer successful"}), 200
 
@@ -447,48 +1169,35 @@ def transfer_inventory_item(current_user):
 @token_required
 def update_inventory_item(current_user, item_id):
     data = request.get_json()
-    item = InventoryItem.query.get(item_id)
+    item = db.session.get(InventoryItem, item_id, options=[joinedload(InventoryItem.product)])
     if not item:
         return jsonify({"message": "Item not found"}), 404
 
-    product = Product.query.get(item.product_id)
-
-    # Handle InventoryItem fields
+    product = item.product
+    old_quantity = item.quantity or 0
+    if "quantity" in data:
+        try:
+            data["quantity"] = int(data["quantity"])
+        except (TypeError, ValueError):
+            return jsonify({"message": "quantity must be a whole number"}), 400
+        if data["quantity"] < 0:
+            return jsonify({"message": "quantity must not be negative"}), 400
+        removed = old_quantity - data["quantity"]
+        if removed > 0 and not release_stock(item.product_id, item.warehouse_id, removed):
+            return jsonify({"message": "Stock is reserved for open orders or production runs",
+                            "available": unreserved_stock(item.product_id, item.warehouse_id)}), 409
+
+    # changes are written to inventory_archive from attribute history on commit
     for field in ["quantity", "min_stock", "location"]:
-        old_val = getattr(item, field)
-        new_val = data.get(field, old_val)
-
-        if str(old_val) != str(new_val):
-            archive = InventoryArchive(
-                id=str(uuid.uuid4()),
-                item_id=item.id,
-                sku=product.sku if product else None,
-                field=field,
-                old_value=str(old_val),
-                new_value=str(new_val),
-                edited_by=current_user.username,
-            )
-            db.session.add(archive)
-
-        setattr(item, field, new_val)
-
-    # Handle Product price separately
+        if field in data:
+            setattr(item, field, data[field])
+
     if "price" in data and product:
-        old_val = str(product.price)
-        new_val = str(data["price"])
-        if old_val != new_val:
-            archive = InventoryArchive(
-                id=str(uuid.uuid4()),
-                item_id=item.id,
-                sku=product.sku,
-                field="price",
-                old_value=old_val,
-                new_value=new_val,
-                edited_by=current_user.username,
-            )
-            db.session.add(archive)
         product.price = data["price"]
 
+    if int(item.quantity or 0) > old_quantity:
+        adjust_stock(item.product_id, item.warehouse_id, int(item.quantity) - old_quantity)
+    evaluate_stock_alerts(item.id)
     db.session.commit()
     return jsonify({"message": "Inventory updated successfully"})
 
@@ -498,124 +1207,458 @@ def delete_inventory_item(current_user, item_id):
     item = InventoryItem.query.get(item_id)
     if not item:
         return jsonify({"message": "Item not found"}), 404
+    if not release_stock(item.product_id, item.warehouse_id, item.quantity or 0, items=-1):
+        return jsonify({"message": "Stock is reserved for open orders or production runs",
+                        "available": unreserved_stock(item.product_id, item.warehouse_id)}), 409
 
     db.session.delete(item)
+    evaluate_stock_alerts(item.id)
     db.session.commit()
 
     return jsonify({"message": "Item deleted successfully"})
 
+INVENTORY_ARCHIVE_COLUMNS = Columns(
+    ("id", InventoryArchive.id),
+    ("item_id", InventoryArchive.item_id),
+    ("sku", InventoryArchive.sku),
+    ("field", InventoryArchive.field),
+    ("old_value", InventoryArchive.old_value),
+    ("new_value", InventoryArchive.new_value),
+    ("edited_by", InventoryArchive.edited_by),
+    ("timestamp", InventoryArchive.timestamp, iso_or_text),
+)
+
 @app.route('/api/inventory/archive', methods=['GET'])
 @token_required
 @admin_required
 def get_archive(current_user):
-    logs = InventoryArchive.query.order_by(InventoryArchive.timestamp.desc()).all()
-    return jsonify([
-        {
-            "id": log.id,
-            "item_id": log.item_id,
-            "sku": log.sku,
-            "field": log.field,
-            "old_value": log.old_value,
-            "new_value": log.new_value,
-            "edited_by": log.edited_by,
-            "timestamp": log.timestamp.isoformat(),
-        }
-        for log in logs
-    ])
+    """Inventory change log, newest first.
+
+    Optional ``since`` / ``until`` (YYYY-MM-DD) and ``limit``; with
+    ``include_cold=1`` rows moved to cold storage by retention are included.
+    """
+    try:
+        logs = history_rows(InventoryArchive, "timestamp", INVENTORY_ARCHIVE_COLUMNS)
+    except ValueError:
+        return jsonify({"message": "since/until must be YYYY-MM-DD"}), 400
+    return jsonify(INVENTORY_ARCHIVE_COLUMNS.dicts(logs))
 
 # ============================================================================
 # SALES ENDPOINTS
 # ============================================================================
 
+# ----------------------------------------------------------------------------
+# Stock reservations: creating an order holds stock in the sales warehouses
+# (inventory_stock.reserved); completing it consumes the stock and cancelling
+# it releases the hold. Holds are taken with conditional UPDATEs, so two
+# checkouts can never reserve the same units.
+# ----------------------------------------------------------------------------
+
+RESERVATION_WAREHOUSES = os.getenv("RESERVATION_WAREHOUSES", "detailed_sales,wholesale").split(",")
+# "backorder" records a shortfall and still accepts the order, "strict" refuses it
+ORDER_STOCK_POLICY = os.getenv("ORDER_STOCK_POLICY", "backorder")
+RESERVE_RETRIES = 3
+
+class InsufficientStock(Exception):
+    def __init__(self, shortages):
+        super().__init__("Not enough stock")
+        self.shortages = shortages  # [{"productId", "missing"}]
+
+def reservation_warehouse_ids():
+    rows = db.session.execute(
+        select(Warehouse.id, Warehouse.type).where(Warehouse.type.in_(RESERVATION_WAREHOUSES))
+    ).all()
+    return [wid for wid, _ in sorted(rows, key=lambda r: RESERVATION_WAREHOUSES.index(r.type))]
+
+def try_reserve(product_id, warehouse_id, quantity):
+    """Hold ``quantity`` units if that many are unreserved; True on success."""
+    result = db.session.execute(
+        update(InventoryStock)
+        .where(InventoryStock.product_id == product_id,
+               InventoryStock.warehouse_id == warehouse_id,
+               InventoryStock.quantity - InventoryStock.reserved >= quantity)
+        .values(reserved=InventoryStock.reserved + quantity, updated_at=datetime.now(UTC)),
+        execution_options={"synchronize_session": False},
+    )
+    return result.rowcount == 1
+
+def reserve_line(product_id, quantity, warehouse_ids):
+    """Reserve up to ``quantity`` across warehouses in preference order.
+
+    Returns ``([(warehouse_id, quantity), ...], missing)``. A hold that loses
+    a race simply fails its condition; availability is re-read and retried.
+    """
+    taken, remaining = [], quantity
+    for _ in range(RESERVE_RETRIES):
+        available = dict(db.session.execute(
+            select(InventoryStock.warehouse_id, InventoryStock.quantity - InventoryStock.reserved)
+            .where(InventoryStock.product_id == product_id,
+                   InventoryStock.warehouse_id.in_(warehouse_ids))
+        ).all())
+        lost_race = False
+        for warehouse_id in warehouse_ids:
+            want = min(available.get(warehouse_id) or 0, remaining)
+            if want <= 0:
+                continue
+            if try_reserve(product_id, warehouse_id, want):
+                taken.append((warehouse_id, want))
+                remaining -= want
+            else:
+                lost_race = True
+            if not remaining:
+                return taken, 0
+        if not lost_race:
+            break
+    return taken, remaining
+
+HOLDER_KEYS = {"order_id": "orderId", "production_run_id": "runId"}  # in shortage reports
+
+def reserve_stock(needed, warehouse_ids, holder, policy):
+    """Reserve ``{(holder_id, product_id): quantity}`` and write the ledger; caller commits.
+
+    ``holder`` is the ledger column naming the holder (``"order_id"`` or
+    ``"production_run_id"``). Returns the shortages, or raises
+    :class:`InsufficientStock` under the strict policy, after which the caller
+    must roll back to drop the partial holds.
+    """
+    ledger, shortages = [], []
+    now = datetime.now(UTC)
+    for (holder_id, product_id), quantity in needed.items():
+        taken, missing = reserve_line(product_id, quantity, warehouse_ids)
+        for warehouse_id, held in taken:
+            ledger.append({"id": str(uuid.uuid4()), holder: holder_id, "product_id": product_id,
+                           "warehouse_id": warehouse_id, "quantity": held,
+                           "status": "reserved", "created_at": now})
+        if missing:
+            shortages.append({HOLDER_KEYS[holder]: holder_id, "productId": product_id, "missing": missing})
+            ledger.append({"id": str(uuid.uuid4()), holder: holder_id, "product_id": product_id,
+                           "warehouse_id": None, "quantity": missing,
+                           "status": "backordered", "created_at": now})
+
+    if shortages and policy == "strict":
+        raise InsufficientStock(shortages)
+    insert_rows(StockReservation, ledger)
+    return shortages
+
+def reserve_order_items(items, policy=None):
+    """Reserve stock in the sales warehouses for order item rows."""
+    needed = {}
+    for it in items:
+        key = (it["order_id"], it["product_id"])
+        needed[key] = needed.get(key, 0) + it["quantity"]
+    return reserve_stock(needed, reservation_warehouse_ids(), "order_id", policy or ORDER_STOCK_POLICY)
+
+def consume_stock(product_id, warehouse_id, quantity):
+    """Take units leaving the warehouse off its items, soonest expiry first."""
+    items = (
+        InventoryItem.query
+        .filter_by(product_id=product_id, warehouse_id=warehouse_id)
+        .filter(InventoryItem.quantity > 0)
+        .order_by(InventoryItem.expiry_date.is_(None), InventoryItem.expiry_date, InventoryItem.id)
+        .with_for_update()
+        .all()
+    )
+    remaining = quantity
+    for item in items:
+        take = min(item.quantity, remaining)
+        item.quantity -= take
+        remaining -= take
+        if not remaining:
+            break
+    adjust_stock(product_id, warehouse_id, remaining - quantity)
+    evaluate_stock_alerts(*(item.id for item in items))
+
+def settle_reservations(holder_ids, outcome, holder=StockReservation.order_id):
+    """Release (``"released"``) or consume (``"consumed"``) the holders' holds; caller commits."""
+    rows = db.session.execute(
+        select(StockReservation.product_id, StockReservation.warehouse_id,
+               func.sum(StockReservation.quantity))
+        .where(holder.in_(holder_ids),
+               StockReservation.status == "reserved")
+        .group_by(StockReservation.product_id, StockReservation.warehouse_id)
+    ).all()
+    for product_id, warehouse_id, quantity in rows:
+        db.session.execute(
+            update(InventoryStock)
+            .where(InventoryStock.product_id == product_id,
+                   InventoryStock.warehouse_id == warehouse_id)
+            .values(reserved=case((InventoryStock.reserved > quantity,
+                                   InventoryStock.reserved - quantity), else_=0)),
+            execution_options={"synchronize_session": False},
+        )
+        if outcome == "consumed":
+            consume_stock(product_id, warehouse_id, quantity)
+
+    db.session.execute(
+        update(StockReservation)
+        .where(holder.in_(holder_ids),
+               StockReservation.status.in_(["reserved", "backordered"]))
+        .values(status=outcome, closed_at=datetime.now(UTC)),
+        execution_options={"synchronize_session": False},
+    )
+
+ARCHIVE_STATUSES = ("completed", "cancelled")
+ARCHIVE_CHUNK = 1000  # order ids per statement
+
+def archive_orders(order_ids, action, performed_by, chunk_size=ARCHIVE_CHUNK):
+    """Move orders and their items to the archive tables; returns the archived ids.
+
+    Each chunk is a handful of set-based statements: lock the orders, settle
+    their stock reservations,
+    ``INSERT ... SELECT`` them and their items into the archive tables, then
+    bulk ``DELETE`` (``RETURNING`` the deleted ids where the database supports
+    it). An archived order keeps its id as ``order_archive.id``, and each item
+    its id in ``order_items_archive``. Ids that don't exist are skipped. The
+    caller commits.
+    """
+    now = datetime.now(UTC)
+    archived = []
+    for start in range(0, len(order_ids), chunk_size):
+        chunk = order_ids[start:start + chunk_size]
+        ids = db.session.execute(
+            select(Order.id).where(Order.id.in_(chunk)).with_for_update()
+        ).scalars().all()
+        if not ids:
+            continue
+
+        settle_reservations(ids, "consumed" if action == "completed" else "released")
+
+        db.session.execute(insert(OrderArchive).from_select(
+            ["id", "order_id", "customer_name", "customer_email", "action",
+             "performed_by", "timestamp", "total_amount"],
+            select(
+                Order.id, Order.id, Order.customer_name, Order.customer_email,
+                literal(action), literal(performed_by), literal(now, DateTime()), Order.total_amount,
+            ).where(Order.id.in_(ids)),
+        ))
+        db.session.execute(insert(OrderItemArchive).from_select(
+            ["id", "order_archive_id", "product_id", "quantity", "unit_price",
+             "total_price", "archived_at"],
+            select(
+                OrderItem.id, OrderItem.order_id, OrderItem.product_id, OrderItem.quantity,
+                OrderItem.unit_price, OrderItem.total_price, literal(now, DateTime()),
+            ).where(OrderItem.order_id.in_(ids)),
+        ))
+        db.session.execute(
+            delete(OrderItem).where(OrderItem.order_id.in_(ids)),
+            execution_options={"synchronize_session": False},
+        )
+        stmt = delete(Order).where(Order.id.in_(ids))
+        if db.engine.dialect.delete_returning:
+            archived.extend(db.session.execute(
+                stmt.returning(Order.id), execution_options={"synchronize_session": False}
+            ).scalars())
+        else:
+            db.session.execute(stmt, execution_options={"synchronize_session": False})
+            archived.extend(ids)
+    return archived
+
+ORDER_COLUMNS = Columns(
+    ("id", Order.id),
+    ("orderNumber", Order.order_number, or_empty),
+    ("customerName", Order.customer_name, or_empty),
+    ("customerEmail", Order.customer_email, or_empty),
+    ("totalAmount", Order.total_amount, number),
+    ("status", Order.status, or_default("pending")),
+    ("orderDate", Order.order_date, iso),
+    ("deliveryDate", Order.delivery_date, iso),
+)
+ORDER_ITEM_COLUMNS = Columns(
+    ("productId", OrderItem.product_id),
+    ("productName", literal(""), None),
+    ("quantity", OrderItem.quantity),
+    ("price", OrderItem.unit_price, number),
+    ("subtotal", OrderItem.total_price, number),
+)
+
+def items_by_parent(columns, parent_col, order_col):
+    """``columns`` dicts of every child row, grouped by ``parent_col``.
+
+    Reads the whole child table in one pass rather than an IN list of the
+    parents' ids; list endpoints return every parent anyway.
+    """
+    grouped = defaultdict(list)
+    to_dict = columns.to_dict
+    for row in db.session.execute(columns.select(parent_col).order_by(parent_col, order_col)):
+        grouped[row[-1]].append(to_dict(row))
+    return grouped
+
 @app.route('/api/orders', methods=['GET'])
 @token_required
 def get_orders(current_user):
-    orders = Order.query.order_by(Order.order_date.desc()).all()
+    rows = db.session.execute(ORDER_COLUMNS.select().order_by(Order.order_date.desc())).all()
+    items = items_by_parent(ORDER_ITEM_COLUMNS, OrderItem.order_id, OrderItem.id)
+    orders = ORDER_COLUMNS.dicts(rows)
+    for order in orders:
+        order["items"] = items.get(order["id"], [])
+    return jsonify(orders)
+
+MAX_ORDER_BATCH = 1000
+INSERT_CHUNK = 500  # rows per multi-row INSERT
+CENTS = Decimal("0.01")
+
+def money(value):
+    return Decimal(str(value)).quantize(CENTS)
+
+def insert_rows(model, rows, chunk_size=INSERT_CHUNK):
+    """Insert dicts with multi-row ``INSERT ... VALUES (...), (...)`` statements."""
+    for start in range(0, len(rows), chunk_size):
+        db.session.execute(insert(model).values(rows[start:start + chunk_size]))
+
+def prepare_orders(payloads, created_by):
+    """Validate order payloads and build their rows with server-side totals.
+
+    Product ids are checked in one query; a line's price defaults to the
+    product's price. Returns ``(orders, items, errors)`` where ``orders`` and
+    ``items`` are column dicts and ``errors`` lists ``{"index", "message"}``.
+    """
+    product_ids = {
+        line.get("productId")
+        for payload in payloads
+        for line in (payload.get("items") or []) if isinstance(line, dict)
+    }
+    products = {
+        p.id: p for p in db.session.execute(
+            select(Product.id, Product.name, Product.price).where(Product.id.in_(product_ids))
+        )
+    }
 
-  
-    order_ids = [o.id for o in orders]
-    items = OrderItem.query.filter(OrderItem.order_id.in_(order_ids)).all()
+    now = datetime.now(UTC)
+    orders, items, errors = [], [], []
+    for index, payload in enumerate(payloads):
+        lines = payload.get("items") or []
+        order_id = str(uuid.uuid4())
+        order_items = []
+        try:
+            for line in lines:
+                product = products.get(line.get("productId"))
+                if product is None:
+                    raise ValueError(f"unknown product {line.get('productId')!r}")
+                try:
+                    quantity = int(str(line.get("quantity")))
+                except ValueError:
+                    quantity = 0
+                if quantity <= 0:
+                    raise ValueError("quantity must be a positive whole number")
+                price = line.get("price")
+                unit_price = money(product.price or 0) if price is None else money(price)
+                if unit_price < 0:
+                    raise ValueError("price must not be negative")
+                order_items.append({
+                    "id": str(uuid.uuid4()),
+                    "order_id": order_id,
+                    "product_id": product.id,
+                    "quantity": quantity,
+                    "unit_price": unit_price,
+                    "total_price": unit_price * quantity,
+                    "product_name": product.name,
+                })
+            delivery = payload.get("deliveryDate")
+            delivery = datetime.strptime(delivery, "%Y-%m-%d").date() if delivery else None
+        except (TypeError, ValueError, InvalidOperation) as e:
+            errors.append({"index": index, "message": str(e)})
+            continue
+
+        orders.append({
+            "id": order_id,
+            "order_number": payload.get("orderNumber"),
+            "customer_name": payload.get("customerName"),
+            "customer_email": payload.get("customerEmail"),
+            "total_amount": sum((it["total_price"] for it in order_items), Decimal("0.00")),
+            "status": "pending",
+            "payment_status": "unpaid",
+            "created_by": created_by,
+            "order_date": now,
+            "delivery_date": delivery,
+        })
+        items.extend(order_items)
+    return orders, items, errors
+
+def insert_orders(orders, items):
+    """Insert the rows and reserve their stock; may raise :class:`InsufficientStock`."""
+    insert_rows(Order, orders)
+    insert_rows(OrderItem, [
+        {k: v for k, v in it.items() if k != "product_name"} for it in items
+    ])
+    return reserve_order_items(items)
+
+def order_response(order, items):
+    """Response body for a created order, built from its rows (no read-back)."""
+    return {
+        "id": order["id"],
+        "orderNumber": order["order_number"],
+        "customerName": order["customer_name"],
+        "customerEmail": order["customer_email"] or "",
+        "items": [
+            {
+                "productId": it["product_id"],
+                "productName": it["product_name"],
+                "quantity": it["quantity"],
+                "price": float(it["unit_price"]),
+                "subtotal": float(it["total_price"]),
+            }
+            for it in items
+        ],
+        "totalAmount": float(order["total_amount"]),
+        "status": order["status"],
+        "orderDate": order["order_date"].isoformat(),
+        "deliveryDate": order["delivery_date"].isoformat() if order["delivery_date"] else None,
+    }
 
+def order_responses(orders, items):
     items_by_order = {}
     for it in items:
-        items_by_order.setdefault(it.order_id, []).append({
-            "productId": it.product_id,
-            "productName": "",  
-            "quantity": it.quantity,
-            "price": float(it.unit_price),
-            "subtotal": float(it.total_price)
-        })
+        items_by_order.setdefault(it["order_id"], []).append(it)
+    return [order_response(o, items_by_order.get(o["id"], [])) for o in orders]
 
-    def as_str_date(dt):
-        return dt.isoformat() if dt else None
-
-    result = []
-    for o in orders:
-        result.append({
-            "id": o.id,
-            "orderNumber": o.order_number or "",
-            "customerName": o.customer_name or "",
-            "customerEmail": o.customer_email or "",  
-            "items": items_by_order.get(o.id, []),    
-            "totalAmount": float(o.total_amount or 0),
-            "status": o.status or "pending",
-            "orderDate": as_str_date(o.order_date),  
-            "deliveryDate": o.delivery_date.isoformat() if o.delivery_date else None
-        })
-    return jsonify(result)
-    
 @app.route('/api/orders', methods=['POST'])
 @token_required
 def create_order(current_user):
     data = request.get_json()
 
-    order = Order(
-        id=str(uuid.uuid4()),
-        order_number=data.get("orderNumber"),
-        customer_name=data.get("customerName"),
-        customer_email=data.get("customerEmail"),  # accept it
-        total_amount=data.get("totalAmount") or 0,
-        status="pending",
-        payment_status="unpaid",
-        created_by=current_user.id,
-        order_date=datetime.now(UTC),
-        delivery_date=datetime.strptime(data.get("deliveryDate"), "%Y-%m-%d").date() if data.get("deliveryDate") else None
-    )
-    db.session.add(order)
-    db.session.flush()
+    orders, items, errors = prepare_orders([data], current_user.id)
+    if errors:
+        return jsonify({"message": errors[0]["message"]}), 400
 
-    for item in data.get("items", []):
-        db.session.add(OrderItem(
-            id=str(uuid.uuid4()),
-            order_id=order.id,
-            product_id=item["productId"],
-            quantity=item["quantity"],
-            unit_price=item["price"],
-            total_price=item["quantity"] * item["price"]
+    try:
+        insert_orders(orders, items)
+    except InsufficientStock as e:
+        db.session.rollback()
+        return jsonify({"message": str(e), "shortages": e.shortages}), 409
+    db.session.commit()
 
-        ))
+    return jsonify(order_responses(orders, items)[0]), 201
 
+@app.route('/api/orders/batch', methods=['POST'])
+@token_required
+def create_orders_batch(current_user):
+    """Create many orders in one request, e.g. a marketplace import.
+
+    Body: ``{"orders": [<order as for POST /api/orders>, ...]}``. Totals are
+    computed from the lines. Nothing is created unless every order is valid;
+    otherwise the response lists the failing orders by index.
+    """
+    payloads = (request.get_json() or {}).get("orders")
+    if not isinstance(payloads, list) or not payloads:
+        return jsonify({"message": "orders must be a non-empty list"}), 400
+    if len(payloads) > MAX_ORDER_BATCH:
+        return jsonify({"message": f"at most {MAX_ORDER_BATCH} orders per batch"}), 413
+
+    orders, items, errors = prepare_orders(payloads, current_user.id)
+    if errors:
+        return jsonify({"message": "Invalid orders", "errors": errors}), 400
+
+    try:
+        shortages = insert_orders(orders, items)
+    except InsufficientStock as e:
+        db.session.rollback()
+        return jsonify({"message": str(e), "shortages": e.shortages}), 409
     db.session.commit()
 
     return jsonify({
-        "id": order.id,
-        "orderNumber": order.order_number,
-        "customerName": order.customer_name,
-        "customerEmail": order.customer_email or "",
-      "items": [
-    {
-        "productId": i.product_id,
-        "productName": "", 
-        "quantity": i.quantity,
-        "price": float(i.unit_price),
-        "subtotal": float(i.total_price)
-    }
-    for i in OrderItem.query.filter_by(order_id=order.id).all()
-],
-        "totalAmount": float(order.total_amount or 0),
-        "status": order.status,
-        "orderDate": order.order_date.isoformat() if order.order_date else None,
-        "deliveryDate": order.delivery_date.isoformat() if order.delivery_date else None
+        "created": len(orders),
+        "orders": order_responses(orders, items),
+        "backordered": shortages,
     }), 201
 
  
@@ -623,22 +1666,14 @@ def create_order(current_user):
 @app.route('/api/products', methods=['GET'])
 @token_required
 def get_products(current_user):
-    products = Product.query.all()
+    products = Product.query.options(selectinload(Product.recipe_items)).all()
     return jsonify([
         {
             "id": p.id,
             "name": p.name,
             "sku": p.sku,
             "price": float(p.price) if p.price else 0,
-            "recipe": [
-                {
-                    "ingredientId": ri.ingredient_id,
-                    "ingredientName": ri.ingredient_id,
-                    "quantity": float(ri.quantity),
-                    "unit": ri.unit
-                }
-                for ri in RecipeItem.query.filter_by(product_id=p.id).all()
-            ],
+            "recipe": [recipe_item_to_dict(ri) for ri in p.recipe_items],
             "productionTime": 120,
             "unitsPerRun": 50
         }
@@ -682,40 +1717,47 @@ def update_order_status(current_user, order_id):
         db.session.commit()
         return jsonify({"message": f"Order status updated to {new_status}"}), 200
 
-    elif new_status in ["completed", "cancelled"]:
+    elif new_status in ARCHIVE_STATUSES:
         # ✅ Archive the order
-        archive = OrderArchive(
-            id=str(uuid.uuid4()),
-            order_id=order.id,
-            customer_name=order.customer_name,
-            customer_email=order.customer_email,
-            action=new_status,
-            performed_by=current_user.username,
-            total_amount=order.total_amount
-        )
-        db.session.add(archive)
-        db.session.flush()
-
-        items = OrderItem.query.filter_by(order_id=order.id).all()
-        for it in items:
-            db.session.add(OrderItemArchive(
-                id=str(uuid.uuid4()),
-                order_archive_id=archive.id,
-                product_id=it.product_id,
-                quantity=it.quantity,
-                unit_price=it.unit_price,
-                total_price=it.total_price,
-            ))
-
-        for it in items:
-            db.session.delete(it)
-        db.session.delete(order)
-
+        db.session.expunge(order)  # rows are moved with set-based statements below
+        archive_orders([order_id], new_status, current_user.username)
         db.session.commit()
         return jsonify({"message": f"Order moved to archive as {new_status}"}), 200
 
     else:
         return jsonify({"message": "Invalid status"}), 400
+
+@app.route('/api/orders/archive', methods=['POST'])
+@token_required
+def archive_orders_bulk(current_user):
+    """Close many orders at once, e.g. at the end of the day.
+
+    Body: ``{"status": "completed"|"cancelled", "orderIds": [...]}``, or
+    ``"currentStatus"`` instead of ``orderIds`` to close every order in that
+    status (optionally only those placed before ``"before": "YYYY-MM-DD"``).
+    """
+    data = request.get_json() or {}
+    new_status = data.get("status")
+    if new_status not in ARCHIVE_STATUSES:
+        return jsonify({"message": "status must be completed or cancelled"}), 400
+
+    if data.get("orderIds"):
+        order_ids = list(dict.fromkeys(data["orderIds"]))
+    elif data.get("currentStatus"):
+        query = select(Order.id).where(Order.status == data["currentStatus"])
+        if data.get("before"):
+            try:
+                before = datetime.strptime(data["before"], "%Y-%m-%d")
+            except ValueError:
+                return jsonify({"message": "before must be YYYY-MM-DD"}), 400
+            query = query.where(Order.order_date < before)
+        order_ids = db.session.execute(query).scalars().all()
+    else:
+        return jsonify({"message": "orderIds or currentStatus required"}), 400
+
+    archived = archive_orders(order_ids, new_status, current_user.username)
+    db.session.commit()
+    return jsonify({"archived": len(archived), "orderIds": archived}), 200
     
 @app.route('/api/revenue', methods=['GET'])
 @token_required
@@ -724,52 +1766,530 @@ def get_total_revenue(current_user):
     total = sum([float(o.total_amount or 0) for o in completed])
     return jsonify({"totalRevenue": round(total, 2)})
 
+ORDER_ARCHIVE_COLUMNS = Columns(
+    ("id", OrderArchive.id),
+    ("orderId", OrderArchive.order_id),
+    ("customerName", OrderArchive.customer_name),
+    ("customerEmail", OrderArchive.customer_email),
+    ("action", OrderArchive.action),
+    ("performedBy", OrderArchive.performed_by),
+    ("timestamp", OrderArchive.timestamp, iso),
+)
+ORDER_ITEM_ARCHIVE_COLUMNS = Columns(
+    ("productId", OrderItemArchive.product_id),
+    ("quantity", OrderItemArchive.quantity),
+    ("unitPrice", OrderItemArchive.unit_price, number),
+    ("totalPrice", OrderItemArchive.total_price, number),
+)
+
 @app.route('/api/orders/archive', methods=['GET'])
 @token_required
 def get_order_archive(current_user):
-    archives = OrderArchive.query.order_by(OrderArchive.timestamp.desc()).all()
-    return jsonify([
-        {
-            "id": a.id,
-            "orderId": a.order_id,
-            "customerName": a.customer_name,
-            "customerEmail": a.customer_email,
-            "action": a.action,
-            "performedBy": a.performed_by,
-            "timestamp": a.timestamp.isoformat(),
-            "items": [
-                {
-                    "productId": it.product_id,
-                    "quantity": it.quantity,
-                    "unitPrice": float(it.unit_price),
-                    "totalPrice": float(it.total_price),
-                }
-                for it in OrderItemArchive.query.filter_by(order_archive_id=a.id).all()
-            ]
-        }
-        for a in archives
-    ])
+    rows = db.session.execute(ORDER_ARCHIVE_COLUMNS.select().order_by(OrderArchive.timestamp.desc())).all()
+    items = items_by_parent(ORDER_ITEM_ARCHIVE_COLUMNS, OrderItemArchive.order_archive_id, OrderItemArchive.id)
+    archives = ORDER_ARCHIVE_COLUMNS.dicts(rows)
+    for archive in archives:
+        archive["items"] = items.get(archive["id"], [])
+    return jsonify(archives)
 
 # ============================================================================
 # PRODUCTION ENDPOINTS
 # ============================================================================
+# ----------------------------------------------------------------------------
+# Material requirements: recipes are exploded down to raw materials (see
+# mrp.py) and netted against the raw material warehouses. Starting a run
+# reserves its materials, completing it consumes them, cancelling releases.
+# ----------------------------------------------------------------------------
+
+MATERIAL_WAREHOUSES = os.getenv("MATERIAL_WAREHOUSES", "raw_materials").split(",")
+MATERIAL_STOCK_POLICY = os.getenv("MATERIAL_STOCK_POLICY", "backorder")
+RUN_STARTED_STATUSES = ("in-progress", "in_progress")
+RUN_PLANNED_STATUSES = ("planned", "scheduled")
+
+# ----------------------------------------------------------------------------
+# Run lookup: endpoints take either a run's id or its run number. Keys seen
+# before are mapped to the id in-process, so they resolve with one primary
+# key lookup; new keys go to the primary key or the unique run_number index
+# depending on their shape.
+# ----------------------------------------------------------------------------
+
+RUN_KEY_CACHE_SIZE = 10000
+
+_run_keys = OrderedDict()  # id or run number -> id
+_run_keys_lock = threading.Lock()
+
+def looks_like_uuid(key):
+    try:
+        uuid.UUID(key)
+    except (ValueError, TypeError):
+        return False
+    return True
+
+def remember_run(run):
+    with _run_keys_lock:
+        for key in (run.id, run.run_number):
+            if key:
+                _run_keys[key] = run.id
+                _run_keys.move_to_end(key)
+        while len(_run_keys) > RUN_KEY_CACHE_SIZE:
+            _run_keys.popitem(last=False)
+
+def run_by_number(run_number):
+    return db.session.execute(
+        select(ProductionRun).where(ProductionRun.run_number == run_number)
+    ).scalar_one_or_none()
+
+def resolve_run(key):
+    """The run whose id or run number is ``key``, or ``None``."""
+    with _run_keys_lock:
+        run_id = _run_keys.get(key)
+    if run_id:
+        run = db.session.get(ProductionRun, run_id)
+        if run and key in (run.id, run.run_number):
+            return run
+        with _run_keys_lock:
+            _run_keys.pop(key, None)  # deleted or renumbered
+
+    if looks_like_uuid(key):
+        run = db.session.get(ProductionRun, key) or run_by_number(key)
+    else:
+        run = run_by_number(key) or db.session.get(ProductionRun, key)
+    if run:
+        remember_run(run)
+    return run
+
+def load_recipes():
+    recipes = {}
+    for product_id, ingredient_id, quantity in db.session.execute(
+        select(RecipeItem.product_id, RecipeItem.ingredient_id, RecipeItem.quantity)
+    ):
+        recipes.setdefault(product_id, []).append((ingredient_id, quantity))
+    return recipes
+
+def material_warehouse_ids():
+    return db.session.execute(
+        select(Warehouse.id).where(Warehouse.type.in_(MATERIAL_WAREHOUSES))
+    ).scalars().all()
+
+def plan_materials(runs):
+    """Net raw material requirements for ``[(product_id, quantity), ...]``.
+
+    Raises :class:`mrp.CycleError` if a recipe contains itself.
+    """
+    gross = gross_requirements(runs, load_recipes())
+    available = dict(db.session.execute(
+        select(InventoryStock.product_id, func.sum(InventoryStock.quantity - InventoryStock.reserved))
+        .where(InventoryStock.product_id.in_(gross),
+               InventoryStock.warehouse_id.in_(material_warehouse_ids()))
+        .group_by(InventoryStock.product_id)
+    ).all())
+    names = dict(db.session.execute(
+        select(Product.id, Product.name).where(Product.id.in_(gross))
+    ).all())
+    return [
+        {
+            "materialId": material,
+            "materialName": names.get(material, material),
+            "required": float(need["required"]),
+            "available": float(need["available"]),
+            "shortfall": float(need["shortfall"]),
+        }
+        for material, need in sorted(net_requirements(gross, available).items())
+    ]
+
+def reserve_run_materials(run):
+    """Hold the run's materials unless it already holds them; returns shortages."""
+    held = db.session.execute(
+        select(StockReservation.id).where(StockReservation.production_run_id == run.id,
+                                          StockReservation.status.in_(["reserved", "backordered"]))
+    ).first()
+    if held or not run.product_id or not run.quantity:
+        return []
+    gross = gross_requirements([(run.product_id, run.quantity)], load_recipes())
+    needed = {(run.id, material): math.ceil(quantity) for material, quantity in gross.items()}
+    return reserve_stock(needed, material_warehouse_ids(), "production_run_id", MATERIAL_STOCK_POLICY)
+
+def apply_run_status(run, old_status):
+    """Reserve, consume or release materials for a status change; returns shortages."""
+    if run.status == old_status:
+        return []
+    if run.status in RUN_STARTED_STATUSES:
+        return reserve_run_materials(run)
+    if run.status == "completed":
+        shortages = reserve_run_materials(run)  # completed without being started
+        settle_reservations([run.id], "consumed", StockReservation.production_run_id)
+        return shortages
+    if run.status == "cancelled":
+        settle_reservations([run.id], "released", StockReservation.production_run_id)
+    return []
+
+@app.route('/api/production/runs/<string:run_id>/materials', methods=['GET'])
+@token_required
+def get_run_materials(current_user, run_id):
+    if current_user.role not in ['admin', 'production_staff']:
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    run = resolve_run(run_id)
+    if not run:
+        return jsonify({'message': 'Run not found'}), 404
+
+    try:
+        materials = plan_materials([(run.product_id, run.quantity or 0)])
+    except CycleError as e:
+        return jsonify({'message': str(e), 'cycle': e.path}), 400
+    reserved = dict(db.session.execute(
+        select(StockReservation.product_id, func.sum(StockReservation.quantity))
+        .where(StockReservation.production_run_id == run.id, StockReservation.status == "reserved")
+        .group_by(StockReservation.product_id)
+    ).all())
+    for material in materials:
+        material["reserved"] = int(reserved.get(material["materialId"], 0))
+    return jsonify({"runId": run.id, "runNumber": run.run_number, "materials": materials})
+
+@app.route('/api/production/mrp', methods=['POST'])
+@token_required
+def plan_material_requirements(current_user):
+    """Net material requirements for a batch of runs.
+
+    Body: ``{"runIds": [...]}`` (ids or run numbers), or ``{"runs":
+    [{"productId", "quantity"}, ...]}`` for hypothetical runs. Without either,
+    every planned/scheduled run is included.
+    """
+    if current_user.role not in ['admin', 'production_staff']:
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    data = request.get_json(silent=True) or {}
+    if data.get("runs"):
+        try:
+            runs = [(r["productId"], Decimal(str(r["quantity"]))) for r in data["runs"]]
+        except (KeyError, TypeError, InvalidOperation):
+            return jsonify({'message': 'runs need productId and quantity'}), 400
+    else:
+        query = select(ProductionRun.product_id, ProductionRun.quantity)
+        if data.get("runIds"):
+            query = query.where(ProductionRun.id.in_(data["runIds"])
+                                | ProductionRun.run_number.in_(data["runIds"]))
+        else:
+            query = query.where(ProductionRun.status.in_(RUN_PLANNED_STATUSES))
+        runs = [(product_id, quantity or 0) for product_id, quantity in db.session.execute(query)]
+
+    try:
+        materials = plan_materials(runs)
+    except CycleError as e:
+        return jsonify({'message': str(e), 'cycle': e.path}), 400
+    return jsonify({"runs": len(runs), "materials": materials})
+
+# ----------------------------------------------------------------------------
+# Scheduling: planned runs and backordered order demand are list-scheduled
+# onto operational lines (see scheduling.py), clear of maintenance windows.
+# ----------------------------------------------------------------------------
+
+SCHEDULE_ORDER_STATUSES = ("pending", "processing")
+
+def scheduling_lines(now):
+    """Operational lines, free once their running jobs are expected to finish."""
+    busy = {}
+    for line_id, started, quantity, capacity in db.session.execute(
+        select(ProductionRun.production_line_id, ProductionRun.start_date,
+               ProductionRun.quantity, ProductionLine.capacity_per_hour)
+        .join(ProductionLine, ProductionLine.id == ProductionRun.production_line_id)
+        .where(ProductionRun.status.in_(RUN_STARTED_STATUSES), ProductionLine.status == "operational")
+    ):
+        if started and capacity:
+            end = naive_utc(started) + timedelta(hours=(quantity or 0) / capacity)
+            busy[line_id] = max(busy.get(line_id, now), end)
+
+    lines = []
+    for line_id, product_id, capacity, next_maintenance in db.session.execute(
+        select(ProductionLine.id, ProductionLine.product_id, ProductionLine.capacity_per_hour,
+               ProductionLine.next_maintenance)
+        .where(ProductionLine.status == "operational")
+    ):
+        maintenance = []
+        if next_maintenance:
+            start = naive_utc(next_maintenance)
+            maintenance.append((start, start + timedelta(hours=MAINTENANCE_HOURS)))
+        lines.append(Line(line_id, capacity or 0, busy.get(line_id, now), product_id, maintenance))
+    return lines
+
+def scheduling_jobs(now, reschedule=False):
+    """Planned runs, then backordered order lines not already covered by them.
+
+    A run keeps its line, and its start date too when it has both, unless
+    ``reschedule`` is set.
+    """
+    jobs, planned = [], {}
+    for run_id, product_id, quantity, line_id, start in db.session.execute(
+        select(ProductionRun.id, ProductionRun.product_id, ProductionRun.quantity,
+               ProductionRun.production_line_id, ProductionRun.start_date)
+        .where(ProductionRun.status.in_(RUN_PLANNED_STATUSES))
+        .order_by(ProductionRun.start_date, ProductionRun.run_number)
+    ):
+        if reschedule:
+            line_id = start = None
+        start = naive_utc(start) if start else None
+        jobs.append(Job(run_id, product_id, quantity or 0, max(now, start) if start else now,
+                        line_id=line_id, start=start if line_id else None))
+        planned[product_id] = planned.get(product_id, 0) + (quantity or 0)
+
+    for order_id, product_id, quantity, delivery_date in db.session.execute(
+        select(StockReservation.order_id, StockReservation.product_id,
+               func.sum(StockReservation.quantity), Order.delivery_date)
+        .join(Order, Order.id == StockReservation.order_id)
+        .where(StockReservation.status == "backordered",
+               Order.status.in_(SCHEDULE_ORDER_STATUSES))
+        .group_by(StockReservation.order_id, StockReservation.product_id, Order.delivery_date)
+        .order_by(Order.delivery_date)
+    ):
+        covered = min(planned.get(product_id, 0), quantity)
+        planned[product_id] = planned.get(product_id, 0) - covered
+        if quantity > covered:
+            due = datetime.combine(delivery_date, datetime.min.time()) if delivery_date else None
+            jobs.append(Job(order_id, product_id, quantity - covered, now, due=due, kind="order"))
+    return jobs
+
+def build_schedule(now=None, reschedule=False):
+    now = naive_utc(now or datetime.now(UTC))
+    lines = scheduling_lines(now)
+    assignments, unscheduled = schedule(lines, scheduling_jobs(now, reschedule))
+    return lines, assignments, unscheduled
+
+@app.route('/api/production/schedule', methods=['GET', 'POST'])
+@token_required
+def production_schedule(current_user):
+    """Capacity-aware schedule of planned runs and backordered demand.
+
+    GET previews it; POST also writes each planned run's line and start date.
+    Runs that already have both keep them (``fixed``) unless ``reschedule=1``
+    is passed, which plans every run from scratch.
+    """
+    if current_user.role not in ['admin', 'production_staff']:
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    lines, assignments, unscheduled = build_schedule(reschedule=flag_arg("reschedule"))
+    if request.method == 'POST':
+        updates = [
+            {"id": a["jobId"], "production_line_id": a["lineId"], "start_date": a["start"]}
+            for a in assignments if a["kind"] == "run" and not a["fixed"]
+        ]
+        if updates:
+            db.session.execute(update(ProductionRun), updates)
+        db.session.commit()
+        publish_runs([u["id"] for u in updates])
+
+    return jsonify({
+        "timeline": [
+            dict(a, start=a["start"].isoformat(), end=a["end"].isoformat(),
+                 due=a["due"].isoformat() if a["due"] else None)
+            for a in assignments
+        ],
+        "lines": [dict(l, freeFrom=l["freeFrom"].isoformat()) for l in line_summary(lines, assignments)],
+        "unscheduled": [
+            {"jobId": j.id, "kind": j.kind, "productId": j.product_id, "quantity": j.quantity}
+            for j in unscheduled
+        ],
+        "late": sum(1 for a in assignments if a["late"]),
+        "applied": request.method == 'POST',
+    })
+
+@app.route('/api/production/events', methods=['GET'])
+@token_required
+def production_event_stream(current_user):
+    """Server-Sent Events for run and line changes.
+
+    ``?lines=a,b`` limits the stream to those lines' topics (``unassigned``
+    for runs without a line); without it every line is sent. Reconnecting
+    clients send ``Last-Event-ID`` and receive the events they missed.
+    """
+    if current_user.role not in ['admin', 'production_staff']:
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    lines = request.args.get("lines")
+    topics = [line_topic(None if l == "unassigned" else l) for l in lines.split(",") if l] if lines else None
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("lastEventId")
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return jsonify({'message': 'Invalid Last-Event-ID'}), 400
+
+    subscription = production_events.subscribe(topics, last_id)
+    return Response(
+        production_events.stream(subscription),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ----------------------------------------------------------------------------
+# OEE and downtime: machine_events are rolled up into hourly per-line totals
+# by a background job, so a window is read from rollups plus raw events for
+# the partial hours at its edges.
+# ----------------------------------------------------------------------------
+
+MACHINE_ROLLUP_INTERVAL = float(os.getenv("MACHINE_ROLLUP_INTERVAL", 300))
+# Hours already rolled up are rolled again while they are this recent, so
+# events committed after their hour was rolled (a long transaction, another
+# worker's clock) are still counted. Later stragglers only show in raw reads.
+MACHINE_ROLLUP_LOOKBACK = timedelta(hours=float(os.getenv("MACHINE_ROLLUP_LOOKBACK_HOURS", 2)))
+
+_machine_rollup_job = None
+_machine_rollup_lock = threading.Lock()
+
+def line_events(line_id, start, end):
+    """``(state, reason)`` of a line at ``start`` and its events in ``[start, end)``."""
+    before = db.session.execute(
+        select(MachineEvent.state, MachineEvent.reason)
+        .where(MachineEvent.line_id == line_id, MachineEvent.at < start)
+        .order_by(MachineEvent.at.desc()).limit(1)
+    ).first()
+    events = db.session.execute(
+        select(MachineEvent.at, MachineEvent.state, MachineEvent.reason, MachineEvent.units)
+        .where(MachineEvent.line_id == line_id, MachineEvent.at >= start, MachineEvent.at < end)
+        .order_by(MachineEvent.at)
+    ).all()
+    state, reason = (before.state, before.reason or "") if before else (IDLE, "")
+    return state, reason, [(naive_utc(at), state, reason or "", units) for at, state, reason, units in events]
+
+def rollup_machine_states(now=None):
+    """Roll machine events up to the last full hour; returns hours rolled per line.
+
+    The last ``MACHINE_ROLLUP_LOOKBACK`` of hours already rolled are
+    recomputed from the raw events.
+    """
+    target = floor_bucket(naive_utc(now or datetime.now(UTC)))
+    cursors = {c.line_id: c for c in MachineRollupCursor.query.with_for_update()}
+    for line_id, first in db.session.execute(
+        select(MachineEvent.line_id, func.min(MachineEvent.at))
+        .where(MachineEvent.line_id.isnot(None), MachineEvent.line_id.notin_(cursors))
+        .group_by(MachineEvent.line_id)
+    ):
+        cursors[line_id] = MachineRollupCursor(line_id=line_id, rolled_until=floor_bucket(naive_utc(first)),
+                                               state=IDLE, reason="")
+        db.session.add(cursors[line_id])
+
+    rolled = {}
+    for line_id, cursor in cursors.items():
+        start = min(naive_utc(cursor.rolled_until), target - MACHINE_ROLLUP_LOOKBACK)
+        if start >= target:
+            continue
+        state, reason, events = line_events(line_id, start, target)
+        totals = {
+            key: {"seconds": seconds, "units": 0}
+            for key, seconds in bucket_seconds(state_intervals(
+                state, reason, [e[:3] for e in events], start, target)).items()
+        }
+        for at, _, _, units in events:
+            if units:
+                totals.setdefault((floor_bucket(at), RUNNING, ""), {"seconds": 0.0, "units": 0})["units"] += units
+        db.session.execute(delete(MachineStateRollup).where(
+            MachineStateRollup.line_id == line_id, MachineStateRollup.bucket >= start))
+        insert_rows(MachineStateRollup, [
+            {"line_id": line_id, "bucket": bucket, "state": state, "reason": reason, **values}
+            for (bucket, state, reason), values in totals.items()
+        ])
+        cursor.state, cursor.reason = (events[-1][1], events[-1][2]) if events else (state, reason)
+        cursor.rolled_until = target
+        rolled[line_id] = (target - start) // BUCKET
+    db.session.commit()
+    return rolled
+
+def machine_state_seconds(line_id, since, until):
+    """``({(state, reason): seconds}, units)`` for a line over ``[since, until)``."""
+    seconds, units = {}, 0
+    cursor = db.session.get(MachineRollupCursor, line_id)
+    start = ceil_bucket(since)
+    end = min(floor_bucket(until), naive_utc(cursor.rolled_until)) if cursor else start
+    raw = [(since, until)]
+    if end > start:
+        for state, reason, total, made in db.session.execute(
+            select(MachineStateRollup.state, MachineStateRollup.reason,
+                   func.sum(MachineStateRollup.seconds), func.sum(MachineStateRollup.units))
+            .where(MachineStateRollup.line_id == line_id,
+                   MachineStateRollup.bucket >= start, MachineStateRollup.bucket < end)
+            .group_by(MachineStateRollup.state, MachineStateRollup.reason)
+        ):
+            seconds[(state, reason)] = seconds.get((state, reason), 0) + (total or 0)
+            units += made or 0
+        raw = [(since, start), (end, until)]
+
+    for span_start, span_end in raw:
+        if span_end <= span_start:
+            continue
+        state, reason, events = line_events(line_id, span_start, span_end)
+        for state, reason, a, b in state_intervals(state, reason, [e[:3] for e in events], span_start, span_end):
+            seconds[(state, reason)] = seconds.get((state, reason), 0) + (b - a).total_seconds()
+        units += sum(e[3] for e in events)
+    return seconds, units
+
+def run_machine_rollup():
+    with app.app_context():
+        rollup_machine_states()
+
+def start_machine_rollup_job():
+    global _machine_rollup_job
+    if os.getenv("FLASK_ENV") == "testing":
+        return
+    with _machine_rollup_lock:
+        if _machine_rollup_job is None:
+            _machine_rollup_job = PeriodicJob("machine-rollup", run_machine_rollup, MACHINE_ROLLUP_INTERVAL).start()
+
+@app.cli.command("rollup-machine-states")
+def rollup_machine_states_command():
+    print(rollup_machine_states())
+
+def parse_time_arg(name):
+    """Datetime from an ISO query value; a bare ``until`` date includes that day."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    parsed = naive_utc(datetime.fromisoformat(value))
+    if name == "until" and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+@app.route('/api/production/oee', methods=['GET'])
+@token_required
+def get_production_oee(current_user):
+    """Availability, performance, OEE, throughput and downtime Pareto per line.
+
+    ``since``/``until`` are ISO dates or datetimes (default: the last 24
+    hours); ``lines=a,b`` limits the lines.
+    """
+    if current_user.role not in ['admin', 'production_staff']:
+        return jsonify({'message': 'Unauthorized'}), 403
+
+    now = naive_utc(datetime.now(UTC))
+    try:
+        until = min(parse_time_arg("until") or now, now)
+        since = parse_time_arg("since") or until - timedelta(days=1)
+    except ValueError:
+        return jsonify({'message': 'Invalid date, use ISO format'}), 400
+    if since >= until:
+        return jsonify({'message': 'since must be before until'}), 400
+
+    query = select(ProductionLine.id, ProductionLine.name, ProductionLine.capacity_per_hour)
+    if request.args.get("lines"):
+        query = query.where(ProductionLine.id.in_(request.args["lines"].split(",")))
+    window = (until - since).total_seconds()
+    lines, downtime = [], {}
+    for line_id, name, capacity in db.session.execute(query.order_by(ProductionLine.name)):
+        seconds, units = machine_state_seconds(line_id, since, until)
+        for (state, reason), value in seconds.items():
+            if state == DOWN:
+                downtime[reason] = downtime.get(reason, 0) + value
+        lines.append({"lineId": line_id, "name": name, **line_metrics(seconds, units, window, capacity)})
+
+    return jsonify({
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "lines": lines,
+        "downtime": downtime_pareto(downtime),
+    })
+
 @app.route('/api/production/lines', methods=['GET'])
 @token_required
 def get_production_lines(current_user):
-    lines = ProductionLine.query.all()
-    return jsonify([
-        {
-            "id": l.id,
-            "name": l.name,
-            "productId": l.product_id,
-            "status": l.status,
-            "capacityPerHour": l.capacity_per_hour,
-            "location": l.location,
-            "lastMaintenance": l.last_maintenance.isoformat() if l.last_maintenance else None,
-            "nextMaintenance": l.next_maintenance.isoformat() if l.next_maintenance else None,
-        }
-        for l in lines
-    ])
+    return jsonify([line_to_dict(l) for l in ProductionLine.query.all()])
+
 @app.route('/api/production/products', methods=['GET'])
 @token_required
 def get_production_products(current_user):
@@ -777,98 +2297,62 @@ def get_production_products(current_user):
     if current_user.role not in ['admin', 'production_staff']:
         return jsonify({'message': 'Unauthorized'}), 403
 
-    products = Product.query.all()
+    products = Product.query.options(selectinload(Product.recipe_items)).all()
     result = []
 
     for p in products:
-        recipe_items = RecipeItem.query.filter_by(product_id=p.id).all()
-        recipe = [
-            {
-                "ingredientId": ri.ingredient_id,
-                "ingredientName": ri.ingredient_id,  # you can join with Product table if ingredients are stored there
-                "quantity": float(ri.quantity),
-                "unit": ri.unit
-            }
-            for ri in recipe_items
-        ]
-
         result.append({
             "id": p.id,
             "name": p.name,
             "sku": p.sku,
-            "recipe": recipe,
+            "recipe": [recipe_item_to_dict(ri) for ri in p.recipe_items],
             "productionTime": 120,   # placeholder until you add column
             "unitsPerRun": 50        # placeholder until you add column
         })
 
     return jsonify(result)
 
+RUN_COLUMNS = Columns(
+    ("id", ProductionRun.id),
+    ("productId", ProductionRun.product_id),
+    ("productName", Product.name, or_empty),
+    ("runNumber", ProductionRun.run_number),
+    ("productionLineId", ProductionRun.production_line_id),
+    ("quantity", ProductionRun.quantity),
+    ("status", ProductionRun.status),
+    ("machineStopped", ProductionRun.machine_stopped),
+    ("stopReason", ProductionRun.stop_reason, or_empty),
+    ("startDate", ProductionRun.start_date, iso),
+    ("completionDate", ProductionRun.completion_date, iso),
+    ("assignedTo", ProductionRun.assigned_to, or_empty),
+    ("createdBy", ProductionRun.created_by),
+)
+
+def run_rows():
+    return RUN_COLUMNS.select().select_from(ProductionRun).outerjoin(Product, Product.id == ProductionRun.product_id)
+
 @app.route('/api/production/runs', methods=['GET'])
 @token_required
 def get_production_runs(current_user):
     if current_user.role not in ['admin', 'production_staff']:
         return jsonify({'message': 'Unauthorized'}), 403
 
-    runs = ProductionRun.query.all()
-    return jsonify([
-        {
-            "id": r.id,
-            "productId": r.product_id,
-             "productName": (db.session.get(Product, r.product_id).name if r.product_id else None),
-            "runNumber": r.run_number,
-            "productionLineId": r.production_line_id,
-            "quantity": r.quantity,
-            "status": r.status,
-            "machineStopped": r.machine_stopped,
-            "stopReason": r.stop_reason,
-            "startDate": r.start_date.isoformat() if r.start_date else None,   # ✅ fixed
-            "completionDate": r.completion_date.isoformat() if r.completion_date else None,
-            "assignedTo": r.assigned_to,
-            "createdBy": r.created_by,
-        }
-        for r in runs
-    ])
+    return jsonify(RUN_COLUMNS.dicts(db.session.execute(run_rows())))
+
 @app.route('/api/production/runs/<string:run_id>', methods=['GET'])
 @token_required
 def get_production_run(current_user, run_id):
     if current_user.role not in ['admin', 'production_staff']:
         return jsonify({'message': 'Unauthorized'}), 403
 
-    # Find run by run_number (frontend sends run_001, run_002, etc.)
-    run = ProductionRun.query.filter(
-        (ProductionRun.id == run_id) | (ProductionRun.run_number == run_id)
-    ).first()
+    # Frontend sends run numbers (run_001, run_002, etc.) or ids
+    run = resolve_run(run_id)
 
     if not run:
         return jsonify({'message': 'Run not found'}), 404
 
-    # Get product name safely
-    product = db.session.get(Product, run.product_id) if run.product_id else None
-
-    return jsonify({
-        "id": run.id,
-        "productId": run.product_id,
-        "productName": product.name if product else None,
-        "runNumber": run.run_number,
-        "productionLineId": run.production_line_id,
-        "quantity": run.quantity,
-        "status": run.status,
-        "machineStopped": run.machine_stopped,
-        "stopReason": run.stop_reason,
-        "startDate": run.start_date.isoformat() if run.start_date else None,
-        "completionDate": run.completion_date.isoformat() if run.completion_date else None,
-        "assignedTo": run.assigned_to,
-        "createdBy": run.created_by,
-        "recipe": [
-    {
-        "ingredientId": ri.ingredient_id,
-        "quantity": float(ri.quantity),
-        "unit": ri.unit
-    }
-    for ri in RecipeItem.query.filter_by(product_id=run.product_id).all()
-]
-
-    })
+    recipe = run.product.recipe_items if run.product else []
+    return jsonify(dict(run_to_dict(run), recipe=[recipe_item_to_dict(ri) for ri in recipe]))
 
 @app.route('/api/production/runs', methods=['POST'])
 @token_required
@@ -891,45 +2375,39 @@ def create_production_run(current_user):
         created_by=current_user.id
     )
     db.session.add(run)
-    db.session.commit()
-
-    # ✅ Safely fetch product name
-    product = db.session.get(Product, run.product_id) if run.product_id else None
+    try:
+        shortages = apply_run_status(run, None)
+    except CycleError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e), 'cycle': e.path}), 400
+    except InsufficientStock as e:
+        db.session.rollback()
+        return jsonify({'message': 'Not enough materials', 'shortages': e.shortages}), 409
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'message': 'Run number already exists'}), 409
+    remember_run(run)
 
     return jsonify({
-        "run": {
-            "id": run.id,
-            "runNumber": run.run_number,
-            "productId": run.product_id,
-            "productName": product.name if product else "",   # ✅ always return string
-            "productionLineId": run.production_line_id,
-            "quantity": run.quantity,
-            "status": run.status,
-            "machineStopped": run.machine_stopped,
-            "stopReason": run.stop_reason or "",              # ✅ avoid undefined
-            "startDate": run.start_date.isoformat() if run.start_date else None,
-            "completionDate": run.completion_date.isoformat() if run.completion_date else None,
-            "assignedTo": run.assigned_to or "",              # ✅ avoid undefined
-            "createdBy": run.created_by,
-        }
+        "run": run_to_dict(run),
+        "materialShortages": shortages,
     }), 201
 
 
-    return jsonify({'message': 'Production run created successfully', 'run': data}), 201
-
-
-@app.route('/api/production/runs/<string:run_number>', methods=['PUT'])
+@app.route('/api/production/runs/<string:run_id>', methods=['PUT'])
 @token_required
-def update_production_run(current_user, run_number):
+def update_production_run(current_user, run_id):
     if current_user.role not in ['admin', 'production_staff']:
         return jsonify({'message': 'Unauthorized'}), 403
 
-    # Find run by run_number instead of id
-    run = ProductionRun.query.filter_by(run_number=run_number).first()
+    run = resolve_run(run_id)
     if not run:
         return jsonify({'message': 'Run not found'}), 404
 
     data = request.get_json()
+    old_status = run.status
 
     # Update status
     if "status" in data:
@@ -947,26 +2425,19 @@ def update_production_run(current_user, run_number):
     if "assignedTo" in data:
         run.assigned_to = data["assignedTo"]
 
+    try:
+        shortages = apply_run_status(run, old_status)
+    except CycleError as e:
+        db.session.rollback()
+        return jsonify({'message': str(e), 'cycle': e.path}), 400
+    except InsufficientStock as e:
+        db.session.rollback()
+        return jsonify({'message': 'Not enough materials', 'shortages': e.shortages}), 409
     db.session.commit()
 
-    product = db.session.get(Product, run.product_id) if run.product_id else None
-
     return jsonify({
-        "run": {
-            "id": run.id,
-            "productId": run.product_id,
-            "productName": product.name if product else None,
-            "runNumber": run.run_number,
-            "productionLineId": run.production_line_id,
-            "quantity": run.quantity,
-            "status": run.status,
-            "machineStopped": run.machine_stopped,
-            "stopReason": run.stop_reason,
-            "startDate": run.start_date.isoformat() if run.start_date else None,
-            "completionDate": run.completion_date.isoformat() if run.completion_date else None,
-            "assignedTo": run.assigned_to,
-            "createdBy": run.created_by,
-        }
+        "run": run_to_dict(run),
+        "materialShortages": shortages,
     })
 
 @app.route('/api/production/lines/<string:line_id>', methods=['PUT'])
@@ -975,7 +2446,7 @@ def update_production_line_status(current_user, line_id):
     if current_user.role not in ['admin', 'production_staff']:
         return jsonify({'message': 'Unauthorized'}), 403
 
-    line = ProductionLine.query.filter_by(id=line_id).first()
+    line = db.session.get(ProductionLine, line_id)
     if not line:
         return jsonify({'message': 'Line not found'}), 404
 
@@ -983,18 +2454,7 @@ def update_production_line_status(current_user, line_id):
     line.status = data.get("status", line.status)
     db.session.commit()
 
-    return jsonify({
-        "line": {
-            "id": line.id,
-            "name": line.name,
-            "productId": line.product_id,
-            "status": line.status,
-            "capacityPerHour": line.capacity_per_hour,
-            "location": line.location,
-            "lastMaintenance": line.last_maintenance.isoformat() if line.last_maintenance else None,
-            "nextMaintenance": line.next_maintenance.isoformat() if line.next_maintenance else None,
-        }
-    })
+    return jsonify({"line": line_to_dict(line)})
 
 @app.route('/api/production/runs/<string:run_id>/machine-status', methods=['GET'])
 @token_required
@@ -1002,7 +2462,7 @@ def get_machine_status(current_user, run_id):
     if current_user.role not in ['admin', 'production_staff']:
         return jsonify({'message': 'Unauthorized'}), 403
 
-    run = ProductionRun.query.filter_by(run_number=run_id).first()
+    run = resolve_run(run_id)
     if not run:
         return jsonify({'message': 'Run not found'}), 404
 
@@ -1017,32 +2477,16 @@ def get_archived_production_runs(current_user):
     if current_user.role not in ['admin', 'production_staff']:
         return jsonify({'message': 'Unauthorized'}), 403
 
-    runs = ProductionRun.query.filter_by(status="completed").all()
-    return jsonify([
-        {
-            "id": r.id,
-            "productId": r.product_id,
-           "productName": (db.session.get(Product, r.product_id).name if r.product_id else None),
-            "runNumber": r.run_number,
-            "productionLineId": r.production_line_id,
-            "quantity": r.quantity,
-            "status": r.status,
-            "machineStopped": r.machine_stopped,
-            "stopReason": r.stop_reason,
-            "startDate": r.start_date.isoformat() if r.start_date else None,
-            "completionDate": r.completion_date.isoformat() if r.completion_date else None,  # ✅ fixed
-            "assignedTo": r.assigned_to,
-            "createdBy": r.created_by,
-        }
-        for r in runs
-    ])
+    rows = db.session.execute(run_rows().where(ProductionRun.status == "completed"))
+    return jsonify(RUN_COLUMNS.dicts(rows))
+
 @app.route('/api/production/runs/<string:run_id>/machine-status', methods=['POST'])
 @token_required
 def update_machine_status(current_user, run_id):
     if current_user.role not in ['admin', 'production_staff']:
         return jsonify({'message': 'Unauthorized'}), 403
 
-    run = ProductionRun.query.filter_by(id=run_id).first()
+    run = resolve_run(run_id)
     if not run:
         return jsonify({'message': 'Run not found'}), 404
 
@@ -1052,25 +2496,8 @@ def update_machine_status(current_user, run_id):
 
     db.session.commit()
 
-    product = db.session.get(Product, run.product_id) if run.product_id else None
+    return jsonify({"run": run_to_dict(run)})
 
-    return jsonify({
-        "run": {
-            "id": run.id,
-            "productId": run.product_id,
-            "productName": product.name if product else None,
-            "runNumber": run.run_number,
-            "productionLineId": run.production_line_id,
-            "quantity": run.quantity,
-            "status": run.status,
-            "machineStopped": run.machine_stopped,
-            "stopReason": run.stop_reason,
-            "startDate": run.start_date.isoformat() if run.start_date else None,
-            "completionDate": run.completion_date.isoformat() if run.completion_date else None,
-            "assignedTo": run.assigned_to,
-            "createdBy": run.created_by,
-        }
-    })
 # ============================================================================
 # ALERTS & MONITORING ENDPOINTS (Admin Only)
 # ============================================================================
@@ -1099,31 +2526,125 @@ def create_alert(current_user):
     return jsonify({"message": "Alert created", "id": alert.id}), 201
 
 
+@app.route("/api/alerts/<alert_id>", methods=["PUT"])
+@token_required
+def update_alert(current_user, alert_id):
+    """Update an open incident's alert in place instead of inserting a new row."""
+    data = request.get_json()
+    alert = db.session.get(Alert, alert_id)
+    if not alert:
+        return jsonify({"error": "Alert not found"}), 404
+
+    for field in ["severity", "title", "description", "ai_confidence", "data"]:
+        if field in data:
+            setattr(alert, field, data[field])
+
+    db.session.commit()
+    return jsonify({"message": "Alert updated", "id": alert.id})
 
 
-def get_camera():
-    cam = cv2.VideoCapture(0)
+
+
+def camera_source(camera=None):
+    """Capture source for a camera row: its RTSP stream if it has an address,
+    otherwise the local capture device."""
+    if camera is not None and camera.ip_address:
+        return f"rtsp://{camera.ip_address}:{camera.port or 554}/"
+    return 0
+
+def get_camera(source=0):
+    cam = cv2.VideoCapture(source)
     if not cam.isOpened():
         raise RuntimeError("Camera not accessible")
     return cam
 
-def gen_frames():
-    camera = get_camera()
+# "inline" runs capture, AI and encoding in the request thread; "multiprocess"
+# moves capture and inference into worker processes sharing frames through
+# shared memory, and the request thread only streams finished JPEGs.
+VISION_MODE = os.getenv("VISION_MODE", "inline")
+_vision_pipelines = {}
+_vision_lock = threading.Lock()
+
+# Detection settings saved since the process started, by camera id. Inline
+# producers look them up per frame; multiprocess pipelines are restarted.
+_detection_configs = {}
+
+def get_vision_pipeline(source=0, backend=None, camera_id=None, config=None):
+    key = (source, backend, camera_id)
+    with _vision_lock:
+        pipeline = _vision_pipelines.get(key)
+        if pipeline is None or not pipeline.is_alive():
+            if pipeline is not None:
+                pipeline.stop()
+            pipeline = VisionPipeline(source=source, backend=backend, camera_id=camera_id,
+                                      config=config).start()
+            _vision_pipelines[key] = pipeline
+        return pipeline
+
+def pipeline_frames(source=0, backend=None, camera_id=None, config=None):
+    """JPEGs from the camera's pipeline, following it across config reloads."""
     while True:
-        success, frame = camera.read()
-        if not success:
-            break
-
-        frame = run_ai_on_frame(frame)
-
-        ret, buffer = cv2.imencode('.jpg', frame)
-        frame_bytes = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+        pipeline = get_vision_pipeline(source, backend, camera_id,
+                                       _detection_configs.get(camera_id, config))
+        yield from pipeline.jpeg_frames()
+        with _vision_lock:
+            if _vision_pipelines.get((source, backend, camera_id)) is pipeline:
+                return  # stopped on its own, not replaced by reload_detection_config
+
+def reload_detection_config(camera_id, config):
+    """Make live streams of ``camera_id`` use ``config`` from their next frame."""
+    _detection_configs[camera_id] = config
+    with _vision_lock:
+        stale = [key for key in _vision_pipelines if key[2] == camera_id]
+        pipelines = [_vision_pipelines.pop(key) for key in stale]
+    for pipeline in pipelines:
+        pipeline.stop()
+
+def annotated_frames(source=0, backend=None, camera_id=None, config=None):
+    camera = get_camera(source)
+    try:
+        while True:
+            success, frame = camera.read()
+            if not success:
+                break
+            yield run_ai_on_frame(frame, backend, camera_id, _detection_configs.get(camera_id, config))
+    finally:
+        camera.release()
+
+# One capture + AI producer per (backend, camera); every viewer of that
+# camera shares its frames and the JPEG encodes of its tier.
+_frame_hubs = {}
+_frame_hubs_lock = threading.Lock()
+
+def get_frame_hub(source=0, backend=None, camera_id=None, config=None):
+    with _frame_hubs_lock:
+        hub = _frame_hubs.get((backend, camera_id))
+        if hub is None:
+            hub = FrameHub(lambda: annotated_frames(source, backend, camera_id, config))
+            if camera_id:
+                hub.listeners.append(thumbnail_cache.listener(camera_id))
+            _frame_hubs[(backend, camera_id)] = hub
+        return hub
+
+def gen_frames(backend=None, camera_id=None, tier=None, max_fps=DEFAULT_MAX_FPS, source=0, config=None):
+    if VISION_MODE == "multiprocess":
+        # already encoded by the inference worker; only the frame rate applies
+        frames = throttle(pipeline_frames(source, backend, camera_id, config), max_fps)
+    else:
+        frames = get_frame_hub(source, backend, camera_id, config).subscribe(tier or stream_tier(), max_fps)
+    for frame_bytes in frames:
+        yield multipart(frame_bytes)
 
 @app.route('/video_feed')
 def video_feed():
-    return Response(gen_frames(),
+    # The detector backend (torch, onnx, onnx-int8, openvino) follows the
+    # camera's ai_model setting. scale (0.25-1), quality (JPEG, 40-95) and fps
+    # are snapped to shared tiers; slow clients skip to the newest frame.
+    camera = db.session.get(Camera, request.args["camera_id"]) if request.args.get("camera_id") else None
+    tier = stream_tier(request.args.get("scale", type=float), request.args.get("quality", type=int))
+    max_fps = request.args.get("fps", DEFAULT_MAX_FPS, type=float)
+    return Response(gen_frames(camera.ai_model if camera else None, camera.id if camera else None,
+                               tier, max_fps, camera_source(camera), DetectionConfig.from_camera(camera)),
                     mimetype='multipart/x-mixed-replace; boundary=frame')
 
 
@@ -1135,24 +2656,28 @@ def video_feed():
 
 
 
+ALERT_COLUMNS = Columns(
+    ("id", Alert.id),
+    ("cameraId", Alert.camera_id),
+    ("type", Alert.type),
+    ("severity", Alert.severity),
+    ("title", Alert.title),
+    ("description", Alert.description),
+    ("timestamp", Alert.created_at, iso_or_text),
+    ("status", Alert.status),
+    ("aiConfidence", Alert.ai_confidence, number),
+    ("data", Alert.data),
+)
+
 @app.route("/api/alerts", methods=["GET"])
 @token_required
 def get_alerts(current_user):
-    alerts = Alert.query.order_by(Alert.created_at.desc()).all()
-    return jsonify([
-        {
-            "id": a.id,
-            "cameraId": a.camera_id,
-            "type": a.type,
-            "severity": a.severity,
-            "title": a.title,
-            "description": a.description,
-            "timestamp": a.created_at.isoformat(),
-            "status": a.status,
-            "aiConfidence": float(a.ai_confidence or 0),
-            "data": a.data
-        } for a in alerts
-    ])
+    """Alerts, newest first; takes the same range/cold parameters as the inventory archive."""
+    try:
+        alerts = history_rows(Alert, "created_at", ALERT_COLUMNS)
+    except ValueError:
+        return jsonify({"message": "since/until must be YYYY-MM-DD"}), 400
+    return jsonify(ALERT_COLUMNS.dicts(alerts))
 
 
 @app.route("/api/alerts/<alert_id>/status", methods=["PUT"])
@@ -1174,9 +2699,28 @@ def update_alert_status(current_user, alert_id):
     db.session.commit()
     return jsonify({"message": "Status updated"})
 
+# Small preview JPEG per camera, fed by live streams and refreshed in the
+# background for cameras nobody is watching.
+thumbnail_cache = ThumbnailCache()
+_thumbnail_refresher = None
+_thumbnail_lock = threading.Lock()
+
+def camera_sources():
+    with app.app_context():
+        return {c.id: camera_source(c) for c in Camera.query.all() if c.status != "offline"}
+
+def start_thumbnail_refresher():
+    global _thumbnail_refresher
+    if os.getenv("FLASK_ENV") == "testing":
+        return
+    with _thumbnail_lock:
+        if _thumbnail_refresher is None:
+            _thumbnail_refresher = ThumbnailRefresher(thumbnail_cache, camera_sources).start()
+
 @app.route("/api/cameras", methods=["GET"])
 @token_required
 def list_cameras(current_user):
+    start_thumbnail_refresher()
     cameras = Camera.query.all()
     return jsonify([
         {
@@ -1185,21 +2729,149 @@ def list_cameras(current_user):
             "location": c.location,
             "status": c.status,
             "aiEnabled": c.ai_enabled,
-            "thumbnail": None  
+            "thumbnail": (url_for("get_camera_thumbnail", camera_id=c.id, _external=True)
+                          if thumbnail_cache.get(c.id) else None)
         } for c in cameras
     ])
 
 
+@app.route("/api/cameras/<camera_id>/detection-config", methods=["PUT"])
+@token_required
+@admin_required
+def update_camera_detection_config(current_user, camera_id):
+    camera = db.session.get(Camera, camera_id)
+    if not camera:
+        return jsonify({"message": "Camera not found"}), 404
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"message": "Expected a JSON object"}), 400
+    fields = {
+        "inferenceSize": "inference_size",
+        "roi": "roi",
+        "minBoxArea": "min_box_area",
+        "maxBoxArea": "max_box_area",
+    }
+    values = {col: data.get(key, getattr(camera, col)) for key, col in fields.items()}
+    try:
+        config = DetectionConfig(values["inference_size"], values["roi"],
+                                 values["min_box_area"], values["max_box_area"])
+    except (TypeError, ValueError) as e:
+        return jsonify({"message": f"Invalid detection config: {e}"}), 400
+
+    camera.inference_size = config.inference_size
+    camera.roi = values["roi"]
+    camera.min_box_area = config.min_box_area
+    camera.max_box_area = config.max_box_area
+    db.session.commit()
+    reload_detection_config(camera.id, config)
+
+    return jsonify({
+        "id": camera.id,
+        "inferenceSize": camera.inference_size,
+        "roi": camera.roi,
+        "minBoxArea": camera.min_box_area,
+        "maxBoxArea": camera.max_box_area,
+    })
+
+
+@app.route("/api/cameras/<camera_id>/thumbnail", methods=["GET"])
+def get_camera_thumbnail(camera_id):
+    # Unauthenticated like /video_feed, since <img> tags cannot send a token.
+    thumb = thumbnail_cache.get(camera_id)
+    if thumb is None:
+        return jsonify({"message": "Thumbnail not available"}), 404
+
+    response = Response(thumb.jpeg, mimetype="image/jpeg")
+    response.set_etag(thumb.etag)
+    response.last_modified = thumb.last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = int(REFRESH_INTERVAL)
+    return response.make_conditional(request)
+
+
+analysis_jobs = JobQueue()
+MAX_ANALYSIS_FRAMES = 100
+MAX_ANALYSIS_INTERVAL = 5.0  # seconds between clip frames
+
+def analyze_camera(source, backend, frames, interval, config=None):
+    """Run the detectors over a snapshot (1 frame) or a short clip."""
+    from yolo_webcam import detect_all
+
+    camera = get_camera(source)
+    results = []
+    try:
+        for i in range(frames):
+            if i:
+                time.sleep(interval)
+            success, frame = camera.read()
+            if not success:
+                break
+            results.append([
+                {"class": name, "confidence": conf, "bbox": bbox}
+                for name, conf, bbox in detect_all(frame, backend, config)
+            ])
+    finally:
+        camera.release()
+
+    summary = {}
+    for detections in results:
+        for d in detections:
+            entry = summary.setdefault(d["class"], {"frames": 0, "count": 0, "maxConfidence": 0.0})
+            entry["count"] += 1
+            entry["maxConfidence"] = max(entry["maxConfidence"], d["confidence"])
+        for name in {d["class"] for d in detections}:
+            summary[name]["frames"] += 1
+
+    return {"framesAnalyzed": len(results), "summary": summary, "frames": results}
+
+
 @app.route('/api/cameras/<camera_id>/analyze', methods=['POST'])
 @token_required
 @admin_required
 def analyze_camera_feed(current_user, camera_id):
+    camera = db.session.get(Camera, camera_id)
+    if not camera:
+        return jsonify({'message': 'Camera not found'}), 404
+
+    data = request.get_json(silent=True) or {}
+    mode = data.get("mode", "snapshot")
+    if mode not in ["snapshot", "clip"]:
+        return jsonify({'message': 'Invalid mode'}), 400
+    try:
+        frames = int(data.get("frames", 10))
+        interval = float(data.get("interval", 0.2))
+    except (TypeError, ValueError):
+        return jsonify({'message': 'frames and interval must be numbers'}), 400
+    if not interval >= 0:
+        return jsonify({'message': 'interval must not be negative'}), 400
+    frames = 1 if mode == "snapshot" else max(1, min(frames, MAX_ANALYSIS_FRAMES))
+    interval = min(interval, MAX_ANALYSIS_INTERVAL)
+
+    try:
+        job = analysis_jobs.submit(
+            "camera_analysis", analyze_camera,
+            camera_source(camera), camera.ai_model, frames, interval,
+            DetectionConfig.from_camera(camera),
+            meta={"cameraId": camera.id, "mode": mode, "frames": frames},
+        )
+    except QueueFull:
+        return jsonify({'message': 'Too many analyses in progress, try again later'}), 429
 
     return jsonify({
-        'camera_id': camera_id,
-        'message': 'AI models not yet integrated. Add your models in the designated section.',
-        'timestamp': datetime.now().isoformat()
-    })
+        'jobId': job.id,
+        'status': job.status,
+        'statusUrl': url_for('get_job', job_id=job.id),
+    }), 202
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_job(current_user, job_id):
+    job = analysis_jobs.get(job_id)
+    if not job:
+        return jsonify({'message': 'Job not found'}), 404
+    return jsonify(job.to_dict())
 
 
 # ============================================================================
@@ -1294,8 +2966,8 @@ def get_production_performance(current_user):
 @token_required
 def get_inventory_distribution(current_user):
     results = (
-        db.session.query(Warehouse.type, db.func.sum(InventoryItem.quantity))
-        .join(Warehouse, InventoryItem.warehouse_id == Warehouse.id)
+        db.session.query(Warehouse.type, db.func.sum(InventoryStock.quantity))
+        .join(Warehouse, InventoryStock.warehouse_id == Warehouse.id)
         .group_by(Warehouse.type)
         .all()
     )
@@ -1374,6 +3046,10 @@ def add_numbers():
     return {"result": a + b}, 200
 
 if __name__ == '__main__':
+    # Not at import time: VisionPipeline spawns workers that re-import this
+    # module. Other entrypoints (gunicorn, flask run) use `flask db upgrade`.
+    with app.app_context():
+        upgrade()
     print("=" * 80)
     print("Company Management System - Backend Server")
     print("=" * 80)
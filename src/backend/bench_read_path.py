@@ -0,0 +1,225 @@
+"""Compare the ORM and columnar (models.Columns) read paths of the list endpoints.
+
+    python bench_read_path.py [rows]
+
+Seeds an in-memory SQLite database and checks both paths return the same
+dicts. For each endpoint it then prints rows/sec, the memory blocks and KiB
+allocated and still live once the rows are loaded (model instances or
+tuples, before any dict is built), and the peak traced KiB of a whole
+load-and-serialize pass.
+"""
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, timedelta
+
+os.environ.setdefault("FLASK_ENV", "testing")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from app import (ALERT_COLUMNS, INVENTORY_ARCHIVE_COLUMNS, INVENTORY_COLUMNS, ORDER_ARCHIVE_COLUMNS,
+                 ORDER_COLUMNS, ORDER_ITEM_ARCHIVE_COLUMNS, ORDER_ITEM_COLUMNS, RUN_COLUMNS, app,
+                 insert_rows, inventory_item_to_dict, items_by_parent, run_rows)
+from models import (Alert, InventoryArchive, InventoryItem, Order, OrderArchive, OrderItem,
+                    OrderItemArchive, Product, ProductionRun, Warehouse, db, iso, order_archive_to_dict,
+                    order_to_dict, run_to_dict)
+
+REPEAT = 5
+
+
+def seed(n):
+    products = [
+        {"id": str(uuid.uuid4()), "name": f"Bench {i}", "sku": f"BENCH-{i:06d}", "price": 9.5}
+        for i in range(max(n // 10, 1))
+    ]
+    warehouse = {"id": str(uuid.uuid4()), "name": "Bench", "type": "bench"}
+    start = datetime(2026, 1, 1)
+    insert_rows(Product, products)
+    insert_rows(Warehouse, [warehouse])
+    insert_rows(InventoryItem, [
+        {"id": str(uuid.uuid4()), "product_id": products[i % len(products)]["id"],
+         "warehouse_id": warehouse["id"], "quantity": i, "min_stock": 10, "location": "A1",
+         "expiry_date": date(2027, 1, 1)}
+        for i in range(n)
+    ])
+    insert_rows(ProductionRun, [
+        {"id": str(uuid.uuid4()), "run_number": f"bench_{i:06d}",
+         "product_id": products[i % len(products)]["id"], "quantity": 50, "status": "completed",
+         "start_date": start + timedelta(hours=i), "created_by": "bench"}
+        for i in range(n)
+    ])
+    orders = [
+        {"id": str(uuid.uuid4()), "order_number": f"B-{i:06d}", "customer_name": "Bench",
+         "total_amount": 19, "status": "pending", "order_date": start + timedelta(minutes=i)}
+        for i in range(n)
+    ]
+    insert_rows(Order, orders)
+    insert_rows(OrderItem, [
+        {"id": str(uuid.uuid4()), "order_id": order["id"], "product_id": products[0]["id"],
+         "quantity": 1, "unit_price": 9.5, "total_price": 9.5}
+        for order in orders for _ in range(2)
+    ])
+    archives = [
+        {"id": str(uuid.uuid4()), "order_id": order["id"], "customer_name": "Bench",
+         "action": "completed", "performed_by": "bench", "timestamp": order["order_date"],
+         "total_amount": 19}
+        for order in orders
+    ]
+    insert_rows(OrderArchive, archives)
+    insert_rows(OrderItemArchive, [
+        {"id": str(uuid.uuid4()), "order_archive_id": archive["id"], "product_id": products[0]["id"],
+         "quantity": 1, "unit_price": 9.5, "total_price": 9.5, "archived_at": archive["timestamp"]}
+        for archive in archives for _ in range(2)
+    ])
+    insert_rows(InventoryArchive, [
+        {"id": str(uuid.uuid4()), "item_id": "bench", "sku": "BENCH-000000", "field": "quantity",
+         "old_value": str(i), "new_value": str(i + 1), "edited_by": "bench",
+         "timestamp": start + timedelta(minutes=i)}
+        for i in range(n)
+    ])
+    insert_rows(Alert, [
+        {"id": str(uuid.uuid4()), "type": "fire", "severity": "high", "title": "Bench",
+         "description": "bench alert", "camera_id": "cam-bench", "status": "new",
+         "ai_confidence": 0.9, "data": {"hits": i}, "created_at": start + timedelta(minutes=i)}
+        for i in range(n)
+    ])
+    db.session.commit()
+
+
+# Each path is (load, serialize): load returns the fetched rows, serialize
+# turns them into the endpoint's dicts.
+
+def inventory_query(columns):
+    return (
+        columns
+        .join(Warehouse, InventoryItem.warehouse_id == Warehouse.id)
+        .join(Product, InventoryItem.product_id == Product.id)
+    )
+
+
+def with_items(parents, items):
+    for parent in parents:
+        parent["items"] = items.get(parent["id"], [])
+    return parents
+
+
+ORM = {
+    "runs": (
+        lambda: ProductionRun.query.options(joinedload(ProductionRun.product)).all(),
+        lambda runs: [run_to_dict(r) for r in runs],
+    ),
+    "inventory": (
+        lambda: inventory_query(db.session.query(InventoryItem, Product))
+        .filter(Warehouse.type == "bench").all(),
+        lambda rows: [inventory_item_to_dict(item, product) for item, product in rows],
+    ),
+    "orders": (
+        lambda: Order.query.options(selectinload(Order.items)).order_by(Order.order_date.desc()).all(),
+        lambda orders: [order_to_dict(o) for o in orders],
+    ),
+    "order archive": (
+        lambda: OrderArchive.query.options(selectinload(OrderArchive.items))
+        .order_by(OrderArchive.timestamp.desc()).all(),
+        lambda archives: [order_archive_to_dict(a) for a in archives],
+    ),
+    "inv archive": (
+        lambda: InventoryArchive.query.order_by(InventoryArchive.timestamp.desc()).all(),
+        lambda logs: [
+            {"id": log.id, "item_id": log.item_id, "sku": log.sku, "field": log.field,
+             "old_value": log.old_value, "new_value": log.new_value, "edited_by": log.edited_by,
+             "timestamp": iso(log.timestamp)}
+            for log in logs
+        ],
+    ),
+    "alerts": (
+        lambda: Alert.query.order_by(Alert.created_at.desc()).all(),
+        lambda alerts: [
+            {"id": a.id, "cameraId": a.camera_id, "type": a.type, "severity": a.severity,
+             "title": a.title, "description": a.description, "timestamp": iso(a.created_at),
+             "status": a.status, "aiConfidence": float(a.ai_confidence or 0), "data": a.data}
+            for a in alerts
+        ],
+    ),
+}
+
+COLUMNAR = {
+    "runs": (
+        lambda: db.session.execute(run_rows()).all(),
+        RUN_COLUMNS.dicts,
+    ),
+    "inventory": (
+        lambda: db.session.execute(
+            inventory_query(INVENTORY_COLUMNS.select().select_from(InventoryItem))
+            .where(Warehouse.type == "bench")
+        ).all(),
+        INVENTORY_COLUMNS.dicts,
+    ),
+    # items are grouped into dicts while loading, so they count against the load
+    "orders": (
+        lambda: (db.session.execute(ORDER_COLUMNS.select().order_by(Order.order_date.desc())).all(),
+                 items_by_parent(ORDER_ITEM_COLUMNS, OrderItem.order_id, OrderItem.id)),
+        lambda loaded: with_items(ORDER_COLUMNS.dicts(loaded[0]), loaded[1]),
+    ),
+    "order archive": (
+        lambda: (db.session.execute(ORDER_ARCHIVE_COLUMNS.select()
+                                    .order_by(OrderArchive.timestamp.desc())).all(),
+                 items_by_parent(ORDER_ITEM_ARCHIVE_COLUMNS, OrderItemArchive.order_archive_id,
+                                 OrderItemArchive.id)),
+        lambda loaded: with_items(ORDER_ARCHIVE_COLUMNS.dicts(loaded[0]), loaded[1]),
+    ),
+    "inv archive": (
+        lambda: db.session.execute(INVENTORY_ARCHIVE_COLUMNS.select()
+                                   .order_by(InventoryArchive.timestamp.desc())).all(),
+        INVENTORY_ARCHIVE_COLUMNS.dicts,
+    ),
+    "alerts": (
+        lambda: db.session.execute(ALERT_COLUMNS.select().order_by(Alert.created_at.desc())).all(),
+        ALERT_COLUMNS.dicts,
+    ),
+}
+
+
+def measure(load, serialize):
+    """(rows/sec, blocks and KiB live after loading, peak KiB) for one path."""
+    best = None
+    for _ in range(REPEAT):
+        db.session.remove()
+        t0 = time.perf_counter()
+        rows = serialize(load())
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+
+    db.session.remove()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    loaded = load()
+    after = tracemalloc.take_snapshot()
+    serialize(loaded)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats)
+    size = sum(stat.size_diff for stat in stats)
+    return len(rows) / best, blocks, size / 1024, peak / 1024
+
+
+def main(n):
+    with app.app_context():
+        db.create_all()
+        seed(n)
+        print(f"{n} rows per table, best of {REPEAT}")
+        print(f"{'endpoint':>13} {'path':>9} {'rows/s':>9} {'load blocks':>12} "
+              f"{'load KiB':>9} {'peak KiB':>9}")
+        for name, (load, serialize) in ORM.items():
+            columnar = COLUMNAR[name]
+            assert serialize(load()) == columnar[1](columnar[0]()), f"{name}: paths disagree"
+            for label, path in (("orm", (load, serialize)), ("columnar", columnar)):
+                rate, blocks, size, peak = measure(*path)
+                print(f"{name:>13} {label:>9} {rate:>9.0f} {blocks:>12} {size:>9.0f} {peak:>9.0f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
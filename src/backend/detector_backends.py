@@ -0,0 +1,209 @@
+import os
+import warnings
+
+try:
+    from ultralytics import YOLO
+except ImportError:
+    YOLO = None
+
+try:
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+except ImportError:
+    quantize_dynamic = None
+
+# --- CONFIG ---
+DEFAULT_BACKEND = os.getenv("DETECTOR_BACKEND", "torch")
+EXPORT_IMGSZ = 640
+
+# Exported backends must reproduce the PyTorch detections within these limits:
+# every reference box needs a same-class match with at least this IoU, and the
+# confidence may drift by at most the given amount (INT8 is allowed more).
+BOX_IOU_TOLERANCE = 0.90
+CONF_TOLERANCE = 0.02
+INT8_CONF_TOLERANCE = 0.08
+
+
+class DetectorBackend:
+    """Loads YOLO weights as plain PyTorch through ultralytics."""
+
+    name = "torch"
+    conf_tolerance = CONF_TOLERANCE
+
+    def __init__(self, weights_path, imgsz=EXPORT_IMGSZ):
+        self.weights_path = weights_path
+        self.imgsz = imgsz
+
+    def artifact_path(self):
+        return self.weights_path
+
+    def export(self):
+        return self.weights_path
+
+    def load(self):
+        if YOLO is None:
+            raise RuntimeError("ultralytics is not installed")
+        path = self.artifact_path()
+        if not os.path.exists(path):
+            if not os.path.exists(self.weights_path):
+                raise FileNotFoundError(f"YOLO model not found at {self.weights_path}")
+            path = self.export()
+        return YOLO(path, task="detect")
+
+
+class OnnxBackend(DetectorBackend):
+    """ONNX export run by ultralytics through ONNX Runtime's CPU provider."""
+
+    name = "onnx"
+
+    def artifact_path(self):
+        return os.path.splitext(self.weights_path)[0] + ".onnx"
+
+    def export(self):
+        return YOLO(self.weights_path).export(
+            format="onnx", imgsz=self.imgsz, dynamic=True, simplify=True
+        )
+
+
+class OnnxInt8Backend(OnnxBackend):
+    """ONNX export with dynamically quantized INT8 weights."""
+
+    name = "onnx-int8"
+    conf_tolerance = INT8_CONF_TOLERANCE
+
+    def artifact_path(self):
+        return os.path.splitext(self.weights_path)[0] + ".int8.onnx"
+
+    def export(self):
+        if quantize_dynamic is None:
+            raise RuntimeError("onnxruntime is not installed")
+        fp32_path = super().artifact_path()
+        if not os.path.exists(fp32_path):
+            fp32_path = super().export()
+        int8_path = self.artifact_path()
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QUInt8)
+        return int8_path
+
+
+class OpenVinoBackend(DetectorBackend):
+    """OpenVINO IR export, for Intel CPUs."""
+
+    name = "openvino"
+
+    def artifact_path(self):
+        return os.path.splitext(self.weights_path)[0] + "_openvino_model"
+
+    def export(self):
+        return YOLO(self.weights_path).export(format="openvino", imgsz=self.imgsz)
+
+
+BACKENDS = {
+    cls.name: cls
+    for cls in (DetectorBackend, OnnxBackend, OnnxInt8Backend, OpenVinoBackend)
+}
+
+
+def checked_backend(name):
+    """``name`` if it is a known backend, else ``"torch"`` with a warning."""
+    key = str(name).strip().lower()
+    if key in BACKENDS:
+        return key
+    warnings.warn(f"Unknown detector backend {name!r}, using 'torch' (one of: {', '.join(BACKENDS)})")
+    return DetectorBackend.name
+
+
+DEFAULT_BACKEND = checked_backend(DEFAULT_BACKEND)
+
+
+def resolve_backend(ai_model=None):
+    """Map a ``Camera.ai_model`` value to a backend name.
+
+    Values are matched case-insensitively and may carry a model prefix, so
+    ``"onnx-int8"``, ``"yolov8:onnx-int8"`` and ``"ONNX-INT8"`` are the same.
+    Anything unrecognised falls back to ``DEFAULT_BACKEND``.
+    """
+    if ai_model:
+        key = str(ai_model).strip().lower().rsplit(":", 1)[-1]
+        if key in BACKENDS:
+            return key
+    return DEFAULT_BACKEND
+
+
+def load_detector(weights_path, backend=None):
+    """Load ``weights_path`` through the named backend, exporting on first use."""
+    return BACKENDS[resolve_backend(backend)](weights_path).load()
+
+
+def box_iou(a, b):
+    """IoU of two ``[x1, y1, x2, y2]`` boxes."""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _detections(model, frame, conf):
+    out = []
+    for r in model.predict(source=frame, conf=conf, verbose=False):
+        for b in r.boxes:
+            out.append((int(b.cls), float(b.conf), [float(v) for v in b.xyxy[0]]))
+    return out
+
+
+def match_detections(reference, candidate):
+    """Greedily pair same-class detections by IoU.
+
+    Both arguments are lists of ``(cls, conf, xyxy)``. Returns a list of
+    ``(iou, conf_delta)`` per reference detection, with ``(0.0, conf)`` when a
+    reference box has no counterpart.
+    """
+    unused = list(candidate)
+    pairs = []
+    for cls, conf, box in sorted(reference, key=lambda d: -d[1]):
+        best, best_iou = None, 0.0
+        for cand in unused:
+            if cand[0] != cls:
+                continue
+            iou = box_iou(box, cand[2])
+            if iou > best_iou:
+                best, best_iou = cand, iou
+        if best is None:
+            pairs.append((0.0, conf))
+        else:
+            unused.remove(best)
+            pairs.append((best_iou, abs(conf - best[1])))
+    return pairs
+
+
+def compare_backends(weights_path, frames, backend, conf=0.3):
+    """Check ``backend`` against the PyTorch path on a set of frames.
+
+    Returns a report with the worst IoU and confidence drift seen and whether
+    they stay within the backend's stated tolerance.
+    """
+    reference = DetectorBackend(weights_path).load()
+    candidate_backend = BACKENDS[resolve_backend(backend)](weights_path)
+    candidate = candidate_backend.load()
+
+    pairs, extra = [], 0
+    for frame in frames:
+        ref = _detections(reference, frame, conf)
+        cand = _detections(candidate, frame, conf)
+        pairs.extend(match_detections(ref, cand))
+        extra += max(0, len(cand) - len(ref))
+
+    min_iou = min((p[0] for p in pairs), default=1.0)
+    max_conf_delta = max((p[1] for p in pairs), default=0.0)
+    return {
+        "backend": candidate_backend.name,
+        "frames": len(frames),
+        "reference_boxes": len(pairs),
+        "extra_boxes": extra,
+        "min_iou": min_iou,
+        "max_conf_delta": max_conf_delta,
+        "within_tolerance": (
+            min_iou >= BOX_IOU_TOLERANCE
+            and max_conf_delta <= candidate_backend.conf_tolerance
+            and extra == 0
+        ),
+    }
@@ -0,0 +1,110 @@
+import json
+import threading
+from collections import deque
+
+# --- CONFIG ---
+HISTORY_SIZE = 512       # recent events kept so a reconnecting client can catch up
+SUBSCRIBER_BUFFER = 256  # events queued per subscriber before its oldest are dropped
+HEARTBEAT = 15.0         # seconds between keep-alive comments on an idle stream
+RETRY_MS = 3000          # reconnect delay suggested to EventSource clients
+
+
+def format_sse(event, data, event_id=None):
+    """One Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append("data: " + json.dumps(data, separators=(",", ":")))
+    return "\n".join(lines) + "\n\n"
+
+
+class Subscription:
+    def __init__(self, broker, topics):
+        self.broker = broker
+        self.topics = topics  # None: every topic
+        self.dropped = 0
+        self._events = deque(maxlen=SUBSCRIBER_BUFFER)
+        self._cond = threading.Condition()
+
+    def wants(self, topic):
+        return self.topics is None or topic in self.topics
+
+    def push(self, event):
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._cond.notify()
+
+    def get(self, timeout=HEARTBEAT):
+        """Pending events, waiting up to ``timeout`` seconds for one; ``[]`` on timeout."""
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    """In-process publish/subscribe over topics, for Server-Sent Events.
+
+    Every event gets an increasing id. The last ``history_size`` are kept, so
+    a client reconnecting with ``Last-Event-ID`` is sent what it missed on
+    its topics. A subscriber that falls behind loses its oldest events rather
+    than slowing publishers down. Events only reach subscribers in this
+    process.
+    """
+
+    def __init__(self, history_size=HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._subscribers = []
+        self._history = deque(maxlen=history_size)
+        self._last_id = 0
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
+
+    def publish(self, topic, event, data):
+        with self._lock:
+            self._last_id += 1
+            message = (self._last_id, topic, event, data)
+            self._history.append(message)
+            subscribers = [s for s in self._subscribers if s.wants(topic)]
+        for subscription in subscribers:
+            subscription.push(message)
+        return message[0]
+
+    def subscribe(self, topics=None, last_id=None):
+        """Subscribe to ``topics`` (``None`` for all), replaying events after ``last_id``."""
+        subscription = Subscription(self, set(topics) if topics is not None else None)
+        with self._lock:
+            if last_id is not None:
+                for message in self._history:
+                    if message[0] > last_id and subscription.wants(message[1]):
+                        subscription.push(message)
+            self._subscribers.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def stream(self, subscription, heartbeat=HEARTBEAT):
+        """SSE text for ``subscription`` until the client goes away."""
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            while True:
+                events = subscription.get(heartbeat)
+                if not events:
+                    yield ": ping\n\n"
+                for event_id, topic, event, data in events:
+                    yield format_sse(event, dict(data, topic=topic), event_id)
+        finally:
+            subscription.close()
@@ -0,0 +1,208 @@
+import os
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+
+import numpy as np
+import cv2
+
+# --- CONFIG ---
+FRAME_WIDTH = int(os.getenv("VISION_FRAME_WIDTH", 640))
+FRAME_HEIGHT = int(os.getenv("VISION_FRAME_HEIGHT", 480))
+RING_SLOTS = int(os.getenv("VISION_RING_SLOTS", 4))
+MAX_JPEG_BYTES = 2 * 1024 * 1024
+POLL_INTERVAL = 0.005
+
+
+class SharedRing:
+    """Fixed-size ring of array slots in ``multiprocessing.shared_memory``.
+
+    One writer fills slots in order; readers get numpy views straight onto the
+    shared buffer, so a frame is never copied between processes. Each slot
+    carries the sequence number it holds (-1 while being written), which lets
+    a reader check after using a view that the writer has not lapped it.
+
+    Layout: ``[write_seq, slot_seq * slots, slot_len * slots]`` as int64,
+    followed by the slots themselves.
+    """
+
+    def __init__(self, slot_shape, dtype=np.uint8, slots=RING_SLOTS, name=None):
+        self.slot_shape = tuple(slot_shape)
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        header_bytes = 8 * (1 + 2 * slots)
+        slot_bytes = int(np.prod(self.slot_shape)) * self.dtype.itemsize
+        size = header_bytes + slots * slot_bytes
+
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        header = np.ndarray((1 + 2 * slots,), dtype=np.int64, buffer=self.shm.buf)
+        self._write_seq = header[:1]
+        self._slot_seq = header[1:1 + slots]
+        self._slot_len = header[1 + slots:]
+        self._slots = np.ndarray(
+            (slots,) + self.slot_shape, dtype=self.dtype,
+            buffer=self.shm.buf, offset=header_bytes,
+        )
+        if self.owner:
+            header[:] = 0
+            self._slot_seq[:] = -1
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def spec(self):
+        """Arguments another process needs to attach to this ring."""
+        return {"slot_shape": self.slot_shape, "dtype": self.dtype.str,
+                "slots": self.slots, "name": self.name}
+
+    # --- writer side ---
+    def begin_write(self):
+        """Reserve the next slot; returns ``(seq, view)`` to fill in place."""
+        seq = int(self._write_seq[0])
+        idx = seq % self.slots
+        self._slot_seq[idx] = -1
+        return seq, self._slots[idx]
+
+    def commit(self, seq, length=0):
+        idx = seq % self.slots
+        self._slot_len[idx] = length
+        self._slot_seq[idx] = seq
+        self._write_seq[0] = seq + 1
+
+    def write_bytes(self, data):
+        seq, view = self.begin_write()
+        view[:len(data)] = np.frombuffer(data, dtype=np.uint8)
+        self.commit(seq, len(data))
+        return seq
+
+    # --- reader side ---
+    def latest(self):
+        """``(seq, view)`` of the newest complete slot, or ``None``."""
+        seq = int(self._write_seq[0]) - 1
+        if seq < 0 or self._slot_seq[seq % self.slots] != seq:
+            return None
+        return seq, self._slots[seq % self.slots]
+
+    def is_current(self, seq):
+        """True while the slot holding ``seq`` has not been overwritten."""
+        return self._slot_seq[seq % self.slots] == seq
+
+    def latest_bytes(self):
+        latest = self.latest()
+        if latest is None:
+            return None
+        seq, view = latest
+        data = view[:int(self._slot_len[seq % self.slots])].tobytes()
+        return (seq, data) if self.is_current(seq) else None
+
+    def close(self):
+        self._write_seq = self._slot_seq = self._slot_len = self._slots = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # a caller still holds a view; the mapping goes with the process
+        if self.owner:
+            self.shm.unlink()
+
+
+def capture_worker(source, frame_spec, stop):
+    """Decode camera frames straight into the shared frame ring."""
+    frames = SharedRing(**frame_spec)
+    height, width = frames.slot_shape[:2]
+    cap = cv2.VideoCapture(source)
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    try:
+        while not stop.is_set():
+            seq, view = frames.begin_write()
+            ok, frame = cap.read(view)
+            if not ok:
+                break
+            if frame.shape != view.shape or frame.ctypes.data != view.ctypes.data:
+                # The camera ignored the requested size; scale into the slot.
+                cv2.resize(frame, (width, height), dst=view)
+            frames.commit(seq)
+    finally:
+        cap.release()
+        frames.close()
+
+
+def inference_worker(frame_spec, jpeg_spec, backend, camera_id, config, stop):
+    """Annotate the newest shared frame in place and publish it as a JPEG."""
+    from yolo_webcam import run_ai_on_frame
+
+    frames = SharedRing(**frame_spec)
+    jpegs = SharedRing(**jpeg_spec)
+    last_seq = -1
+    try:
+        while not stop.is_set():
+            latest = frames.latest()
+            if latest is None or latest[0] == last_seq:
+                time.sleep(POLL_INTERVAL)
+                continue
+            seq, view = latest
+            annotated = run_ai_on_frame(view, backend, camera_id, config)
+            if not frames.is_current(seq):
+                continue  # the capture worker lapped us mid-frame; drop it
+            ok, buffer = cv2.imencode(".jpg", annotated)
+            if ok and buffer.size <= MAX_JPEG_BYTES:
+                jpegs.write_bytes(buffer)
+            last_seq = seq
+    finally:
+        frames.close()
+        jpegs.close()
+
+
+class VisionPipeline:
+    """Capture and inference in their own processes, JPEGs for the web process.
+
+    The web process only reads already-encoded frames out of ``jpegs``.
+    Workers are spawned, which re-imports the parent's main module in each
+    of them, so that module must not do startup work at import time.
+    """
+
+    def __init__(self, source=0, backend=None, camera_id=None, config=None,
+                 width=FRAME_WIDTH, height=FRAME_HEIGHT):
+        ctx = mp.get_context("spawn")
+        self.frames = SharedRing((height, width, 3))
+        self.jpegs = SharedRing((MAX_JPEG_BYTES,))
+        self.stop_event = ctx.Event()
+        self.processes = [
+            ctx.Process(target=capture_worker, daemon=True,
+                        args=(source, self.frames.spec(), self.stop_event)),
+            ctx.Process(target=inference_worker, daemon=True,
+                        args=(self.frames.spec(), self.jpegs.spec(), backend, camera_id,
+                              config, self.stop_event)),
+        ]
+
+    def start(self):
+        for p in self.processes:
+            p.start()
+        return self
+
+    def is_alive(self):
+        return all(p.is_alive() for p in self.processes)
+
+    def jpeg_frames(self):
+        """Yield each newly published JPEG once."""
+        last_seq = -1
+        while self.is_alive() and not self.stop_event.is_set():
+            latest = self.jpegs.latest_bytes()
+            if latest is None or latest[0] == last_seq:
+                time.sleep(POLL_INTERVAL)
+                continue
+            last_seq, data = latest
+            yield data
+
+    def stop(self):
+        self.stop_event.set()
+        for p in self.processes:
+            p.join(timeout=5)
+        self.frames.close()
+        self.jpegs.close()
@@ -0,0 +1,139 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+# --- CONFIG ---
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", 8))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", 10))
+
+
+class InferenceServer:
+    """Dynamic batcher shared by every camera stream.
+
+    Camera threads call :meth:`predict` with a single frame. A worker thread
+    collects requests until ``max_batch_size`` frames are waiting or the
+    oldest one has waited ``max_wait_ms``, runs one batched ``model.predict``
+    per (model, conf, imgsz) group and hands each caller its own result.
+    """
+
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()  # orders submit() against stop()
+        self._worker = threading.Thread(target=self._run, name="inference-server", daemon=True)
+        self._worker.start()
+
+    def submit(self, model, frame, conf, imgsz=None):
+        future = Future()
+        with self._lock:
+            if self._stopped.is_set():
+                raise RuntimeError("inference server stopped")
+            self._queue.put((model, frame, conf, imgsz, future))
+        return future
+
+    def predict(self, model, frame, conf, imgsz=None):
+        """Blocking single-frame predict; returns the frame's ``Results``."""
+        return self.submit(model, frame, conf, imgsz).result()
+
+    def stop(self):
+        """Stop the worker and fail any requests it did not get to."""
+        with self._lock:
+            self._stopped.set()
+            self._queue.put(None)
+        self._worker.join()
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[-1].set_exception(RuntimeError("inference server stopped"))
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped.set()
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            groups = {}
+            for model, frame, conf, imgsz, future in self._collect():
+                key = (id(model), conf, imgsz)
+                groups.setdefault(key, (model, []))[1].append((frame, future))
+
+            for (_, conf, imgsz), (model, requests) in groups.items():
+                options = {"imgsz": imgsz} if imgsz else {}
+                try:
+                    results = model.predict(
+                        source=[frame for frame, _ in requests], conf=conf, verbose=False, **options
+                    )
+                except Exception as e:
+                    for _, future in requests:
+                        future.set_exception(e)
+                    continue
+                for (_, future), result in zip(requests, results):
+                    future.set_result(result)
+
+
+def benchmark(model, num_cameras, frames_per_camera=50, conf=0.3, server=None,
+              frame_shape=(480, 640, 3)):
+    """Frames/sec for ``num_cameras`` simulated camera threads.
+
+    With ``server`` each camera submits through the batcher, otherwise it
+    calls ``model.predict`` on its own frames like ``run_ai_on_frame`` does.
+    """
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, frame_shape, dtype=np.uint8) for _ in range(4)]
+
+    def camera():
+        for i in range(frames_per_camera):
+            frame = frames[i % len(frames)]
+            if server is not None:
+                server.predict(model, frame, conf)
+            else:
+                model.predict(source=frame, conf=conf, verbose=False)
+
+    threads = [threading.Thread(target=camera) for _ in range(num_cameras)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return num_cameras * frames_per_camera / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    from yolo_webcam import get_fire_smoke_model
+
+    model = get_fire_smoke_model()
+    model.predict(source=np.zeros((480, 640, 3), dtype=np.uint8), verbose=False)  # warm up
+    server = InferenceServer()
+
+    print(f"batch size {server.max_batch_size}, max wait {server.max_wait * 1000:.0f} ms")
+    print(f"{'cameras':>8} {'per-frame fps':>14} {'batched fps':>12}")
+    for n in (1, 4, 16):
+        direct = benchmark(model, n)
+        batched = benchmark(model, n, server=server)
+        print(f"{n:>8} {direct:>14.1f} {batched:>12.1f}")
+    server.stop()
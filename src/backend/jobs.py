@@ -0,0 +1,133 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+# --- CONFIG ---
+MAX_WORKERS = 2     # analyses running at once
+MAX_PENDING = 16    # queued + running jobs accepted before new ones are refused
+RESULT_TTL = 600.0  # seconds a finished job's result is kept
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind, meta=None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.meta = meta or {}
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at = None
+        self.finished_at = None
+        self.finished = None  # monotonic time, for TTL eviction
+
+    def to_dict(self):
+        def iso(dt):
+            return dt.isoformat() if dt else None
+
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "meta": self.meta,
+            "createdAt": iso(self.created_at),
+            "startedAt": iso(self.started_at),
+            "finishedAt": iso(self.finished_at),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueue:
+    """Local worker pool for long-running work started from a request.
+
+    :meth:`submit` returns immediately with a :class:`Job` whose status moves
+    from ``queued`` to ``running`` to ``done`` or ``failed``. At most
+    ``max_pending`` jobs may be unfinished at once; finished jobs are dropped
+    ``result_ttl`` seconds after they complete.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_pending=MAX_PENDING,
+                 result_ttl=RESULT_TTL, clock=time.monotonic):
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.clock = clock
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _evict(self):
+        now = self.clock()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished is not None and now - job.finished >= self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.finished is None)
+
+    def submit(self, kind, fn, *args, meta=None, **kwargs):
+        job = Job(kind, meta)
+        with self._lock:
+            self._evict()
+            if sum(1 for j in self._jobs.values() if j.finished is None) >= self.max_pending:
+                raise QueueFull(f"{self.max_pending} jobs already pending")
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            self._evict()
+            return self._jobs.get(job_id)
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            traceback.print_exc()
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            job.finished = self.clock()
+
+
+class PeriodicJob:
+    """Daemon thread calling ``fn()`` every ``interval`` seconds until stopped."""
+
+    def __init__(self, name, fn, interval):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.fn()
+            except Exception:
+                print(f"Scheduled job {self.name} failed:")
+                traceback.print_exc()
+            self._stop.wait(self.interval)
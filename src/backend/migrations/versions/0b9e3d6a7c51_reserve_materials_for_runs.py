@@ -0,0 +1,35 @@
+"""Let stock reservations belong to production runs
+
+Revision ID: 0b9e3d6a7c51
+Revises: f2b7c4a9e018
+Create Date: 2026-10-19 16:25:49.028833
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b9e3d6a7c51'
+down_revision = 'f2b7c4a9e018'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('stock_reservations', schema=None) as batch_op:
+        batch_op.alter_column('order_id',
+               existing_type=sa.String(length=36),
+               nullable=True)
+        batch_op.add_column(sa.Column('production_run_id', sa.String(length=36), nullable=True))
+        batch_op.create_index(batch_op.f('ix_stock_reservations_production_run_id'), ['production_run_id'], unique=False)
+
+
+def downgrade():
+    op.execute('DELETE FROM stock_reservations WHERE order_id IS NULL')
+    with op.batch_alter_table('stock_reservations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stock_reservations_production_run_id'))
+        batch_op.drop_column('production_run_id')
+        batch_op.alter_column('order_id',
+               existing_type=sa.String(length=36),
+               nullable=False)
@@ -0,0 +1,32 @@
+"""Add detection config to cameras
+
+Revision ID: 4c1e8a2f9d30
+Revises: b9f283807a16
+Create Date: 2026-10-19 09:12:04.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c1e8a2f9d30'
+down_revision = 'b9f283807a16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('cameras', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('inference_size', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('roi', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('min_box_area', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('max_box_area', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('cameras', schema=None) as batch_op:
+        batch_op.drop_column('max_box_area')
+        batch_op.drop_column('min_box_area')
+        batch_op.drop_column('roi')
+        batch_op.drop_column('inference_size')
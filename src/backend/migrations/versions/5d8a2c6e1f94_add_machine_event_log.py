@@ -0,0 +1,58 @@
+"""Add machine event log and hourly state rollups
+
+Revision ID: 5d8a2c6e1f94
+Revises: 0b9e3d6a7c51
+Create Date: 2026-10-19 18:12:05.417362
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8a2c6e1f94'
+down_revision = '0b9e3d6a7c51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('machine_events',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('line_id', sa.String(length=36), nullable=True),
+    sa.Column('run_id', sa.String(length=36), nullable=True),
+    sa.Column('state', sa.String(length=20), nullable=False),
+    sa.Column('reason', sa.Text(), nullable=True),
+    sa.Column('run_status', sa.String(length=20), nullable=True),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_machine_events_line_id_at', 'machine_events', ['line_id', 'at'], unique=False)
+    op.create_index(op.f('ix_machine_events_run_id'), 'machine_events', ['run_id'], unique=False)
+
+    op.create_table('machine_state_rollups',
+    sa.Column('line_id', sa.String(length=36), nullable=False),
+    sa.Column('bucket', sa.DateTime(), nullable=False),
+    sa.Column('state', sa.String(length=20), nullable=False),
+    sa.Column('reason', sa.String(length=255), nullable=False),
+    sa.Column('seconds', sa.Float(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('line_id', 'bucket', 'state', 'reason')
+    )
+
+    op.create_table('machine_rollup_cursors',
+    sa.Column('line_id', sa.String(length=36), nullable=False),
+    sa.Column('rolled_until', sa.DateTime(), nullable=False),
+    sa.Column('state', sa.String(length=20), nullable=False),
+    sa.Column('reason', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('line_id')
+    )
+
+
+def downgrade():
+    op.drop_table('machine_rollup_cursors')
+    op.drop_table('machine_state_rollups')
+    op.drop_index(op.f('ix_machine_events_run_id'), table_name='machine_events')
+    op.drop_index('ix_machine_events_line_id_at', table_name='machine_events')
+    op.drop_table('machine_events')
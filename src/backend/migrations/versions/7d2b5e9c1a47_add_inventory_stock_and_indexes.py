@@ -0,0 +1,48 @@
+"""Add inventory_stock summary and inventory indexes
+
+Revision ID: 7d2b5e9c1a47
+Revises: 4c1e8a2f9d30
+Create Date: 2026-10-19 10:02:41.530871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2b5e9c1a47'
+down_revision = '4c1e8a2f9d30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_warehouses_type'), 'warehouses', ['type'], unique=False)
+    op.create_index(op.f('ix_inventory_items_product_id'), 'inventory_items', ['product_id'], unique=False)
+    op.create_index(op.f('ix_inventory_items_warehouse_id'), 'inventory_items', ['warehouse_id'], unique=False)
+
+    op.create_table('inventory_stock',
+    sa.Column('product_id', sa.String(length=36), nullable=False),
+    sa.Column('warehouse_id', sa.String(length=36), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('item_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.ForeignKeyConstraint(['warehouse_id'], ['warehouses.id'], ),
+    sa.PrimaryKeyConstraint('product_id', 'warehouse_id')
+    )
+    op.create_index(op.f('ix_inventory_stock_warehouse_id'), 'inventory_stock', ['warehouse_id'], unique=False)
+
+    op.execute(
+        "INSERT INTO inventory_stock (product_id, warehouse_id, quantity, item_count, updated_at) "
+        "SELECT product_id, warehouse_id, COALESCE(SUM(quantity), 0), COUNT(*), CURRENT_TIMESTAMP "
+        "FROM inventory_items GROUP BY product_id, warehouse_id"
+    )
+
+
+def downgrade():
+    op.drop_index(op.f('ix_inventory_stock_warehouse_id'), table_name='inventory_stock')
+    op.drop_table('inventory_stock')
+    op.drop_index(op.f('ix_inventory_items_warehouse_id'), table_name='inventory_items')
+    op.drop_index(op.f('ix_inventory_items_product_id'), table_name='inventory_items')
+    op.drop_index(op.f('ix_warehouses_type'), table_name='warehouses')
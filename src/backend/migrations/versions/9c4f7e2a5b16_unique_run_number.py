@@ -0,0 +1,46 @@
+"""Unique index on production_runs.run_number
+
+Revision ID: 9c4f7e2a5b16
+Revises: 5d8a2c6e1f94
+Create Date: 2026-10-19 19:03:52.286410
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4f7e2a5b16'
+down_revision = '5d8a2c6e1f94'
+branch_labels = None
+depends_on = None
+
+RUN_NUMBER_LENGTH = 50  # production_runs.run_number is String(50)
+SUFFIX_LENGTH = 9  # '-' and the first 8 characters of the id
+
+
+def upgrade():
+    # Existing duplicates keep their number on the first run; later ones get
+    # their id appended so the index can be built. The number is cut short
+    # where needed so the result still fits the column.
+    bind = op.get_bind()
+    duplicates = bind.execute(sa.text(
+        'SELECT id, run_number FROM production_runs WHERE run_number IN '
+        '(SELECT run_number FROM production_runs GROUP BY run_number HAVING COUNT(*) > 1) '
+        'ORDER BY run_number, start_date, id'
+    )).all()
+    seen = set()
+    for run_id, run_number in duplicates:
+        if run_number in seen:
+            bind.execute(sa.text('UPDATE production_runs SET run_number = :number WHERE id = :id'),
+                         {'number': f'{run_number[:RUN_NUMBER_LENGTH - SUFFIX_LENGTH]}-{run_id[:8]}',
+                          'id': run_id})
+        seen.add(run_number)
+
+    with op.batch_alter_table('production_runs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_production_runs_run_number'), ['run_number'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('production_runs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_production_runs_run_number'))
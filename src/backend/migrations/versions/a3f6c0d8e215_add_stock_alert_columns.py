@@ -0,0 +1,32 @@
+"""Allow alerts without a camera and index alerts.inventory_item_id
+
+Revision ID: a3f6c0d8e215
+Revises: 7d2b5e9c1a47
+Create Date: 2026-10-19 11:20:13.904512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f6c0d8e215'
+down_revision = '7d2b5e9c1a47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('alerts', schema=None) as batch_op:
+        batch_op.alter_column('camera_id',
+               existing_type=sa.String(length=36),
+               nullable=True)
+        batch_op.create_index(batch_op.f('ix_alerts_inventory_item_id'), ['inventory_item_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('alerts', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_alerts_inventory_item_id'))
+        batch_op.alter_column('camera_id',
+               existing_type=sa.String(length=36),
+               nullable=False)
@@ -0,0 +1,24 @@
+"""Index inventory_items.expiry_date
+
+Revision ID: c81e4b7f2d63
+Revises: a3f6c0d8e215
+Create Date: 2026-10-19 12:04:52.217356
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81e4b7f2d63'
+down_revision = 'a3f6c0d8e215'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(op.f('ix_inventory_items_expiry_date'), 'inventory_items', ['expiry_date'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_inventory_items_expiry_date'), table_name='inventory_items')
@@ -0,0 +1,41 @@
+"""Index the columns the list and join queries filter or sort on
+
+Revision ID: d3a8f1b6c290
+Revises: 9c4f7e2a5b16
+Create Date: 2026-10-19 19:48:31.902754
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a8f1b6c290'
+down_revision = '9c4f7e2a5b16'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_orders_order_date', 'orders', ['order_date']),
+    ('ix_orders_status', 'orders', ['status']),
+    ('ix_order_items_order_id', 'order_items', ['order_id']),
+    ('ix_order_archive_action_timestamp', 'order_archive', ['action', 'timestamp']),
+    ('ix_order_items_archive_order_archive_id', 'order_items_archive', ['order_archive_id']),
+    ('ix_production_runs_production_line_id', 'production_runs', ['production_line_id']),
+    ('ix_production_runs_status', 'production_runs', ['status']),
+    ('ix_recipe_items_product_id', 'recipe_items', ['product_id']),
+    ('ix_alerts_created_at', 'alerts', ['created_at']),
+    ('ix_alerts_status', 'alerts', ['status']),
+]
+
+
+def upgrade():
+    # On Postgres the archive and alert tables are partitioned; an index on
+    # the parent is created on every partition.
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,101 @@
+"""Partition audit and alert tables by month
+
+Revision ID: e5a9d1c3b742
+Revises: c81e4b7f2d63
+Create Date: 2026-10-19 13:41:27.662019
+
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9d1c3b742'
+down_revision = 'c81e4b7f2d63'
+branch_labels = None
+depends_on = None
+
+# order_items_archive first: its foreign key goes away with the old table,
+# which order_archive's conversion needs.
+PARTITIONED = [
+    ('order_items_archive', 'archived_at'),
+    ('inventory_archive', 'timestamp'),
+    ('order_archive', 'timestamp'),
+    ('alerts', 'created_at'),
+]
+INDEXES = {'alerts': [('ix_alerts_inventory_item_id', 'inventory_item_id')]}
+MONTHS_AHEAD = 3
+
+
+def _add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition(table, column):
+    bind = op.get_bind()
+    old = f'{table}_unpartitioned'
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    op.execute(f'UPDATE {old} SET {column} = CURRENT_TIMESTAMP WHERE {column} IS NULL')
+    op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE ({column})')
+    op.execute(f'ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL')
+    op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+
+    first = bind.execute(sa.text(f'SELECT MIN({column}) FROM {old}')).scalar()
+    now = datetime.now(timezone.utc)
+    month = date((first or now).year, (first or now).month, 1)
+    last = _add_months(date(now.year, now.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE {table}_p{month:%Y%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+        month = _add_months(month, 1)
+
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    op.execute(f'DROP TABLE {old}')
+    op.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, {column})')
+    for name, indexed in INDEXES.get(table, []):
+        op.create_index(name, table, [indexed], unique=False)
+
+
+def _unpartition(table, column):
+    old = f'{table}_partitioned'
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)')
+    op.execute(f'ALTER TABLE {table} ALTER COLUMN {column} DROP NOT NULL')
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    op.execute(f'DROP TABLE {old} CASCADE')
+    op.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id)')
+    for name, indexed in INDEXES.get(table, []):
+        op.create_index(name, table, [indexed], unique=False)
+
+
+def upgrade():
+    with op.batch_alter_table('order_items_archive', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('archived_at', sa.DateTime(), nullable=True))
+    op.execute(
+        'UPDATE order_items_archive SET archived_at = '
+        '(SELECT timestamp FROM order_archive WHERE order_archive.id = order_items_archive.order_archive_id)'
+    )
+
+    # Plain tables elsewhere (SQLite in development and tests).
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for table, column in PARTITIONED:
+        _partition(table, column)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        for table, column in reversed(PARTITIONED):
+            _unpartition(table, column)
+        op.create_foreign_key(
+            'order_items_archive_order_archive_id_fkey', 'order_items_archive',
+            'order_archive', ['order_archive_id'], ['id'],
+        )
+
+    with op.batch_alter_table('order_items_archive', schema=None) as batch_op:
+        batch_op.drop_column('archived_at')
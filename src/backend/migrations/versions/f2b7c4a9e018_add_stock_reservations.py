@@ -0,0 +1,44 @@
+"""Add stock reservations ledger and inventory_stock.reserved
+
+Revision ID: f2b7c4a9e018
+Revises: e5a9d1c3b742
+Create Date: 2026-10-19 15:08:33.410256
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b7c4a9e018'
+down_revision = 'e5a9d1c3b742'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('inventory_stock', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('reserved', sa.Integer(), nullable=False, server_default='0'))
+
+    op.create_table('stock_reservations',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('order_id', sa.String(length=36), nullable=False),
+    sa.Column('product_id', sa.String(length=36), nullable=False),
+    sa.Column('warehouse_id', sa.String(length=36), nullable=True),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('closed_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('stock_reservations', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_stock_reservations_order_id'), ['order_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('stock_reservations', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_stock_reservations_order_id'))
+    op.drop_table('stock_reservations')
+
+    with op.batch_alter_table('inventory_stock', schema=None) as batch_op:
+        batch_op.drop_column('reserved')
@@ -0,0 +1,19 @@
+from .models import (
+    Alert, Camera, InventoryArchive, InventoryItem, InventoryStock, MachineEvent,
+    MachineRollupCursor, MachineStateRollup, Order, OrderArchive, OrderItem, OrderItemArchive,
+    Product, ProductionLine, ProductionRun, RecipeItem, StockReservation, User, Warehouse, db,
+)
+from .serializers import (
+    Columns, iso, iso_or_text, line_to_dict, number, or_default, or_empty, order_archive_to_dict,
+    order_to_dict, recipe_item_to_dict, run_to_dict,
+)
+
+__all__ = [
+    'db',
+    'User', 'Warehouse', 'Product', 'InventoryItem', 'InventoryStock', 'StockReservation',
+    'InventoryArchive', 'Order', 'OrderItem', 'OrderArchive', 'OrderItemArchive',
+    'ProductionLine', 'ProductionRun', 'MachineEvent', 'MachineStateRollup',
+    'MachineRollupCursor', 'RecipeItem', 'Alert', 'Camera',
+    'Columns', 'iso', 'iso_or_text', 'number', 'or_default', 'or_empty',
+    'line_to_dict', 'order_archive_to_dict', 'order_to_dict', 'recipe_item_to_dict', 'run_to_dict',
+]
@@ -0,0 +1,152 @@
+"""Serializers for API responses.
+
+The ``*_to_dict`` functions only read attributes, so they take model
+instances or result rows with the same names. Related objects
+(``run.product``, ``order.items``) should be eager-loaded by the caller's
+query. List endpoints use :class:`Columns` instead, which never builds model
+instances.
+"""
+from sqlalchemy import select
+
+
+def iso(value):
+    return value.isoformat() if value else None
+
+
+def recipe_item_to_dict(ri):
+    return {
+        "ingredientId": ri.ingredient_id,
+        "ingredientName": ri.ingredient_id,
+        "quantity": float(ri.quantity),
+        "unit": ri.unit,
+    }
+
+
+def run_to_dict(run):
+    return {
+        "id": run.id,
+        "productId": run.product_id,
+        "productName": run.product.name if run.product else "",
+        "runNumber": run.run_number,
+        "productionLineId": run.production_line_id,
+        "quantity": run.quantity,
+        "status": run.status,
+        "machineStopped": run.machine_stopped,
+        "stopReason": or_empty(run.stop_reason),
+        "startDate": iso(run.start_date),
+        "completionDate": iso(run.completion_date),
+        "assignedTo": or_empty(run.assigned_to),
+        "createdBy": run.created_by,
+    }
+
+
+def line_to_dict(line):
+    return {
+        "id": line.id,
+        "name": line.name,
+        "productId": line.product_id,
+        "status": line.status,
+        "capacityPerHour": line.capacity_per_hour,
+        "location": line.location,
+        "lastMaintenance": iso(line.last_maintenance),
+        "nextMaintenance": iso(line.next_maintenance),
+    }
+
+
+def order_item_to_dict(it):
+    return {
+        "productId": it.product_id,
+        "productName": "",
+        "quantity": it.quantity,
+        "price": float(it.unit_price),
+        "subtotal": float(it.total_price),
+    }
+
+
+def order_to_dict(order):
+    return {
+        "id": order.id,
+        "orderNumber": order.order_number or "",
+        "customerName": order.customer_name or "",
+        "customerEmail": order.customer_email or "",
+        "items": [order_item_to_dict(it) for it in order.items],
+        "totalAmount": float(order.total_amount or 0),
+        "status": order.status or "pending",
+        "orderDate": iso(order.order_date),
+        "deliveryDate": iso(order.delivery_date),
+    }
+
+
+def order_archive_to_dict(archive):
+    return {
+        "id": archive.id,
+        "orderId": archive.order_id,
+        "customerName": archive.customer_name,
+        "customerEmail": archive.customer_email,
+        "action": archive.action,
+        "performedBy": archive.performed_by,
+        "timestamp": archive.timestamp.isoformat(),
+        "items": [
+            {
+                "productId": it.product_id,
+                "quantity": it.quantity,
+                "unitPrice": float(it.unit_price),
+                "totalPrice": float(it.total_price),
+            }
+            for it in archive.items
+        ],
+    }
+
+
+# Column converters for :class:`Columns`. ``iso_or_text`` passes strings
+# through, which is what cold-storage rows hold.
+
+def iso_or_text(value):
+    return value if isinstance(value, str) or value is None else value.isoformat()
+
+
+def number(value):
+    return float(value or 0)
+
+
+def or_empty(value):
+    return value or ""
+
+
+def or_default(default):
+    def convert(value):
+        return value or default
+    return convert
+
+
+class Columns:
+    """A list endpoint's output fields and the columns they are read from.
+
+    Built from ``(key, column)`` or ``(key, column, convert)`` pairs.
+    :meth:`select` reads just those columns with Core, and :meth:`to_dict`
+    turns one result tuple into the output dict by position, so no model
+    instances or per-row name lookups are involved. Columns added with
+    ``select(*extra)`` come after the fields and are ignored by ``to_dict``.
+    """
+
+    def __init__(self, *fields):
+        self.keys = tuple(f[0] for f in fields)
+        self.columns = tuple(f[1] for f in fields)
+        self.names = tuple(column.key for column in self.columns)
+        self.fields = tuple(
+            (f[0], i, f[2] if len(f) > 2 else None) for i, f in enumerate(fields)
+        )
+
+    def to_dict(self, row):
+        return {key: convert(row[i]) if convert else row[i] for key, i, convert in self.fields}
+
+    def select(self, *extra):
+        return select(*self.columns, *extra)
+
+    def from_mapping(self, row):
+        """Result tuple for a dict keyed by column name, e.g. a cold-storage row."""
+        return tuple(row.get(name) for name in self.names)
+
+    def dicts(self, rows):
+        to_dict = self.to_dict
+        return [to_dict(row) for row in rows]
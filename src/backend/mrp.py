@@ -0,0 +1,60 @@
+from decimal import Decimal
+
+
+class CycleError(ValueError):
+    def __init__(self, path):
+        super().__init__("Recipe cycle: " + " -> ".join(path))
+        self.path = path
+
+
+def unit_requirements(product_id, recipes, memo=None, _stack=None):
+    """Raw materials needed for one unit of ``product_id``.
+
+    ``recipes`` maps a product id to ``[(ingredient_id, quantity per unit), ...]``.
+    An ingredient with a recipe of its own is a subassembly and is expanded
+    further; one without is a raw material. Each product is expanded once
+    per ``memo``, so shared subassemblies cost nothing the second time.
+    Raises :class:`CycleError` if a product (indirectly) contains itself.
+    """
+    memo = {} if memo is None else memo
+    if product_id in memo:
+        return memo[product_id]
+    stack = _stack or []
+    if product_id in stack:
+        raise CycleError(stack[stack.index(product_id):] + [product_id])
+
+    stack.append(product_id)
+    needs = {}
+    for ingredient_id, quantity in recipes.get(product_id, []):
+        quantity = Decimal(str(quantity))
+        if ingredient_id in recipes:
+            for material, per_unit in unit_requirements(ingredient_id, recipes, memo, stack).items():
+                needs[material] = needs.get(material, 0) + per_unit * quantity
+        else:
+            needs[ingredient_id] = needs.get(ingredient_id, 0) + quantity
+    stack.pop()
+    memo[product_id] = needs
+    return needs
+
+
+def gross_requirements(runs, recipes, memo=None):
+    """Total raw materials for ``[(product_id, quantity), ...]``."""
+    memo = {} if memo is None else memo
+    totals = {}
+    for product_id, quantity in runs:
+        for material, per_unit in unit_requirements(product_id, recipes, memo).items():
+            totals[material] = totals.get(material, 0) + per_unit * Decimal(str(quantity))
+    return totals
+
+
+def net_requirements(gross, available):
+    """``{material: {"required", "available", "shortfall"}}`` against on-hand stock."""
+    out = {}
+    for material, required in gross.items():
+        have = Decimal(str(available.get(material, 0)))
+        out[material] = {
+            "required": required,
+            "available": have,
+            "shortfall": max(required - have, Decimal(0)),
+        }
+    return out
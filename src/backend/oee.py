@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+# --- CONFIG ---
+BUCKET = timedelta(hours=1)  # rollup granularity
+
+RUNNING, DOWN, IDLE = "running", "down", "idle"
+
+
+def floor_bucket(at):
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def ceil_bucket(at):
+    floor = floor_bucket(at)
+    return floor if floor == at else floor + BUCKET
+
+
+def state_intervals(state, reason, events, start, end):
+    """``(state, reason, from, to)`` spans covering ``[start, end)``.
+
+    ``state``/``reason`` hold at ``start``; ``events`` are ``(at, state,
+    reason)`` tuples in time order with ``start <= at < end``.
+    """
+    at = start
+    for event_at, next_state, next_reason in events:
+        if event_at > at:
+            yield state, reason, at, event_at
+            at = event_at
+        state, reason = next_state, next_reason
+    if end > at:
+        yield state, reason, at, end
+
+
+def bucket_seconds(intervals):
+    """Seconds per ``(bucket, state, reason)``; idle time is left out."""
+    totals = {}
+    for state, reason, start, end in intervals:
+        if state == IDLE:
+            continue
+        while start < end:
+            bucket = floor_bucket(start)
+            stop = min(end, bucket + BUCKET)
+            key = (bucket, state, reason)
+            totals[key] = totals.get(key, 0.0) + (stop - start).total_seconds()
+            start = stop
+    return totals
+
+
+def downtime_pareto(down_seconds):
+    """Downtime reasons, largest first, with their share and cumulative share."""
+    total = sum(down_seconds.values())
+    out, cumulative = [], 0.0
+    for reason, seconds in sorted(down_seconds.items(), key=lambda kv: -kv[1]):
+        cumulative += seconds
+        out.append({
+            "reason": reason or "unspecified",
+            "hours": round(seconds / 3600, 3),
+            "share": round(seconds / total, 4) if total else 0.0,
+            "cumulativeShare": round(cumulative / total, 4) if total else 0.0,
+        })
+    return out
+
+
+def line_metrics(state_seconds, units, window_seconds, capacity_per_hour):
+    """Availability, performance, OEE, throughput and downtime for one line.
+
+    ``state_seconds`` maps ``(state, reason)`` to seconds in the window.
+    Availability is running time over running plus down time. Performance
+    is units made over what ``capacity_per_hour`` allows in the running
+    time. No scrap is recorded, so quality is 1 and OEE is availability
+    times performance. Ratios are ``None`` when there is nothing to divide by.
+    """
+    running = sum(s for (state, _), s in state_seconds.items() if state == RUNNING)
+    down = {reason: s for (state, reason), s in state_seconds.items() if state == DOWN}
+    planned = running + sum(down.values())
+    ideal = running / 3600 * capacity_per_hour if capacity_per_hour else 0
+
+    availability = running / planned if planned else None
+    performance = units / ideal if ideal else None
+    quality = 1.0
+    oee = availability * performance * quality if availability is not None and performance is not None else None
+    return {
+        "runningHours": round(running / 3600, 3),
+        "downHours": round(sum(down.values()) / 3600, 3),
+        "idleHours": round(max(window_seconds - planned, 0) / 3600, 3),
+        "units": units,
+        "throughputPerHour": round(units / (window_seconds / 3600), 3) if window_seconds else None,
+        "availability": round(availability, 4) if availability is not None else None,
+        "performance": round(performance, 4) if performance is not None else None,
+        "quality": quality,
+        "oee": round(oee, 4) if oee is not None else None,
+        "downtime": downtime_pareto(down),
+    }
@@ -0,0 +1,114 @@
+import numpy as np
+import cv2
+
+# --- CONFIG ---
+DEFAULT_MIN_BOX_AREA = 0.0
+DEFAULT_MAX_BOX_AREA = 0.3  # boxes covering more of the frame are false positives
+
+
+class DetectionConfig:
+    """Per-camera detection settings.
+
+    ``regions`` is a list of polygons in relative coordinates
+    (``[[x, y], ...]`` with 0..1 values); a rectangle can be given as
+    ``[x1, y1, x2, y2]``. Detection runs only on the bounding crop of each
+    region, with pixels outside the polygon blanked, and only detections
+    whose centre falls inside a region are kept. ``inference_size`` is the
+    YOLO input size (``imgsz``); ``None`` keeps the model default. The box
+    area limits are fractions of the full frame and apply to the box
+    detector.
+    """
+
+    def __init__(self, inference_size=None, regions=None,
+                 min_box_area=None, max_box_area=None):
+        """Raises ``ValueError`` for settings that cannot be used."""
+        self.inference_size = self._size(inference_size)
+        if regions is not None and not isinstance(regions, (list, tuple)):
+            raise ValueError("Regions must be a list")
+        self.regions = [self._polygon(r) for r in regions or []]
+        self.min_box_area = self._area(DEFAULT_MIN_BOX_AREA if min_box_area is None else min_box_area)
+        self.max_box_area = self._area(DEFAULT_MAX_BOX_AREA if max_box_area is None else max_box_area)
+        if self.min_box_area > self.max_box_area:
+            raise ValueError("The minimum box area must not exceed the maximum")
+
+    @classmethod
+    def from_camera(cls, camera):
+        if camera is None:
+            return cls()
+        return cls(camera.inference_size, camera.roi, camera.min_box_area, camera.max_box_area)
+
+    @staticmethod
+    def _size(value):
+        if value is None:
+            return None
+        try:
+            size = int(value)
+        except (TypeError, ValueError):
+            size = None
+        if size is None or size != value or size <= 0 or size % 32:
+            raise ValueError("The inference size must be a positive multiple of 32")
+        return size
+
+    @staticmethod
+    def _area(value):
+        try:
+            area = float(value)
+        except (TypeError, ValueError):
+            area = None
+        if isinstance(value, bool) or area is None or not 0 <= area <= 1:
+            raise ValueError("Box areas must be fractions between 0 and 1")
+        return area
+
+    @staticmethod
+    def _polygon(region):
+        if len(region) == 4 and all(isinstance(v, (int, float)) for v in region):
+            x1, y1, x2, y2 = region
+            region = [[x1, y1], [x2, y1], [x2, y2], [x1, y2]]
+        polygon = np.array(region, dtype=np.float32)
+        if polygon.ndim != 2 or polygon.shape[1] != 2 or len(polygon) < 3:
+            raise ValueError("A region needs at least three [x, y] points")
+        if (polygon < 0).any() or (polygon > 1).any():
+            raise ValueError("Region coordinates must be between 0 and 1")
+        if cv2.contourArea(polygon) == 0:
+            raise ValueError("A region must enclose a non-zero area")
+        return polygon
+
+    def _pixels(self, polygon, shape):
+        h, w = shape[:2]
+        return np.round(polygon * [w, h]).astype(np.int32)
+
+    def crops(self, frame):
+        """``(x_offset, y_offset, crop)`` for each region, or the whole frame."""
+        if not self.regions:
+            return [(0, 0, frame)]
+        out = []
+        for polygon in self.regions:
+            pts = self._pixels(polygon, frame.shape)
+            x, y, w, h = cv2.boundingRect(pts)
+            if w == 0 or h == 0:
+                continue
+            crop = frame[y:y + h, x:x + w]
+            if len(polygon) != 4 or not _is_axis_aligned(pts):
+                mask = np.zeros(crop.shape[:2], dtype=np.uint8)
+                cv2.fillPoly(mask, [pts - [x, y]], 255)
+                crop = cv2.bitwise_and(crop, crop, mask=mask)
+            out.append((x, y, crop))
+        return out
+
+    def accept(self, name, bbox, shape):
+        x1, y1, x2, y2 = bbox
+        if name == "box":
+            area = (x2 - x1) * (y2 - y1) / float(shape[0] * shape[1])
+            if area < self.min_box_area or area > self.max_box_area:
+                return False
+        if not self.regions:
+            return True
+        center = ((x1 + x2) / 2.0, (y1 + y2) / 2.0)
+        return any(
+            cv2.pointPolygonTest(self._pixels(p, shape).astype(np.float32), center, False) >= 0
+            for p in self.regions
+        )
+
+
+def _is_axis_aligned(pts):
+    return len({int(x) for x, _ in pts}) == 2 and len({int(y) for _, y in pts}) == 2
@@ -0,0 +1,123 @@
+import gzip
+import json
+import os
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+# --- CONFIG ---
+COLD_STORAGE_DIR = os.getenv("COLD_STORAGE_DIR", os.path.join(os.path.dirname(__file__), "cold_storage"))
+PARTITION_MONTHS_AHEAD = 3  # monthly partitions created in advance on Postgres
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, n):
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month:%Y%m}"
+
+
+def partition_ddl(table, month):
+    """Postgres DDL for the monthly range partition of ``table`` holding ``month``."""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def partition_month(table, name):
+    """Month of a partition created by :func:`partition_ddl`, or ``None``."""
+    prefix = f"{table}_p"
+    if not name.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):], "%Y%m").date()
+    except ValueError:
+        return None
+
+
+def naive_utc(value):
+    """Naive UTC datetime from a datetime or ISO string; naive input is taken as UTC."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return naive_utc(value).isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def cold_path(table, month, root=None):
+    return os.path.join(root or COLD_STORAGE_DIR, table, f"{month:%Y-%m}.ndjson.gz")
+
+
+def append_cold_rows(table, rows, column, root=None):
+    """Append ``rows`` (mappings) to ``<table>/<YYYY-MM>.ndjson.gz`` by ``column``'s month.
+
+    Each call adds one gzip member per file, which ``gzip.open`` reads back
+    as a single stream. Returns ``{month: rows written}``.
+    """
+    by_month = defaultdict(list)
+    for row in rows:
+        by_month[month_start(row[column])].append(row)
+
+    for month, month_rows in by_month.items():
+        path = cold_path(table, month, root)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            for row in month_rows:
+                f.write(json.dumps(dict(row), default=_json_default) + "\n")
+    return {month: len(month_rows) for month, month_rows in by_month.items()}
+
+
+def cold_months(table, root=None):
+    folder = os.path.join(root or COLD_STORAGE_DIR, table)
+    if not os.path.isdir(folder):
+        return []
+    months = []
+    for name in os.listdir(folder):
+        if name.endswith(".ndjson.gz"):
+            months.append(datetime.strptime(name[:7], "%Y-%m").date())
+    return sorted(months)
+
+
+def read_cold_rows(table, column, since=None, until=None, root=None):
+    """Rows of ``table`` from cold storage with ``since <= column < until`` (datetimes).
+
+    Only the monthly files overlapping the range are opened. Values come
+    back as stored, so dates and decimals are strings. A row exported twice
+    (a compaction interrupted after writing) is returned once.
+    """
+    since, until = naive_utc(since), naive_utc(until)
+    seen = set()
+    for month in cold_months(table, root):
+        if since and add_months(month, 1) <= month_start(since):
+            continue
+        if until and month > until.date():
+            continue
+        with gzip.open(cold_path(table, month, root), "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                at = naive_utc(row[column]) if row.get(column) else None
+                if since and (at is None or at < since):
+                    continue
+                if until and (at is None or at >= until):
+                    continue
+                if row.get("id") in seen:
+                    continue
+                seen.add(row.get("id"))
+                yield row
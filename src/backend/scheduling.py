@@ -0,0 +1,136 @@
+import bisect
+import heapq
+from datetime import datetime, timedelta
+
+# --- CONFIG ---
+MAINTENANCE_HOURS = 8.0  # length of a line's maintenance window
+
+
+class Line:
+    """A production line as the scheduler sees it.
+
+    A line with ``product_id`` only makes that product; one without takes
+    anything. ``maintenance`` is a list of ``(start, end)`` windows in which
+    no job may run; slots of fixed jobs are added to ``blocked`` with them.
+    """
+
+    def __init__(self, id, capacity_per_hour, available_from, product_id=None, maintenance=()):
+        self.id = id
+        self.capacity_per_hour = capacity_per_hour
+        self.available_from = available_from
+        self.product_id = product_id
+        self.maintenance = sorted(maintenance)
+        self.blocked = list(self.maintenance)
+
+    def duration(self, quantity):
+        return timedelta(hours=quantity / self.capacity_per_hour)
+
+    def fit(self, start, duration):
+        """Earliest start at or after ``start`` clear of maintenance and fixed jobs."""
+        for window_start, window_end in self.blocked:
+            if start < window_end and start + duration > window_start:
+                start = window_end
+        return start
+
+    def reserve(self, start, end):
+        bisect.insort(self.blocked, (start, end))
+
+
+class Job:
+    """A quantity of a product to make.
+
+    ``line_id`` pins the job to that line. With ``start`` as well the job is
+    fixed: it keeps that slot and other jobs are placed around it. Pins to a
+    line that is not being scheduled are ignored.
+    """
+
+    def __init__(self, id, product_id, quantity, release, due=None, priority=0, kind="run",
+                 line_id=None, start=None):
+        self.id = id
+        self.product_id = product_id
+        self.quantity = quantity
+        self.release = release
+        self.due = due
+        self.priority = priority
+        self.kind = kind
+        self.line_id = line_id
+        self.start = start
+
+
+def _assignment(job, line, start, end, fixed=False):
+    return {
+        "jobId": job.id,
+        "kind": job.kind,
+        "productId": job.product_id,
+        "quantity": job.quantity,
+        "lineId": line.id,
+        "start": start,
+        "end": end,
+        "due": job.due,
+        "late": job.due is not None and end > job.due,
+        "fixed": fixed,
+    }
+
+
+def schedule(lines, jobs):
+    """List-schedule ``jobs`` onto ``lines``.
+
+    Jobs come off a priority queue ordered by due date, then priority, then
+    release time. Each one goes to the eligible line where it would finish
+    earliest, after that line's previous job and clear of its maintenance
+    windows and fixed jobs. Fixed jobs are placed first, as given. Jobs are
+    not split. Returns ``(assignments, unscheduled)``; assignments are dicts
+    in scheduling order.
+    """
+    lines = [line for line in lines if line.capacity_per_hour and line.capacity_per_hour > 0]
+    general = [line for line in lines if line.product_id is None]
+    dedicated = {}
+    for line in lines:
+        if line.product_id is not None:
+            dedicated.setdefault(line.product_id, []).append(line)
+    free = {line.id: line.available_from for line in lines}
+    by_id = {line.id: line for line in lines}
+
+    assignments, unscheduled, queue = [], [], []
+    for i, job in enumerate(jobs):
+        line = by_id.get(job.line_id)
+        if line is not None and job.start is not None:
+            end = job.start + line.duration(job.quantity)
+            line.reserve(job.start, end)
+            assignments.append(_assignment(job, line, job.start, end, fixed=True))
+        else:
+            queue.append((job.due or datetime.max, -job.priority, job.release, i, job))
+    heapq.heapify(queue)
+
+    while queue:
+        job = heapq.heappop(queue)[-1]
+        best = None
+        if job.line_id in by_id:
+            candidates = [by_id[job.line_id]]
+        else:
+            candidates = dedicated.get(job.product_id, []) + general
+        for line in candidates:
+            duration = line.duration(job.quantity)
+            start = line.fit(max(free[line.id], job.release), duration)
+            if best is None or start + duration < best[2]:
+                best = (line, start, start + duration)
+        if best is None:
+            unscheduled.append(job)
+            continue
+
+        line, start, end = best
+        free[line.id] = end
+        assignments.append(_assignment(job, line, start, end))
+    return assignments, unscheduled
+
+
+def line_summary(lines, assignments):
+    """Busy hours, job count and last end time per line."""
+    summary = {line.id: {"lineId": line.id, "jobs": 0, "busyHours": 0.0, "freeFrom": line.available_from}
+               for line in lines}
+    for a in assignments:
+        entry = summary[a["lineId"]]
+        entry["jobs"] += 1
+        entry["busyHours"] += (a["end"] - a["start"]).total_seconds() / 3600
+        entry["freeFrom"] = max(entry["freeFrom"], a["end"])
+    return list(summary.values())
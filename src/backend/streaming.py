@@ -0,0 +1,144 @@
+import threading
+import time
+
+import cv2
+
+# --- CONFIG ---
+# Requested scale/quality are snapped to these tiers so viewers share encodes.
+SCALE_TIERS = (1.0, 0.75, 0.5, 0.25)
+QUALITY_TIERS = (95, 80, 60, 40)
+DEFAULT_MAX_FPS = 30.0
+WAIT_TIMEOUT = 5.0
+
+
+def _nearest(value, tiers):
+    return min(tiers, key=lambda t: abs(t - value))
+
+
+def stream_tier(scale=None, quality=None):
+    """Snap requested ``scale``/``quality`` to a shared ``(scale, quality)`` tier."""
+    scale = _nearest(float(scale), SCALE_TIERS) if scale else SCALE_TIERS[0]
+    quality = _nearest(int(quality), QUALITY_TIERS) if quality else QUALITY_TIERS[0]
+    return scale, quality
+
+
+def encode_jpeg(frame, tier):
+    scale, quality = tier
+    if scale != 1.0:
+        frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes() if ok else None
+
+
+def multipart(frame_bytes):
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+
+
+class FrameHub:
+    """One producer per camera, any number of viewers.
+
+    A background thread pulls annotated frames from ``frame_source()`` while
+    at least one viewer is subscribed, and keeps only the newest one. Each
+    viewer asks for a tier; the first viewer to need a tier for a frame
+    encodes it and the rest reuse those bytes. A slow viewer simply picks up
+    the newest frame when it is ready again, so nothing queues up behind it.
+    """
+
+    def __init__(self, frame_source):
+        self.frame_source = frame_source
+        self.listeners = []  # called with each new raw frame, e.g. thumbnails
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._frame = None
+        self._encoded = {}  # tier -> jpeg bytes for the current frame
+        self._encode_lock = threading.Lock()
+        self._viewers = 0
+        self._producer = None
+        self._finished = False
+
+    @property
+    def viewers(self):
+        return self._viewers
+
+    def _produce(self):
+        idle = False
+        source = self.frame_source()
+        try:
+            for frame in source:
+                for listener in self.listeners:
+                    listener(frame)
+                with self._cond:
+                    self._seq += 1
+                    self._frame = frame
+                    self._encoded = {}
+                    self._cond.notify_all()
+                    if self._viewers == 0:
+                        idle = True
+                        break
+        finally:
+            source.close()  # releases the camera
+            with self._cond:
+                self._producer = None
+                if idle and self._viewers:
+                    self._ensure_producer()  # a viewer joined while we were stopping
+                else:
+                    self._finished = True
+                self._cond.notify_all()
+
+    def _ensure_producer(self):
+        if self._producer is None:
+            self._finished = False
+            self._frame = None  # don't show a stale frame from a previous run
+            self._producer = threading.Thread(target=self._produce, daemon=True)
+            self._producer.start()
+
+    def latest(self, tier, after_seq):
+        """Wait for a frame newer than ``after_seq``; returns ``(seq, jpeg)``."""
+        with self._cond:
+            while self._seq <= after_seq and not self._finished:
+                self._cond.wait(WAIT_TIMEOUT)
+            if self._seq <= after_seq:
+                return after_seq, None
+            seq, frame, encoded = self._seq, self._frame, self._encoded
+
+        with self._encode_lock:
+            if tier not in encoded:
+                encoded[tier] = encode_jpeg(frame, tier)
+        return seq, encoded[tier]
+
+    def subscribe(self, tier, max_fps=DEFAULT_MAX_FPS):
+        """Generator of JPEG bytes for one viewer, at most ``max_fps``."""
+        interval = 1.0 / max_fps if max_fps else 0
+        with self._cond:
+            self._viewers += 1
+            self._ensure_producer()
+            # start from the current frame if there is one
+            seq = self._seq - 1 if self._frame is not None else self._seq
+        try:
+            while True:
+                started = time.monotonic()
+                seq, jpeg = self.latest(tier, seq)
+                if jpeg is None:
+                    if self._finished:
+                        return
+                    continue
+                yield jpeg
+                delay = interval - (time.monotonic() - started)
+                if delay > 0:
+                    time.sleep(delay)
+        finally:
+            with self._cond:
+                self._viewers -= 1
+
+
+def throttle(frames, max_fps=DEFAULT_MAX_FPS):
+    """Rate-limit an iterator of pre-encoded frames, skipping ones in between."""
+    interval = 1.0 / max_fps if max_fps else 0
+    next_at = 0.0
+    for frame in frames:
+        now = time.monotonic()
+        if now < next_at:
+            continue
+        next_at = now + interval
+        yield frame
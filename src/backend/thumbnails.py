@@ -0,0 +1,119 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import cv2
+
+# --- CONFIG ---
+THUMBNAIL_WIDTH = 320
+THUMBNAIL_QUALITY = 70
+REFRESH_INTERVAL = 30.0  # seconds a thumbnail stays fresh
+MAX_THUMBNAILS = 256
+
+
+class Thumbnail:
+    def __init__(self, jpeg):
+        self.jpeg = jpeg
+        self.etag = hashlib.sha1(jpeg).hexdigest()
+        self.last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+        self.created = time.monotonic()
+
+
+def make_thumbnail(frame, width=THUMBNAIL_WIDTH, quality=THUMBNAIL_QUALITY):
+    h, w = frame.shape[:2]
+    if w > width:
+        frame = cv2.resize(frame, (width, int(h * width / w)), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return Thumbnail(buffer.tobytes()) if ok else None
+
+
+class ThumbnailCache:
+    """Bounded LRU of the latest small JPEG per camera."""
+
+    def __init__(self, max_entries=MAX_THUMBNAILS, max_age=REFRESH_INTERVAL):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, camera_id):
+        with self._lock:
+            thumb = self._entries.get(camera_id)
+            if thumb is not None:
+                self._entries.move_to_end(camera_id)
+            return thumb
+
+    def put(self, camera_id, frame):
+        thumb = make_thumbnail(frame)
+        if thumb is None:
+            return None
+        with self._lock:
+            old = self._entries.get(camera_id)
+            if old is not None and old.etag == thumb.etag:
+                thumb = old  # unchanged picture: keep ETag and Last-Modified
+                thumb.created = time.monotonic()
+            self._entries[camera_id] = thumb
+            self._entries.move_to_end(camera_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return thumb
+
+    def is_stale(self, camera_id):
+        thumb = self.get(camera_id)
+        return thumb is None or time.monotonic() - thumb.created >= self.max_age
+
+    def listener(self, camera_id):
+        """Frame callback for a live stream; refreshes at most every ``max_age``."""
+        def on_frame(frame):
+            if self.is_stale(camera_id):
+                self.put(camera_id, frame)
+        return on_frame
+
+
+def capture_snapshot(source):
+    cam = cv2.VideoCapture(source)
+    try:
+        ok, frame = cam.read()
+        return frame if ok else None
+    finally:
+        cam.release()
+
+
+class ThumbnailRefresher:
+    """Background thread keeping every camera's thumbnail fresh.
+
+    ``sources()`` returns ``{camera_id: capture source}``. Cameras whose
+    thumbnail is still fresh, for instance because a live stream is feeding
+    it, are skipped, so this only opens cameras nobody is watching.
+    """
+
+    def __init__(self, cache, sources, interval=REFRESH_INTERVAL):
+        self.cache = cache
+        self.sources = sources
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="thumbnails", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def refresh(self):
+        for camera_id, source in self.sources().items():
+            if self.cache.is_stale(camera_id):
+                frame = capture_snapshot(source)
+                if frame is not None:
+                    self.cache.put(camera_id, frame)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print("Thumbnail refresh failed:", e)
+            self._stop.wait(self.interval)
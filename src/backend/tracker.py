@@ -0,0 +1,106 @@
+import itertools
+
+from detector_backends import box_iou
+
+# --- CONFIG ---
+KEYFRAME_INTERVAL = 5  # run full detection on every Nth frame
+MATCH_IOU = 0.3
+MAX_MISSED = 2         # keyframes a track may go undetected before it is dropped
+
+
+class Track:
+    _ids = itertools.count(1)
+
+    def __init__(self, cls, conf, bbox):
+        self.id = next(self._ids)
+        self.cls = cls
+        self.conf = conf
+        self.bbox = [float(v) for v in bbox]  # propagated position
+        self.anchor = self.bbox               # position at the last detection
+        self.velocity = [0.0, 0.0]            # pixels per frame
+        self.missed = 0
+
+    def correct(self, conf, bbox, frames):
+        old_cx, old_cy = _center(self.anchor)
+        new_cx, new_cy = _center(bbox)
+        self.velocity = [(new_cx - old_cx) / frames, (new_cy - old_cy) / frames]
+        self.conf = conf
+        self.bbox = self.anchor = [float(v) for v in bbox]
+        self.missed = 0
+
+    def advance(self):
+        dx, dy = self.velocity
+        x1, y1, x2, y2 = self.bbox
+        self.bbox = [x1 + dx, y1 + dy, x2 + dx, y2 + dy]
+
+    def as_tuple(self):
+        return self.cls, self.conf, [int(round(v)) for v in self.bbox], self.id
+
+
+def _center(bbox):
+    return (bbox[0] + bbox[2]) / 2.0, (bbox[1] + bbox[3]) / 2.0
+
+
+class IoUTracker:
+    """Keyframe detection with cheap box propagation in between.
+
+    :meth:`step` says whether the current frame is a keyframe. On keyframes
+    the caller runs the detectors and passes ``(cls, conf, xyxy)`` detections
+    to :meth:`update`, which associates them with the tracks' propagated
+    boxes by IoU (same class only) so objects keep their track id. On other
+    frames :meth:`predict` moves every track along its last observed velocity.
+    Both return ``(cls, conf, xyxy, track_id)`` tuples.
+    """
+
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL, match_iou=MATCH_IOU,
+                 max_missed=MAX_MISSED):
+        self.keyframe_interval = keyframe_interval
+        self.match_iou = match_iou
+        self.max_missed = max_missed
+        self.tracks = []
+        self._frame = -1
+        self._last_keyframe = 0
+
+    def step(self):
+        self._frame += 1
+        return self._frame % self.keyframe_interval == 0
+
+    def update(self, detections):
+        frames = max(1, self._frame - self._last_keyframe)
+        self._last_keyframe = self._frame
+
+        pairs = sorted(
+            ((box_iou(t.bbox, d[2]), ti, di)
+             for ti, t in enumerate(self.tracks)
+             for di, d in enumerate(detections) if t.cls == d[0]),
+            reverse=True,
+        )
+        used_tracks, used_dets = set(), set()
+        for iou, ti, di in pairs:
+            if iou < self.match_iou:
+                break
+            if ti in used_tracks or di in used_dets:
+                continue
+            used_tracks.add(ti)
+            used_dets.add(di)
+            cls, conf, bbox = detections[di]
+            self.tracks[ti].correct(conf, bbox, frames)
+
+        survivors = []
+        for ti, t in enumerate(self.tracks):
+            if ti not in used_tracks:
+                t.missed += 1
+                t.velocity = [0.0, 0.0]
+                t.bbox = t.anchor
+            if t.missed <= self.max_missed:
+                survivors.append(t)
+        for di, (cls, conf, bbox) in enumerate(detections):
+            if di not in used_dets:
+                survivors.append(Track(cls, conf, bbox))
+        self.tracks = survivors
+        return [t.as_tuple() for t in self.tracks if t.missed == 0]
+
+    def predict(self):
+        for t in self.tracks:
+            t.advance()
+        return [t.as_tuple() for t in self.tracks if t.missed == 0]
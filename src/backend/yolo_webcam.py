@@ -1,67 +1,114 @@
 import uuid
 import os
-import requests
+import sys
 import time
+import requests
+import threading
 from datetime import datetime, timezone
-try:
-    from ultralytics import YOLO
-except ImportError:
-    YOLO = None
 import cv2
 
+from detector_backends import load_detector, resolve_backend
+from inference_server import InferenceServer
+from alert_engine import IncidentTracker
+from tracker import IoUTracker
+from regions import DetectionConfig
+
 # --- CONFIG ---
 BACKEND_URL = "http://localhost:5000"
 LOGIN_URL = "http://localhost:5000/api/auth/login"
 ALERT_URL = "http://localhost:5000/api/alerts"
 
 CAMERA_ID = "cam_warehouse"
-POST_INTERVAL = 3  
+BATCHED_INFERENCE = os.getenv("INFERENCE_BATCHING", "false").lower() == "true"
+TRACKING = os.getenv("VISION_TRACKING", "false").lower() == "true"
+KEYFRAME_INTERVAL = int(os.getenv("VISION_KEYFRAME_INTERVAL", 5))
 
 # --- MODEL PLACEHOLDERS ---
-_MODEL = None
-_BOX_MODEL = None
-_face_net = None
+_MODELS = {}  # (weights path, backend) -> loaded detector
+_face_net = None  # ((backend, target), cv2.dnn.Net)
+_face_lock = threading.Lock()
+_inference_server = None
+_server_lock = threading.Lock()
+_trackers = {}  # camera id -> IoUTracker
+_tracker_lock = threading.Lock()
 
-# --- INIT YOLO MODELS ---
-def get_box_model():
-    global _BOX_MODEL
-    if _BOX_MODEL is None:
-        base_dir = os.path.dirname(__file__)
-        model_path = os.path.join(base_dir, "runs", "detect", "train4", "weights", "best.pt")
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(f"YOLO model not found at {model_path}")
-        _BOX_MODEL = YOLO(model_path)
-    return _BOX_MODEL
-
-def get_fire_smoke_model():
-    global _MODEL
-    if _MODEL is None:
-        base_dir = os.path.dirname(__file__)
-        model_path = os.path.join(base_dir, "models", "best.pt")
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(f"YOLO model not found at {model_path}")
-        _MODEL = YOLO(model_path)
-    return _MODEL
+BOX_WEIGHTS = os.path.join(os.path.dirname(__file__), "runs", "detect", "train4", "weights", "best.pt")
+FIRE_SMOKE_WEIGHTS = os.path.join(os.path.dirname(__file__), "models", "best.pt")
 
-def get_face_net():
+# --- INIT YOLO MODELS ---
+def _get_model(weights_path, backend=None):
+    key = (weights_path, resolve_backend(backend))
+    if key not in _MODELS:
+        _MODELS[key] = load_detector(weights_path, key[1])
+    return _MODELS[key]
+
+def get_box_model(backend=None):
+    return _get_model(BOX_WEIGHTS, backend)
+
+def get_fire_smoke_model(backend=None):
+    return _get_model(FIRE_SMOKE_WEIGHTS, backend)
+
+def get_inference_server():
+    global _inference_server
+    with _server_lock:
+        if _inference_server is None:
+            _inference_server = InferenceServer()
+    return _inference_server
+
+def predict(model, frame, conf, imgsz=None):
+    """Run one frame through ``model``, batched across cameras when enabled."""
+    if BATCHED_INFERENCE:
+        return [get_inference_server().predict(model, frame, conf, imgsz)]
+    if imgsz:
+        return model.predict(source=frame, conf=conf, imgsz=imgsz, verbose=False)
+    return model.predict(source=frame, conf=conf, verbose=False)
+
+# OpenCV DNN backend/target for the face detector, e.g. FACE_DNN_BACKEND=openvino
+# FACE_DNN_TARGET=cpu. FACE_DNN_THREADS caps OpenCV's worker threads.
+FACE_DNN_BACKENDS = {
+    "default": cv2.dnn.DNN_BACKEND_DEFAULT,
+    "opencv": cv2.dnn.DNN_BACKEND_OPENCV,
+    "openvino": cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE,
+    "cuda": cv2.dnn.DNN_BACKEND_CUDA,
+}
+FACE_DNN_TARGETS = {
+    "cpu": cv2.dnn.DNN_TARGET_CPU,
+    "opencl": cv2.dnn.DNN_TARGET_OPENCL,
+    "opencl_fp16": cv2.dnn.DNN_TARGET_OPENCL_FP16,
+    "cuda": cv2.dnn.DNN_TARGET_CUDA,
+    "cuda_fp16": cv2.dnn.DNN_TARGET_CUDA_FP16,
+}
+FACE_DNN_BACKEND = os.getenv("FACE_DNN_BACKEND", "default")
+FACE_DNN_TARGET = os.getenv("FACE_DNN_TARGET", "cpu")
+FACE_DNN_THREADS = int(os.getenv("FACE_DNN_THREADS", 0))  # 0 = OpenCV default
+
+def get_face_net(backend=None, target=None, threads=None):
     global _face_net
-    if _face_net is None:
+    backend = backend or FACE_DNN_BACKEND
+    target = target or FACE_DNN_TARGET
+    threads = FACE_DNN_THREADS if threads is None else threads
+    if _face_net is None or _face_net[0] != (backend, target):
         proto_path = os.path.join(os.path.dirname(__file__), "deploy.prototxt")
         model_path = os.path.join(os.path.dirname(__file__), "res10_300x300_ssd_iter_140000.caffemodel")
         if not os.path.exists(proto_path):
             raise FileNotFoundError(f"Prototxt not found: {proto_path}")
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Caffe model not found: {model_path}")
-        _face_net = cv2.dnn.readNetFromCaffe(proto_path, model_path)
-    return _face_net
+        net = cv2.dnn.readNetFromCaffe(proto_path, model_path)
+        net.setPreferableBackend(FACE_DNN_BACKENDS[backend])
+        net.setPreferableTarget(FACE_DNN_TARGETS[target])
+        _face_net = ((backend, target), net)
+    if threads:
+        cv2.setNumThreads(threads)
+    return _face_net[1]
 
 
 # --- INIT Face Detector ---
 FACE_PROTO = "deploy.prototxt"
 FACE_MODEL = "res10_300x300_ssd_iter_140000.caffemodel"
 
-
-last_post = 0  # keep track of last alert time
+# Detections become incidents: one alert row per incident, updated in place.
+incidents = IncidentTracker()
 
 
 def get_jwt_token(username="admin", password="password123"):
@@ -82,15 +129,15 @@ def get_headers():
     return {"Authorization": f"Bearer {TOKEN}", "Content-Type": "application/json"}
 
 # --- ALERT POST FUNCTION ---
-def post_alert(alert_type, severity, message, metadata=None):
+def post_alert(alert_type, severity, message, metadata=None, alert_id=None, camera_id=CAMERA_ID):
     HEADERS = get_headers()
     payload = {
-        "id": str(uuid.uuid4()),                # unique ID
+        "id": alert_id or str(uuid.uuid4()),    # unique ID
         "type": alert_type,                     # e.g. "fire", "smoke", "box", "face"
         "severity": severity,                   # e.g. "critical", "medium"
         "title": f"{alert_type.capitalize()} Alert",
         "description": message,
-        "camera_id": CAMERA_ID,                 # 👈 ties alert to the camera
+        "camera_id": camera_id,                 # 👈 ties alert to the camera
         "status": "new",
         "ai_confidence": float(metadata.get("conf", 0)) if metadata else 0,
         "data": metadata or {},                 # bbox, faces, etc.
@@ -104,97 +151,195 @@ def post_alert(alert_type, severity, message, metadata=None):
     except Exception as e:
         print("Error posting alert:", e)
 
+def update_alert(alert_id, message, metadata):
+    payload = {
+        "description": message,
+        "ai_confidence": float(metadata["incident"]["peak_conf"]),
+        "data": metadata,
+    }
+    try:
+        r = requests.put(f"{ALERT_URL}/{alert_id}", json=payload, headers=get_headers(), timeout=5)
+        print("Alert updated:", r.status_code, message)
+    except Exception as e:
+        print("Error updating alert:", e)
 
+# alert type and severity per detected class
+ALERT_CLASSES = {
+    "fire": ("fire", "critical"),
+    "smoke": ("fire", "critical"),
+    "box": ("box", "critical"),
+}
 
-# --- FACE DETECTION FUNCTION ---
-def detect_faces(frame, conf_thresh=0.6):
-    face_net = get_face_net()
-    h, w = frame.shape[:2]
-    blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 1.0,
-                                 (300, 300), (104.0, 177.0, 123.0))
-    face_net.setInput(blob)
-    detections = face_net.forward()
-    faces = []
-    for i in range(detections.shape[2]):
-        confidence = detections[0, 0, i, 2]
-        if confidence >= conf_thresh:
-            box = detections[0, 0, i, 3:7] * [w, h, w, h]
-            x1, y1, x2, y2 = box.astype(int)
-            faces.append({"bbox": [x1, y1, x2 - x1, y2 - y1], "confidence": float(confidence)})
-
-    return faces
-
+def publish_incident_events(events):
+    for event, inc in events:
+        alert_type, severity = ALERT_CLASSES[inc.cls]
+        data = inc.to_data()
+        message = (f"{inc.cls.capitalize()} detected "
+                   f"(peak conf={inc.peak_conf:.2f}, hits={inc.hits})")
+        if event == "open":
+            post_alert(alert_type, severity, message, data, alert_id=inc.id, camera_id=inc.camera_id)
+        else:
+            update_alert(inc.id, message, data)
 
-# --- MAIN FUNCTION: run AI on a single frame ---
-def run_ai_on_frame(frame):
-    global last_post
 
-    # Fire/Smoke detection
-    model = get_fire_smoke_model()
 
+# --- FACE DETECTION FUNCTION ---
+def detect_faces(frames, conf_thresh=0.6):
+    """Detect faces in one frame, or in a list of frames with one forward pass.
+
+    Returns a list of faces for a single frame and a list of such lists for
+    a list of frames.
+    """
+    single = not isinstance(frames, (list, tuple))
+    if single:
+        frames = [frames]
+    elif not frames:
+        return []
 
-    results_fire = model.predict(source=frame, conf=0.3, verbose=False)
-    for r in results_fire:
+    face_net = get_face_net()
+    blob = cv2.dnn.blobFromImages([cv2.resize(f, (300, 300)) for f in frames], 1.0,
+                                  (300, 300), (104.0, 177.0, 123.0))
+    with _face_lock:  # a Net is not safe to share between camera threads
+        face_net.setInput(blob)
+        detections = face_net.forward()
+
+    # rows are [image index, class, confidence, x1, y1, x2, y2] (relative)
+    faces = [[] for _ in frames]
+    for det in detections[0, 0]:
+        idx, confidence = int(det[0]), det[2]
+        if idx >= 0 and confidence >= conf_thresh:
+            h, w = frames[idx].shape[:2]
+            box = det[3:7] * [w, h, w, h]
+            x1, y1, x2, y2 = box.astype(int)
+            faces[idx].append({"bbox": [x1, y1, x2 - x1, y2 - y1], "confidence": float(confidence)})
+
+    return faces[0] if single else faces
+
+
+def benchmark_face_batching(batch_sizes=(1, 4, 8, 16), repeats=5):
+    """Frames/sec of per-frame ``detect_faces`` calls vs one batched call."""
+    import numpy as np
+
+    frame = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    detect_faces(frame)  # warm up
+    print(f"{'batch':>6} {'per-frame fps':>14} {'batched fps':>12}")
+    for n in batch_sizes:
+        frames = [frame.copy() for _ in range(n)]
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for f in frames:
+                detect_faces(f)
+        per_frame = n * repeats / (time.perf_counter() - start)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            detect_faces(frames)
+        batched = n * repeats / (time.perf_counter() - start)
+        print(f"{n:>6} {per_frame:>14.1f} {batched:>12.1f}")
+
+
+# --- YOLO DETECTION FUNCTIONS ---
+def detect_fire_smoke(frame, backend=None, imgsz=None):
+    model = get_fire_smoke_model(backend)
+    detections = []
+    for r in predict(model, frame, 0.3, imgsz):
         for b in r.boxes:
-            cls = int(b.cls)
-            name = model.names[cls].lower()
+            name = model.names[int(b.cls)].lower()
             conf = float(b.conf)
-
-            if name in ["fire", "smoke"]:
-                if name == "smoke" and conf < 0.6:
-                    continue
-                x1, y1, x2, y2 = map(int, b.xyxy[0])
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (0,0,255), 2)
-                cv2.putText(frame, f"{name.upper()} {conf:.2f}", (x1, y1-6),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0,0,255), 2)
-                if (time.time() - last_post) > POST_INTERVAL:
-                    post_alert(
-                        "fire",
-                        "critical",
-                        f"Fire detected (conf={conf:.2f})",
-                        {"bbox": [x1, y1, x2-x1, y2-y1], "conf": conf}
-                    )
-                    last_post = time.time()
-    # Box detection\
-    box_model = get_box_model()
-    results_box = box_model.predict(source=frame, conf=0.6, verbose=False)
-    for r in results_box:
+            if name not in ["fire", "smoke"]:
+                continue
+            if name == "smoke" and conf < 0.6:
+                continue
+            detections.append((name, conf, list(map(int, b.xyxy[0]))))
+    return detections
+
+def detect_boxes(frame, backend=None, imgsz=None):
+    box_model = get_box_model(backend)
+    detections = []
+    for r in predict(box_model, frame, 0.6, imgsz):
         for b in r.boxes:
-            cls = int(b.cls)
-            name = box_model.names[cls].lower()
+            name = box_model.names[int(b.cls)].lower()
             conf = float(b.conf)
+            if name != "box":
+                continue
+            detections.append((name, conf, list(map(int, b.xyxy[0]))))
+    return detections
+
+def detect_all(frame, backend=None, config=None):
+    """Run every detector on the camera's regions of interest.
+
+    Returns ``(name, conf, [x1, y1, x2, y2])`` in full-frame coordinates,
+    filtered by the camera's region and box-area settings.
+    """
+    config = config or DetectionConfig()
+    crops = config.crops(frame)
+    if not crops:
+        return []  # no region left to run on, and blobFromImages([]) raises
+    detections = []
+    for (dx, dy, crop), faces in zip(crops, detect_faces([c for _, _, c in crops])):
+        found = (detect_fire_smoke(crop, backend, config.inference_size)
+                 + detect_boxes(crop, backend, config.inference_size))
+        for f in faces:
+            x, y, w, h = f["bbox"]
+            found.append(("face", f["confidence"], [x, y, x + w, y + h]))
+        for name, conf, (x1, y1, x2, y2) in found:
+            bbox = [x1 + dx, y1 + dy, x2 + dx, y2 + dy]
+            if config.accept(name, bbox, frame.shape):
+                detections.append((name, conf, bbox))
+    return detections
+
+
+# --- DRAWING ---
+COLORS = {"fire": (0, 0, 255), "smoke": (0, 0, 255), "box": (255, 0, 0), "face": (0, 255, 0)}
+
+def draw_detection(frame, name, conf, bbox, track_id=None):
+    x1, y1, x2, y2 = bbox
+    label = f"{'Face' if name == 'face' else name.upper()} {conf:.2f}"
+    if track_id is not None:
+        label += f" #{track_id}"
+    cv2.rectangle(frame, (x1, y1), (x2, y2), COLORS[name], 2)
+    cv2.putText(frame, label, (x1, y1 - 6), cv2.FONT_HERSHEY_SIMPLEX,
+                0.6 if name == "face" else 0.8, COLORS[name], 2)
+
+
+# --- TRACKING ---
+def get_tracker(camera_id):
+    with _tracker_lock:
+        if camera_id not in _trackers:
+            _trackers[camera_id] = IoUTracker(keyframe_interval=KEYFRAME_INTERVAL)
+        return _trackers[camera_id]
 
-            if name == "box":
-                x1, y1, x2, y2 = map(int, b.xyxy[0])
-                w, h = x2 - x1, y2 - y1
-                if w*h > 0.3 * frame.shape[0] * frame.shape[1]:
-                    continue  # skip giant detections
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (255,0,0), 2)
-                cv2.putText(frame, f"BOX {conf:.2f}", (x1, y1-6),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255,0,0), 2)
-            if (time.time() - last_post) > POST_INTERVAL:
-                post_alert(
-                    "box",
-                    "critical",
-                    f"Box detected (conf={conf:.2f})",
-                    {"bbox": [x1, y1, x2-x1, y2-y1], "conf": conf}
-    )
-    last_post = time.time()
-
-    # Face detection
-    faces = detect_faces(frame)
-    for f in faces:
-        x, y, w, h = f["bbox"]
-        cv2.rectangle(frame, (x, y), (x+w, y+h), (0,255,0), 2)
-        cv2.putText(frame, f"Face {f['confidence']:.2f}", (x, y-5),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
-    
 
+# --- MAIN FUNCTION: run AI on a single frame ---
+def run_ai_on_frame(frame, backend=None, camera_id=None, config=None):
+    camera_id = camera_id or CAMERA_ID
+
+    # With tracking on, the detectors only run on keyframes and boxes are
+    # propagated in between; alerts are only fed from real detections.
+    tracker = get_tracker(camera_id) if TRACKING else None
+    keyframe = tracker is None or tracker.step()
+    if not keyframe:
+        tracks = tracker.predict()
+    elif tracker is not None:
+        tracks = tracker.update(detect_all(frame, backend, config))
+    else:
+        tracks = [(name, conf, bbox, None) for name, conf, bbox in detect_all(frame, backend, config)]
+
+    events = []
+    for name, conf, bbox, track_id in tracks:
+        draw_detection(frame, name, conf, bbox, track_id)
+        if keyframe and name in ALERT_CLASSES:
+            events += incidents.observe(camera_id, name, conf, bbox, track_id=track_id)
+
+    publish_incident_events(events + incidents.expire())
     return frame
 
 
 # --- Standalone loop (only runs if you execute this file directly) ---
 if __name__ == "__main__":
+    if sys.argv[1:] == ["bench-faces"]:
+        benchmark_face_batching()
+        sys.exit()
+
     cap = cv2.VideoCapture(0)
     if not cap.isOpened():
         raise RuntimeError("Cannot open camera")
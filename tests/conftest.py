@@ -30,3 +30,21 @@ def apply_migrations():
 
 
     
+
+@pytest.fixture(scope="session")
+def auth_headers(setup_database):
+    from backend.app import User, bcrypt, create_access_token
+
+    with app.app_context():
+        if not User.query.filter_by(username="test_admin").first():
+            db.session.add(User(
+                id="test-admin",
+                username="test_admin",
+                password_hash=bcrypt.generate_password_hash("secret").decode(),
+                role="admin",
+                name="Test Admin",
+                is_active=True,
+            ))
+            db.session.commit()
+        token = create_access_token("test_admin")
+    return {"Authorization": f"Bearer {token}"}
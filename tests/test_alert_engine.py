@@ -0,0 +1,43 @@
+from backend.alert_engine import IncidentTracker
+
+
+def test_repeated_detections_update_one_incident():
+    tracker = IncidentTracker(match_iou=0.3, close_after=10, update_interval=3)
+
+    events = tracker.observe("cam1", "fire", 0.5, [0, 0, 10, 10], now=0)
+    assert [e for e, _ in events] == ["open"]
+    incident = events[0][1]
+
+    # same place, inside the update interval: no new event
+    assert tracker.observe("cam1", "fire", 0.9, [1, 1, 11, 11], now=1) == []
+    events = tracker.observe("cam1", "fire", 0.7, [1, 1, 11, 11], now=4)
+    assert events == [("update", incident)]
+    assert incident.hits == 3
+    assert incident.peak_conf == 0.9
+
+    # another class, another camera or another place is a separate incident
+    assert tracker.observe("cam1", "smoke", 0.7, [1, 1, 11, 11], now=4)[0][0] == "open"
+    assert tracker.observe("cam2", "fire", 0.7, [1, 1, 11, 11], now=4)[0][0] == "open"
+    assert tracker.observe("cam1", "fire", 0.7, [50, 50, 60, 60], now=4)[0][0] == "open"
+
+
+def test_incident_closes_after_quiet_period():
+    tracker = IncidentTracker(close_after=10)
+    (_, incident), = tracker.observe("cam1", "box", 0.8, [0, 0, 10, 10], now=0)
+    tracker.observe("cam1", "box", 0.8, [0, 0, 10, 10], now=5)
+
+    assert tracker.expire(now=14) == []
+    assert tracker.expire(now=15) == [("close", incident)]
+    data = incident.to_data()
+    assert data["incident"]["hits"] == 2
+    assert data["incident"]["open"] is False
+    assert tracker.open_incidents() == []
+
+
+def test_track_id_keeps_moving_object_in_one_incident():
+    tracker = IncidentTracker(match_iou=0.3, update_interval=0)
+    (_, incident), = tracker.observe("cam1", "box", 0.8, [0, 0, 10, 10], now=0, track_id=7)
+    # no overlap with the first box, but the same track
+    events = tracker.observe("cam1", "box", 0.8, [40, 40, 50, 50], now=1, track_id=7)
+    assert events == [("update", incident)]
+    assert incident.to_data()["track_id"] == 7
@@ -25,3 +25,815 @@ def test_add_numbers(client):
     response = client.post('/add', json={'a': -1, 'b': 4})
     json_data = response.get_json()
     assert json_data['result'] == 3
+
+
+def test_update_alert_in_place(client, auth_headers):
+    response = client.post('/api/alerts', headers=auth_headers, json={
+        'id': 'incident-1',
+        'type': 'fire',
+        'severity': 'critical',
+        'description': 'Fire detected',
+        'camera_id': 'cam1',
+        'ai_confidence': 0.5,
+        'data': {'incident': {'hits': 1}},
+    })
+    assert response.status_code == 201
+
+    response = client.put('/api/alerts/incident-1', headers=auth_headers, json={
+        'ai_confidence': 0.9,
+        'data': {'incident': {'hits': 7}},
+    })
+    assert response.status_code == 200
+
+    alerts = client.get('/api/alerts', headers=auth_headers).get_json()
+    incident = [a for a in alerts if a['id'] == 'incident-1']
+    assert len(incident) == 1
+    assert incident[0]['data'] == {'incident': {'hits': 7}}
+    assert incident[0]['aiConfidence'] == 0.9
+
+
+def test_camera_thumbnail_served_with_etag(client, auth_headers):
+    import numpy as np
+    from backend.app import Camera, db, thumbnail_cache
+
+    with app.app_context():
+        db.session.add(Camera(id='cam-thumb', name='Dock', status='online'))
+        db.session.commit()
+
+    assert client.get('/api/cameras/cam-thumb/thumbnail').status_code == 404
+
+    thumbnail_cache.put('cam-thumb', np.zeros((480, 640, 3), dtype=np.uint8))
+    cameras = client.get('/api/cameras', headers=auth_headers).get_json()
+    entry = [c for c in cameras if c['id'] == 'cam-thumb'][0]
+    assert entry['thumbnail'].endswith('/api/cameras/cam-thumb/thumbnail')
+
+    response = client.get('/api/cameras/cam-thumb/thumbnail')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/jpeg'
+    assert response.headers['Last-Modified']
+    etag = response.headers['ETag']
+
+    response = client.get('/api/cameras/cam-thumb/thumbnail', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+def test_analyze_returns_pollable_job(client, auth_headers, monkeypatch):
+    import sys
+    import time
+    import numpy as np
+    import backend.app as backend_app
+    from backend.app import Camera, db
+
+    class FakeCapture:
+        def read(self):
+            return True, np.zeros((48, 64, 3), dtype=np.uint8)
+
+        def release(self):
+            pass
+
+    monkeypatch.setattr(backend_app, 'get_camera', lambda source: FakeCapture())
+    monkeypatch.setattr(sys.modules['yolo_webcam'], 'detect_all',
+                        lambda frame, backend, config: [('fire', 0.8, [1, 2, 3, 4])], raising=False)
+    with app.app_context():
+        db.session.add(Camera(id='cam-analyze', name='Gate', status='online'))
+        db.session.commit()
+
+    assert client.post('/api/cameras/missing/analyze', headers=auth_headers, json={}).status_code == 404
+    for body in ({'mode': 'clip', 'frames': 'ten'}, {'mode': 'clip', 'interval': 'x'},
+                 {'mode': 'clip', 'interval': -1}):
+        assert client.post('/api/cameras/cam-analyze/analyze', headers=auth_headers,
+                           json=body).status_code == 400
+
+    response = client.post('/api/cameras/cam-analyze/analyze', headers=auth_headers,
+                           json={'mode': 'clip', 'frames': 2, 'interval': 0})
+    assert response.status_code == 202
+    job_id = response.get_json()['jobId']
+
+    deadline = time.monotonic() + 5
+    job = client.get(f'/api/jobs/{job_id}', headers=auth_headers).get_json()
+    while job['status'] in ['queued', 'running'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+        job = client.get(f'/api/jobs/{job_id}', headers=auth_headers).get_json()
+    assert job['id'] == job_id
+    assert job['meta'] == {'cameraId': 'cam-analyze', 'mode': 'clip', 'frames': 2}
+    assert job['status'] == 'done'
+    assert job['result']['framesAnalyzed'] == 2
+    assert job['result']['summary'] == {'fire': {'frames': 2, 'count': 2, 'maxConfidence': 0.8}}
+    assert client.get('/api/jobs/unknown', headers=auth_headers).status_code == 404
+
+
+def test_update_camera_detection_config(client, auth_headers):
+    from backend.app import Camera, db
+
+    with app.app_context():
+        db.session.add(Camera(id='cam-roi', name='Aisle 3', status='online'))
+        db.session.commit()
+
+    response = client.put('/api/cameras/cam-roi/detection-config', headers=auth_headers, json={
+        'inferenceSize': 320,
+        'roi': [[0, 0.3, 1, 1]],
+        'maxBoxArea': 0.2,
+    })
+    assert response.status_code == 200
+    assert response.get_json()['roi'] == [[0, 0.3, 1, 1]]
+
+    response = client.put('/api/cameras/cam-roi/detection-config', headers=auth_headers,
+                          json={'roi': [[0, 0, 5, 5]]})
+    assert response.status_code == 400
+    response = client.put('/api/cameras/cam-roi/detection-config', headers=auth_headers,
+                          json={'inferenceSize': 300})
+    assert response.status_code == 400
+    response = client.put('/api/cameras/cam-roi/detection-config', headers=auth_headers,
+                          json={'roi': [[0.5, 0, 0.5, 1]]})
+    assert response.status_code == 400
+    for body in ({'minBoxArea': 'big'}, {'inferenceSize': 'abc'}, {'inferenceSize': -32},
+                 {'minBoxArea': 0.5, 'maxBoxArea': 0.1}, {'maxBoxArea': 2}):
+        response = client.put('/api/cameras/cam-roi/detection-config', headers=auth_headers, json=body)
+        assert response.status_code == 400, body
+    response = client.put('/api/cameras/cam-roi/detection-config', headers=auth_headers)
+    assert response.status_code == 400
+    with app.app_context():
+        camera = db.session.get(Camera, 'cam-roi')
+        assert (camera.inference_size, camera.max_box_area) == (320, 0.2)
+
+
+def test_inventory_stock_summary_and_listing(client, auth_headers):
+    from backend.app import InventoryStock, Warehouse, db
+
+    with app.app_context():
+        db.session.add(Warehouse(id='wh-stock-a', name='Stock A', type='stock-a'))
+        db.session.add(Warehouse(id='wh-stock-b', name='Stock B', type='stock-b'))
+        db.session.commit()
+
+    for sku, qty in [('STK-1', 10), ('STK-2', 2), ('OTHER-1', 5)]:
+        response = client.post('/api/inventory/stock-a', headers=auth_headers, json={
+            'product_id': sku, 'sku': sku, 'quantity': qty, 'min_stock': 4,
+        })
+        assert response.status_code == 201
+
+    items = client.get('/api/inventory/stock-a', headers=auth_headers).get_json()
+    item = next(i for i in items if i['sku'] == 'STK-1')
+    client.post('/api/inventory/transfer', headers=auth_headers, json={
+        'sourceWarehouse': 'stock-a', 'targetWarehouse': 'stock-b', 'id': item['id'], 'qty': 3,
+    })
+    client.put(f"/api/inventory/{item['id']}", headers=auth_headers, json={'quantity': 4})
+
+    availability = client.get('/api/inventory/availability?sku=STK-1', headers=auth_headers).get_json()
+    assert availability[0]['warehouses'] == {'stock-a': 4, 'stock-b': 3}
+    assert availability[0]['total'] == 7
+
+    low = client.get('/api/inventory/stock-a?low_stock=1', headers=auth_headers).get_json()
+    assert sorted(i['sku'] for i in low) == ['STK-2']
+
+    page = client.get('/api/inventory/stock-a?sku=STK&page=1&per_page=1', headers=auth_headers).get_json()
+    assert [i['sku'] for i in page['items']] == ['STK-1']
+    assert page['has_more'] is True
+    page = client.get('/api/inventory/stock-a?sku=STK&page=2&per_page=1', headers=auth_headers).get_json()
+    assert [i['sku'] for i in page['items']] == ['STK-2']
+    assert page['has_more'] is False
+
+    assert client.get('/api/inventory/stock-a?expiring_before=soon',
+                      headers=auth_headers).status_code == 400
+
+    client.delete(f"/api/inventory/{item['id']}", headers=auth_headers)
+    with app.app_context():
+        product_id = InventoryStock.query.filter_by(warehouse_id='wh-stock-b').one().product_id
+        stock = db.session.get(InventoryStock, (product_id, 'wh-stock-a'))
+        assert stock.quantity == 0
+        assert stock.item_count == 0
+
+
+def test_stock_alerts_follow_quantity(client, auth_headers):
+    from backend.app import Alert, InventoryItem, Product, Warehouse, db, sweep_stock_alerts
+
+    def open_alerts():
+        with app.app_context():
+            return {a.inventory_item_id: a.data['level'] for a in Alert.query.filter(
+                Alert.type == 'inventory', Alert.status.in_(['new', 'acknowledged']))}
+
+    with app.app_context():
+        db.session.add(Warehouse(id='wh-alerts', name='Alerts', type='alerts'))
+        db.session.commit()
+
+    client.post('/api/inventory/alerts', headers=auth_headers, json={
+        'product_id': 'Bolt', 'sku': 'ALERT-1', 'quantity': 1, 'min_stock': 5,
+    })
+    item_id = client.get('/api/inventory/alerts', headers=auth_headers).get_json()[0]['id']
+    assert open_alerts()[item_id] == 'low_stock'
+
+    client.put(f'/api/inventory/{item_id}', headers=auth_headers, json={'quantity': 10})
+    assert item_id not in open_alerts()
+
+    # rows written behind the app's back are picked up by the sweep
+    with app.app_context():
+        product = Product.query.filter_by(sku='ALERT-1').one()
+        db.session.add(InventoryItem(id='stock-sweep-1', product_id=product.id, warehouse_id='wh-alerts',
+                                     quantity=3, min_stock=0, reorder_point=5))
+        db.session.get(InventoryItem, item_id).quantity = 0
+        db.session.commit()
+        totals = sweep_stock_alerts(chunk_size=1)
+    assert totals['opened'] >= 2
+    alerts = open_alerts()
+    assert alerts[item_id] == 'low_stock'
+    assert alerts['stock-sweep-1'] == 'reorder'
+
+    client.delete(f'/api/inventory/{item_id}', headers=auth_headers)
+    assert item_id not in open_alerts()
+
+
+def test_expiry_scan_and_listing(client, auth_headers):
+    from datetime import datetime, timedelta, timezone
+    from backend.app import Alert, Warehouse, db, scan_expiring_inventory
+
+    today = datetime.now(timezone.utc).date()
+    with app.app_context():
+        db.session.add(Warehouse(id='wh-expiry', name='Cold', type='expiry'))
+        db.session.commit()
+
+    for sku, days in [('EXP-PAST', -2), ('EXP-SOON', 3), ('EXP-LATER', 20), ('EXP-FAR', 90)]:
+        response = client.post('/api/inventory/expiry', headers=auth_headers, json={
+            'product_id': sku, 'sku': sku, 'quantity': 5,
+            'expiry_date': (today + timedelta(days=days)).isoformat(),
+        })
+        assert response.status_code == 201
+
+    expiring = client.get(f'/api/inventory/expiring?warehouse=expiry&before={today + timedelta(days=10)}',
+                          headers=auth_headers).get_json()
+    assert [i['sku'] for i in expiring] == ['EXP-PAST', 'EXP-SOON']
+    assert expiring[1]['days_left'] == 3
+    assert client.get('/api/inventory/expiring?before=tomorrow', headers=auth_headers).status_code == 400
+
+    def expiry_alert():
+        return next(a for a in Alert.query.filter_by(type='inventory', status='new')
+                    if (a.data or {}).get('warehouse_id') == 'wh-expiry')
+
+    with app.app_context():
+        scan_expiring_inventory(today)
+        alert = expiry_alert()
+        assert alert.severity == 'critical'
+        assert alert.data['buckets'] == {'expired': 1, '7d': 1, '30d': 1}
+
+        assert scan_expiring_inventory(today)['updated'] == 0
+        scan_expiring_inventory(today - timedelta(days=100))
+        assert db.session.get(Alert, alert.id).status == 'resolved'
+
+
+def test_inventory_changes_are_logged(client, auth_headers):
+    from backend.app import InventoryArchive, Warehouse, db
+
+    with app.app_context():
+        db.session.add(Warehouse(id='wh-audit', name='Audit', type='audit'))
+        db.session.commit()
+
+    client.post('/api/inventory/audit', headers=auth_headers, json={
+        'product_id': 'Nut', 'sku': 'AUDIT-1', 'quantity': 8, 'min_stock': 1, 'price': 2,
+    })
+    item_id = client.get('/api/inventory/audit', headers=auth_headers).get_json()[0]['id']
+    client.put(f'/api/inventory/{item_id}', headers=auth_headers,
+               json={'quantity': '6', 'min_stock': 1, 'location': 'A1', 'price': '2.00'})
+    client.delete(f'/api/inventory/{item_id}', headers=auth_headers)
+
+    with app.app_context():
+        logs = InventoryArchive.query.filter_by(item_id=item_id).order_by(InventoryArchive.timestamp).all()
+        changes = {(log.field, log.old_value, log.new_value) for log in logs}
+        assert changes == {
+            ('created', None, '8'),
+            ('quantity', '8', '6'),
+            ('location', None, 'A1'),
+            ('deleted', '6', None),
+        }
+        assert {log.sku for log in logs} == {'AUDIT-1'}
+        assert {log.edited_by for log in logs} == {'test_admin'}
+
+
+def test_retention_moves_old_rows_to_cold_storage(client, auth_headers, tmp_path, monkeypatch):
+    from datetime import datetime, timedelta
+    from backend.app import (Alert, InventoryArchive, OrderArchive, OrderItemArchive, db,
+                             run_retention)
+
+    monkeypatch.setattr('retention.COLD_STORAGE_DIR', str(tmp_path))
+    now = datetime(2026, 6, 15)
+    old, recent = now - timedelta(days=400), now - timedelta(days=10)
+    with app.app_context():
+        db.session.add_all([
+            InventoryArchive(id='ret-log-old', item_id='x', sku='RET', field='quantity',
+                             old_value='1', new_value='2', edited_by='a', timestamp=old),
+            InventoryArchive(id='ret-log-new', item_id='x', sku='RET', field='quantity',
+                             old_value='2', new_value='3', edited_by='a', timestamp=recent),
+            OrderArchive(id='ret-order-old', order_id='o', action='cancelled', performed_by='a', timestamp=old),
+            Alert(id='ret-alert-resolved', type='safety', severity='low', description='old',
+                  status='resolved', created_at=old),
+            Alert(id='ret-alert-open', type='safety', severity='low', description='old', created_at=old),
+        ])
+        db.session.flush()
+        db.session.add(OrderItemArchive(id='ret-item-old', order_archive_id='ret-order-old',
+                                        quantity=1, archived_at=old))
+        db.session.commit()
+
+        moved = run_retention(now)
+        assert moved['inventory_archive'] >= 1
+        assert moved['order_items_archive'] >= 1 and moved['order_archive'] >= 1
+        assert db.session.get(InventoryArchive, 'ret-log-old') is None
+        assert db.session.get(InventoryArchive, 'ret-log-new') is not None
+        assert db.session.get(Alert, 'ret-alert-resolved') is None
+        assert db.session.get(Alert, 'ret-alert-open') is not None
+
+    since = (old - timedelta(days=1)).date().isoformat()
+    hot = client.get(f'/api/inventory/archive?since={since}', headers=auth_headers).get_json()
+    assert 'ret-log-old' not in [log['id'] for log in hot]
+    both = client.get(f'/api/inventory/archive?since={since}&include_cold=1',
+                      headers=auth_headers).get_json()
+    ids = [log['id'] for log in both]
+    assert 'ret-log-old' in ids and ids.index('ret-log-new') < ids.index('ret-log-old')
+
+    # a compaction that wrote the file but did not commit its DELETE
+    from backend.app import append_cold_rows
+    append_cold_rows('inventory_archive', [{'id': 'ret-log-new', 'item_id': 'x', 'timestamp': recent}],
+                     'timestamp')
+    both = client.get(f'/api/inventory/archive?since={since}&include_cold=1',
+                      headers=auth_headers).get_json()
+    assert [log['id'] for log in both].count('ret-log-new') == 1
+
+    alerts = client.get(f'/api/alerts?include_cold=1&until={old.date().isoformat()}',
+                        headers=auth_headers).get_json()
+    assert {'ret-alert-resolved', 'ret-alert-open'} <= {a['id'] for a in alerts}
+
+
+def test_order_archival_is_set_based(client, auth_headers):
+    from backend.app import Order, OrderArchive, OrderItem, OrderItemArchive, Product, db
+
+    with app.app_context():
+        db.session.add(Product(id='prod-archive', name='Crate', sku='ARCH-1', price=4))
+        db.session.commit()
+
+    def create(number):
+        return client.post('/api/orders', headers=auth_headers, json={
+            'orderNumber': number, 'customerName': 'Acme', 'totalAmount': 8,
+            'items': [{'productId': 'prod-archive', 'quantity': 2, 'price': 4}],
+        }).get_json()['id']
+
+    single = create('ARCH-A')
+    response = client.put(f'/api/orders/{single}/status', headers=auth_headers, json={'status': 'completed'})
+    assert response.status_code == 200
+    with app.app_context():
+        assert db.session.get(Order, single) is None
+        assert OrderItem.query.filter_by(order_id=single).count() == 0
+        archive = db.session.get(OrderArchive, single)
+        assert (archive.order_id, archive.action, archive.performed_by) == (single, 'completed', 'test_admin')
+        assert OrderItemArchive.query.filter_by(order_archive_id=single).one().quantity == 2
+
+    bulk = [create(f'ARCH-B{i}') for i in range(3)]
+    for order_id in bulk:
+        client.put(f'/api/orders/{order_id}/status', headers=auth_headers, json={'status': 'processing'})
+    response = client.post('/api/orders/archive', headers=auth_headers,
+                           json={'status': 'cancelled', 'currentStatus': 'processing'})
+    assert response.status_code == 200
+    assert set(bulk) <= set(response.get_json()['orderIds'])
+    with app.app_context():
+        assert Order.query.filter(Order.id.in_(bulk)).count() == 0
+        assert OrderItemArchive.query.filter(OrderItemArchive.order_archive_id.in_(bulk)).count() == 3
+
+    response = client.post('/api/orders/archive', headers=auth_headers,
+                           json={'status': 'completed', 'orderIds': ['missing']})
+    assert response.get_json()['archived'] == 0
+    assert client.post('/api/orders/archive', headers=auth_headers,
+                       json={'status': 'shipped', 'orderIds': bulk}).status_code == 400
+
+
+def test_batch_order_ingest(client, auth_headers):
+    from backend.app import Order, OrderItem, Product, db
+
+    with app.app_context():
+        db.session.add(Product(id='prod-batch-a', name='Pallet', sku='BATCH-A', price=10))
+        db.session.add(Product(id='prod-batch-b', name='Strap', sku='BATCH-B', price='2.50'))
+        db.session.commit()
+
+    orders = [
+        {'orderNumber': 'MK-1', 'customerName': 'Shop', 'totalAmount': 1,
+         'items': [{'productId': 'prod-batch-a', 'quantity': 2},
+                   {'productId': 'prod-batch-b', 'quantity': 3, 'price': 2}]},
+        {'orderNumber': 'MK-2', 'customerName': 'Shop', 'deliveryDate': '2026-12-01',
+         'items': [{'productId': 'prod-batch-b', 'quantity': 4}]},
+    ]
+    response = client.post('/api/orders/batch', headers=auth_headers, json={'orders': orders})
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['created'] == 2
+    first, second = body['orders']
+    assert first['totalAmount'] == 26.0  # client total ignored
+    assert first['items'][0]['productName'] == 'Pallet'
+    assert second['totalAmount'] == 10.0
+    assert second['deliveryDate'] == '2026-12-01'
+    with app.app_context():
+        assert float(db.session.get(Order, first['id']).total_amount) == 26.0
+        assert OrderItem.query.filter_by(order_id=first['id']).count() == 2
+
+    bad = [orders[0], {'items': [{'productId': 'nope', 'quantity': 1}]},
+           {'items': [{'productId': 'prod-batch-a', 'quantity': 1.5}]}]
+    response = client.post('/api/orders/batch', headers=auth_headers, json={'orders': bad})
+    assert response.status_code == 400
+    assert [e['index'] for e in response.get_json()['errors']] == [1, 2]
+    with app.app_context():
+        assert Order.query.filter_by(order_number='MK-1').count() == 1
+
+
+def test_orders_reserve_and_settle_stock(client, auth_headers, monkeypatch):
+    import backend.app as backend_app
+    from backend.app import InventoryItem, InventoryStock, Product, StockReservation, Warehouse, db
+
+    monkeypatch.setattr(backend_app, 'RESERVATION_WAREHOUSES', ['res-retail', 'res-bulk'])
+    with app.app_context():
+        db.session.add_all([
+            Warehouse(id='wh-res-retail', name='Retail', type='res-retail'),
+            Warehouse(id='wh-res-bulk', name='Bulk', type='res-bulk'),
+            Product(id='prod-res', name='Widget', sku='RES-1', price=3),
+        ])
+        db.session.commit()
+    client.post('/api/inventory/res-retail', headers=auth_headers,
+                json={'product_id': 'Widget', 'sku': 'RES-1', 'quantity': 5})
+    client.post('/api/inventory/res-bulk', headers=auth_headers,
+                json={'product_id': 'Widget', 'sku': 'RES-1', 'quantity': 10})
+
+    def order(quantity):
+        return client.post('/api/orders', headers=auth_headers, json={
+            'customerName': 'Res', 'items': [{'productId': 'prod-res', 'quantity': quantity}]})
+
+    def stock(warehouse_id):
+        with app.app_context():
+            row = db.session.get(InventoryStock, ('prod-res', warehouse_id))
+            return row.quantity, row.reserved
+
+    first = order(7).get_json()['id']  # 5 from retail, 2 from bulk
+    assert stock('wh-res-retail') == (5, 5)
+    assert stock('wh-res-bulk') == (10, 2)
+    second = order(3).get_json()['id']
+    assert stock('wh-res-bulk') == (10, 5)
+
+    # 5 of the 10 bulk units are held, so edits may only remove the other 5
+    with app.app_context():
+        bulk_item = InventoryItem.query.filter_by(warehouse_id='wh-res-bulk').one().id
+    response = client.put(f'/api/inventory/{bulk_item}', headers=auth_headers, json={'quantity': 4})
+    assert response.status_code == 409 and response.get_json()['available'] == 5
+    assert client.delete(f'/api/inventory/{bulk_item}', headers=auth_headers).status_code == 409
+    assert client.put(f'/api/inventory/{bulk_item}', headers=auth_headers,
+                      json={'quantity': 'lots'}).status_code == 400
+    assert client.put(f'/api/inventory/{bulk_item}', headers=auth_headers,
+                      json={'quantity': -1}).status_code == 400
+    assert stock('wh-res-bulk') == (10, 5)
+    assert client.put(f'/api/inventory/{bulk_item}', headers=auth_headers,
+                      json={'quantity': 5}).status_code == 200
+    assert stock('wh-res-bulk') == (5, 5)
+    client.put(f'/api/inventory/{bulk_item}', headers=auth_headers, json={'quantity': 10})
+    assert stock('wh-res-bulk') == (10, 5)
+
+    availability = client.get('/api/inventory/availability?sku=RES-1', headers=auth_headers).get_json()[0]
+    assert availability['available'] == 5
+
+    monkeypatch.setattr(backend_app, 'ORDER_STOCK_POLICY', 'strict')
+    response = order(6)
+    assert response.status_code == 409
+    assert response.get_json()['shortages'][0]['missing'] == 1
+    assert stock('wh-res-bulk') == (10, 5)  # partial hold rolled back
+
+    client.put(f'/api/orders/{first}/status', headers=auth_headers, json={'status': 'completed'})
+    assert stock('wh-res-retail') == (0, 0)
+    assert stock('wh-res-bulk') == (8, 3)
+    client.put(f'/api/orders/{second}/status', headers=auth_headers, json={'status': 'cancelled'})
+    assert stock('wh-res-bulk') == (8, 0)
+
+    with app.app_context():
+        assert InventoryItem.query.filter_by(warehouse_id='wh-res-bulk').one().quantity == 8
+        statuses = {r.order_id: r.status for r in StockReservation.query.filter(
+            StockReservation.order_id.in_([first, second]))}
+        assert statuses == {first: 'consumed', second: 'released'}
+
+
+def test_production_runs_reserve_and_consume_materials(client, auth_headers):
+    from backend.app import InventoryStock, Product, RecipeItem, StockReservation, Warehouse, db
+
+    with app.app_context():
+        db.session.add_all([
+            Warehouse(id='wh-mrp-raw', name='Raw', type='raw_materials'),
+            Product(id='mrp-chair', name='Chair', sku='MRP-CHAIR'),
+            Product(id='mrp-leg', name='Leg', sku='MRP-LEG'),
+            RecipeItem(id='mrp-r1', product_id='mrp-chair', ingredient_id='mrp-leg', quantity=4),
+            RecipeItem(id='mrp-r2', product_id='mrp-chair', ingredient_id='mrp-seat', quantity=1),
+            RecipeItem(id='mrp-r3', product_id='mrp-leg', ingredient_id='mrp-wood', quantity='0.5'),
+        ])
+        db.session.commit()
+    client.post('/api/inventory/raw_materials', headers=auth_headers,
+                json={'product_id': 'Wood', 'sku': 'MRP-WOOD', 'quantity': 30})
+    with app.app_context():
+        wood = Product.query.filter_by(sku='MRP-WOOD').one().id
+        db.session.get(RecipeItem, 'mrp-r3').ingredient_id = wood
+        db.session.commit()
+
+    plan = client.post('/api/production/mrp', headers=auth_headers,
+                       json={'runs': [{'productId': 'mrp-chair', 'quantity': 10}]}).get_json()
+    materials = {m['materialId']: m for m in plan['materials']}
+    assert materials[wood]['required'] == 20.0
+    assert materials[wood]['shortfall'] == 0
+    assert materials['mrp-seat']['shortfall'] == 10.0
+
+    client.post('/api/production/runs', headers=auth_headers, json={
+        'run_number': 'MRP-RUN-1', 'product_id': 'mrp-chair', 'quantity': 10, 'status': 'scheduled'})
+    response = client.put('/api/production/runs/MRP-RUN-1', headers=auth_headers,
+                          json={'status': 'in-progress'})
+    assert response.get_json()['materialShortages'][0]['productId'] == 'mrp-seat'
+    with app.app_context():
+        assert db.session.get(InventoryStock, (wood, 'wh-mrp-raw')).reserved == 20
+
+    client.put('/api/production/runs/MRP-RUN-1', headers=auth_headers, json={'status': 'completed'})
+    with app.app_context():
+        stock = db.session.get(InventoryStock, (wood, 'wh-mrp-raw'))
+        assert (stock.quantity, stock.reserved) == (10, 0)
+        assert {r.status for r in StockReservation.query.filter(
+            StockReservation.production_run_id.isnot(None))} == {'consumed'}
+
+        db.session.add(RecipeItem(id='mrp-r4', product_id='mrp-leg', ingredient_id='mrp-chair', quantity=1))
+        db.session.commit()
+    response = client.post('/api/production/mrp', headers=auth_headers,
+                           json={'runs': [{'productId': 'mrp-chair', 'quantity': 1}]})
+    assert response.status_code == 400
+    assert response.get_json()['cycle'] == ['mrp-chair', 'mrp-leg', 'mrp-chair']
+    with app.app_context():
+        db.session.delete(db.session.get(RecipeItem, 'mrp-r4'))
+        db.session.commit()
+
+
+def test_production_schedule_respects_lines_and_maintenance(client, auth_headers):
+    from datetime import datetime, timedelta
+
+    from backend.app import Product, ProductionLine, ProductionRun, db
+
+    soon = datetime.utcnow() + timedelta(minutes=30)
+    with app.app_context():
+        db.session.add_all([
+            Product(id='sch-bread', name='Bread', sku='SCH-BREAD'),
+            ProductionLine(id='sch-line-1', name='Oven 1', status='operational', capacity_per_hour=100,
+                           next_maintenance=soon),
+            ProductionLine(id='sch-line-2', name='Oven 2', status='maintenance', capacity_per_hour=1000),
+        ])
+        db.session.commit()
+    client.post('/api/production/runs', headers=auth_headers, json={
+        'run_number': 'SCH-RUN-1', 'product_id': 'sch-bread', 'quantity': 200, 'status': 'planned'})
+
+    preview = client.get('/api/production/schedule', headers=auth_headers).get_json()
+    slot = next(a for a in preview['timeline'] if a['productId'] == 'sch-bread')
+    assert slot['lineId'] == 'sch-line-1'
+    # Two hours of work can't fit before the maintenance window, so it follows it.
+    assert datetime.fromisoformat(slot['start']) >= soon + timedelta(hours=8)
+    assert not preview['applied']
+
+    response = client.post('/api/production/schedule', headers=auth_headers)
+    assert response.get_json()['applied']
+    with app.app_context():
+        run = ProductionRun.query.filter_by(run_number='SCH-RUN-1').one()
+        assert run.production_line_id == 'sch-line-1'
+        assert run.start_date.isoformat() == slot['start']
+        run.start_date = soon + timedelta(days=2)  # moved by hand
+        run_id = run.id
+        db.session.commit()
+
+    slot = next(a for a in client.post('/api/production/schedule', headers=auth_headers).get_json()['timeline']
+                if a['jobId'] == run_id)
+    assert slot['fixed']
+    with app.app_context():
+        assert db.session.get(ProductionRun, run_id).start_date == soon + timedelta(days=2)
+    client.post('/api/production/schedule?reschedule=1', headers=auth_headers)
+    with app.app_context():
+        run = db.session.get(ProductionRun, run_id)
+        assert run.start_date < soon + timedelta(days=2)
+        run.status = 'cancelled'
+        db.session.get(ProductionLine, 'sch-line-1').status = 'stopped'
+        db.session.commit()
+
+
+def test_production_changes_are_pushed_per_line(client, auth_headers):
+    from backend.app import ProductionLine, db, production_events
+
+    with app.app_context():
+        db.session.add(ProductionLine(id='evt-line', name='Press', status='operational', capacity_per_hour=10))
+        db.session.commit()
+    on_line = production_events.subscribe(['line:evt-line'])
+    elsewhere = production_events.subscribe(['line:other'])
+
+    run = client.post('/api/production/runs', headers=auth_headers, json={
+        'run_number': 'EVT-RUN-1', 'product_id': 'evt-product', 'quantity': 5,
+        'production_line_id': 'evt-line', 'status': 'planned'}).get_json()['run']
+    client.post(f"/api/production/runs/{run['id']}/machine-status", headers=auth_headers,
+                json={'machine_stopped': True, 'reason': 'jam'})
+    client.put('/api/production/lines/evt-line', headers=auth_headers, json={'status': 'stopped'})
+
+    events = on_line.get(0)
+    assert [(e[2], e[3]['status']) for e in events] == [('run', 'planned'), ('run', 'planned'), ('line', 'stopped')]
+    assert events[1][3]['machineStopped'] and events[1][3]['stopReason'] == 'jam'
+    assert elsewhere.get(0) == []
+    on_line.close()
+    elsewhere.close()
+
+    response = client.get('/api/production/events?lines=evt-line',
+                          headers=dict(auth_headers, **{'Last-Event-ID': str(events[0][0])}))
+    assert response.mimetype == 'text/event-stream'
+    chunks = response.response
+    assert next(chunks).startswith(b'retry:')
+    assert b'"stopReason":"jam"' in next(chunks)
+    response.close()
+
+
+def test_machine_events_feed_oee_rollups(client, auth_headers):
+    from datetime import datetime, timedelta
+
+    from backend.app import (MachineEvent, MachineStateRollup, ProductionLine, db, machine_state_seconds,
+                             rollup_machine_states)
+
+    with app.app_context():
+        db.session.add_all([
+            ProductionLine(id='oee-line', name='Filler', status='operational', capacity_per_hour=10),
+            ProductionLine(id='oee-line-2', name='Capper', status='operational', capacity_per_hour=10),
+        ])
+        db.session.commit()
+    run = client.post('/api/production/runs', headers=auth_headers, json={
+        'run_number': 'OEE-RUN-1', 'product_id': 'oee-product', 'quantity': 20,
+        'production_line_id': 'oee-line', 'status': 'in-progress'}).get_json()['run']
+    client.post(f"/api/production/runs/{run['id']}/machine-status", headers=auth_headers,
+                json={'machine_stopped': True, 'reason': 'jam'})
+    client.post(f"/api/production/runs/{run['id']}/machine-status", headers=auth_headers,
+                json={'machine_stopped': False})
+    client.put('/api/production/runs/OEE-RUN-1', headers=auth_headers, json={'status': 'completed'})
+    with app.app_context():
+        events = MachineEvent.query.filter_by(run_id=run['id']).order_by(MachineEvent.at).all()
+        assert [(e.state, e.reason, e.units) for e in events] == [
+            ('running', '', 0), ('down', 'jam', 0), ('running', '', 0), ('idle', '', 20)]
+
+    t0 = datetime(2026, 1, 5, 8, 0)
+    with app.app_context():
+        db.session.add_all([
+            MachineEvent(id='oee-e1', line_id='oee-line-2', state='running', reason='', units=0, at=t0),
+            MachineEvent(id='oee-e2', line_id='oee-line-2', state='down', reason='jam', units=0,
+                         at=t0 + timedelta(minutes=90)),
+            MachineEvent(id='oee-e3', line_id='oee-line-2', state='running', reason='', units=0,
+                         at=t0 + timedelta(hours=2)),
+            MachineEvent(id='oee-e4', line_id='oee-line-2', state='idle', reason='', units=25,
+                         at=t0 + timedelta(hours=3, minutes=15)),
+        ])
+        db.session.commit()
+        raw = machine_state_seconds('oee-line-2', t0 + timedelta(minutes=30), t0 + timedelta(hours=2, minutes=15))
+        assert rollup_machine_states(now=t0 + timedelta(hours=4, minutes=30))['oee-line-2'] == 4
+        assert MachineStateRollup.query.filter_by(line_id='oee-line-2').count() == 5
+        assert machine_state_seconds(
+            'oee-line-2', t0 + timedelta(minutes=30), t0 + timedelta(hours=2, minutes=15)) == raw
+        assert raw == ({('running', ''): 4500.0, ('down', 'jam'): 1800.0}, 0)
+
+        # committed after its hour was rolled up: the next rollup re-rolls recent hours
+        db.session.add(MachineEvent(id='oee-e5', line_id='oee-line-2', state='down', reason='power',
+                                    units=0, at=t0 + timedelta(hours=3)))
+        db.session.commit()
+        rollup_machine_states(now=t0 + timedelta(hours=4, minutes=35))
+        assert machine_state_seconds('oee-line-2', t0, t0 + timedelta(hours=4)) == (
+            {('running', ''): 9000.0, ('down', 'jam'): 1800.0, ('down', 'power'): 900.0}, 25)
+        db.session.delete(db.session.get(MachineEvent, 'oee-e5'))
+        db.session.commit()
+        rollup_machine_states(now=t0 + timedelta(hours=4, minutes=40))
+
+    response = client.get('/api/production/oee?lines=oee-line-2&since=2026-01-05T08:00&until=2026-01-05T12:00',
+                          headers=auth_headers)
+    line = response.get_json()['lines'][0]
+    assert (line['runningHours'], line['downHours'], line['units']) == (2.75, 0.5, 25)
+    assert line['availability'] == round(2.75 / 3.25, 4)
+    assert line['performance'] == round(25 / 27.5, 4)
+    assert response.get_json()['downtime'][0]['reason'] == 'jam'
+
+
+def test_runs_resolve_by_id_or_run_number(client, auth_headers):
+    from backend import app as app_module
+
+    run = client.post('/api/production/runs', headers=auth_headers, json={
+        'run_number': 'KEY-RUN-1', 'product_id': 'key-product', 'quantity': 3}).get_json()['run']
+    assert (run['productName'], run['stopReason'], run['assignedTo']) == ('', '', '')
+    duplicate = client.post('/api/production/runs', headers=auth_headers, json={
+        'run_number': 'KEY-RUN-1', 'product_id': 'key-product', 'quantity': 3})
+    assert duplicate.status_code == 409
+
+    for key in (run['id'], 'KEY-RUN-1'):
+        assert client.get(f'/api/production/runs/{key}', headers=auth_headers).get_json()['id'] == run['id']
+        assert client.get(f'/api/production/runs/{key}/machine-status',
+                          headers=auth_headers).get_json()['runNumber'] == 'KEY-RUN-1'
+    client.post('/api/production/runs/KEY-RUN-1/machine-status', headers=auth_headers,
+                json={'machine_stopped': True, 'reason': 'test'})
+    response = client.put(f"/api/production/runs/{run['id']}", headers=auth_headers, json={'assignedTo': 'sam'})
+    assert response.get_json()['run']['machineStopped'] is True
+
+    app_module._run_keys['KEY-RUN-1'] = 'missing-id'  # stale entry is dropped, not trusted
+    assert client.get('/api/production/runs/KEY-RUN-1', headers=auth_headers).status_code == 200
+    assert app_module._run_keys['KEY-RUN-1'] == run['id']
+    assert client.get('/api/production/runs/KEY-RUN-2', headers=auth_headers).status_code == 404
+
+
+def test_list_endpoints_eager_load_relations(client, auth_headers):
+    from sqlalchemy import event
+
+    from backend.app import Product, ProductionRun, RecipeItem, db
+
+    with app.app_context():
+        db.session.add_all([Product(id=f'eager-{i}', name=f'Eager {i}', sku=f'EAGER-{i}') for i in range(5)])
+        db.session.add_all([RecipeItem(id=f'eager-r{i}', product_id=f'eager-{i}', ingredient_id='eager-x',
+                                       quantity=1) for i in range(5)])
+        db.session.add_all([ProductionRun(id=f'eager-run-{i}', run_number=f'EAGER-RUN-{i}', product_id=f'eager-{i}',
+                                          quantity=1, status='completed', created_by='test') for i in range(5)])
+        db.session.commit()
+        engine = db.engine
+
+    statements = []
+    def count(*args):
+        statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        for url in ('/api/production/runs', '/api/production/archived', '/api/production/products', '/api/orders'):
+            statements.clear()
+            response = client.get(url, headers=auth_headers)
+            assert response.status_code == 200
+            # the token's user lookup, then at most a query and its selectin load
+            assert len(statements) <= 3, (url, statements)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    runs = {r['runNumber']: r for r in client.get('/api/production/runs', headers=auth_headers).get_json()}
+    assert runs['EAGER-RUN-3']['productName'] == 'Eager 3'
+    products = {p['id']: p for p in client.get('/api/production/products', headers=auth_headers).get_json()}
+    assert products['eager-2']['recipe'][0]['ingredientId'] == 'eager-x'
+
+
+def test_multiprocess_streams_use_camera_source(client, monkeypatch):
+    import backend.app as backend_app
+    from backend.app import Camera, db
+
+    started = []
+
+    class FakePipeline:
+        def __init__(self, source=0, backend=None, camera_id=None, config=None):
+            started.append((source, camera_id))
+
+        def start(self):
+            return self
+
+        def is_alive(self):
+            return True
+
+        def jpeg_frames(self):
+            yield b'jpeg'
+
+    monkeypatch.setattr(backend_app, 'VISION_MODE', 'multiprocess')
+    monkeypatch.setattr(backend_app, 'VisionPipeline', FakePipeline)
+    monkeypatch.setattr(backend_app, '_vision_pipelines', {})
+    with app.app_context():
+        db.session.add(Camera(id='cam-rtsp', name='Yard', status='online', ip_address='10.0.0.7'))
+        db.session.commit()
+
+    response = client.get('/video_feed?camera_id=cam-rtsp')
+    assert b'jpeg' in next(response.response)
+    assert started == [('rtsp://10.0.0.7:554/', 'cam-rtsp')]
+
+
+def test_detection_config_changes_reach_live_streams(client, auth_headers, monkeypatch):
+    import numpy as np
+    import backend.app as backend_app
+    from backend.app import Camera, DetectionConfig, db
+
+    class FakeCapture:
+        def read(self):
+            return True, np.zeros((48, 64, 3), dtype=np.uint8)
+
+        def release(self):
+            pass
+
+    seen = []
+    monkeypatch.setattr(backend_app, 'get_camera', lambda source: FakeCapture())
+    monkeypatch.setattr(backend_app, 'run_ai_on_frame',
+                        lambda frame, backend, camera_id, config: seen.append(config) or frame)
+    with app.app_context():
+        camera = Camera(id='cam-live-roi', name='Line 2', status='online', inference_size=640)
+        db.session.add(camera)
+        db.session.commit()
+        frames = backend_app.annotated_frames(0, None, camera.id, DetectionConfig.from_camera(camera))
+
+    next(frames)
+    assert seen[-1].inference_size == 640 and seen[-1].regions == []
+
+    response = client.put('/api/cameras/cam-live-roi/detection-config', headers=auth_headers,
+                          json={'inferenceSize': 320, 'roi': [[0, 0, 0.5, 0.5]]})
+    assert response.status_code == 200
+    next(frames)
+    assert seen[-1].inference_size == 320 and len(seen[-1].regions) == 1
+    frames.close()
+
+
+def test_video_feed_ignores_malformed_tier_params(client, monkeypatch):
+    import backend.app as backend_app
+
+    tiers = []
+    monkeypatch.setattr(backend_app, 'gen_frames',
+                        lambda backend, camera_id, tier, *args: tiers.append(tier) or iter([b'']))
+    assert client.get('/video_feed?scale=abc&quality=x').status_code == 200
+    assert client.get('/video_feed?scale=0.5&quality=60').status_code == 200
+    assert tiers == [backend_app.stream_tier(), (0.5, 60)]
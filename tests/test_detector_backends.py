@@ -0,0 +1,36 @@
+import pytest
+
+from backend.detector_backends import (
+    DEFAULT_BACKEND,
+    box_iou,
+    checked_backend,
+    match_detections,
+    resolve_backend,
+)
+
+
+def test_resolve_backend_from_camera_ai_model():
+    assert resolve_backend("onnx") == "onnx"
+    assert resolve_backend("yolov8:ONNX-INT8") == "onnx-int8"
+    assert resolve_backend("openvino") == "openvino"
+    assert resolve_backend(None) == DEFAULT_BACKEND
+    assert resolve_backend("something-else") == DEFAULT_BACKEND
+
+
+def test_unknown_default_backend_falls_back_to_torch():
+    assert checked_backend(" OpenVINO ") == "openvino"
+    with pytest.warns(UserWarning, match="onxx"):
+        assert checked_backend("onxx") == "torch"
+
+
+def test_match_detections_reports_iou_and_conf_drift():
+    assert box_iou([0, 0, 10, 10], [0, 0, 10, 10]) == 1.0
+    assert box_iou([0, 0, 10, 10], [20, 20, 30, 30]) == 0.0
+
+    reference = [(0, 0.90, [0, 0, 10, 10]), (1, 0.70, [50, 50, 60, 60])]
+    candidate = [(0, 0.88, [0, 0, 10, 10])]
+    pairs = match_detections(reference, candidate)
+    assert pairs[0][0] == 1.0
+    assert abs(pairs[0][1] - 0.02) < 1e-9
+    # class 1 has no counterpart in the candidate output
+    assert pairs[1] == (0.0, 0.70)
@@ -0,0 +1,51 @@
+import threading
+
+from backend.events import EventBroker, format_sse
+
+
+def test_format_sse():
+    assert format_sse("run", {"id": "r1"}, 7) == 'id: 7\nevent: run\ndata: {"id":"r1"}\n\n'
+
+
+def test_subscribers_only_get_their_topics_and_can_resume():
+    broker = EventBroker()
+    line_a = broker.subscribe(["line:a"])
+    everything = broker.subscribe()
+    broker.publish("line:a", "run", {"id": "r1"})
+    last = broker.publish("line:b", "run", {"id": "r2"})
+    broker.publish("line:a", "line", {"id": "a"})
+
+    assert [e[3]["id"] for e in line_a.get(0)] == ["r1", "a"]
+    assert len(everything.get(0)) == 3
+    assert line_a.get(0) == []
+
+    resumed = broker.subscribe(["line:a"], last_id=last)
+    assert [e[0] for e in resumed.get(0)] == [last + 1]
+    for subscription in (line_a, everything, resumed):
+        subscription.close()
+    assert broker.subscribers == 0
+
+
+def test_get_wakes_on_publish_and_slow_subscribers_drop_oldest():
+    broker = EventBroker()
+    subscription = broker.subscribe()
+    threading.Timer(0.05, broker.publish, ("line:a", "run", {"id": "r1"})).start()
+    assert len(subscription.get(5)) == 1
+
+    for i in range(300):
+        broker.publish("line:a", "run", {"id": i})
+    events = subscription.get(0)
+    assert events[-1][3]["id"] == 299
+    assert subscription.dropped == 300 - len(events)
+
+
+def test_stream_sends_events_and_heartbeats():
+    broker = EventBroker()
+    subscription = broker.subscribe()
+    broker.publish("line:a", "run", {"id": "r1"})
+    stream = broker.stream(subscription, heartbeat=0.01)
+    assert next(stream).startswith("retry:")
+    assert '"topic":"line:a"' in next(stream)
+    assert next(stream) == ": ping\n\n"
+    stream.close()
+    assert broker.subscribers == 0
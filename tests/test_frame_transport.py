@@ -0,0 +1,45 @@
+import numpy as np
+
+from backend.frame_transport import SharedRing
+
+
+def test_reader_sees_writer_frames_without_copying():
+    writer = SharedRing((4, 4, 3), slots=2)
+    reader = SharedRing(**writer.spec())
+    try:
+        assert reader.latest() is None
+
+        seq, view = writer.begin_write()
+        view[:] = 7
+        writer.commit(seq)
+
+        got_seq, frame = reader.latest()
+        assert got_seq == 0
+        assert (frame == 7).all()
+        # the reader's array is a view onto shared memory, not a copy
+        view[0, 0, 0] = 9
+        assert frame[0, 0, 0] == 9
+
+        # two more writes lap the two-slot ring and invalidate seq 0
+        for value in (1, 2):
+            seq, view = writer.begin_write()
+            view[:] = value
+            writer.commit(seq)
+        assert not reader.is_current(got_seq)
+        assert reader.latest()[0] == 2
+        del frame, view
+    finally:
+        reader.close()
+        writer.close()
+
+
+def test_bytes_ring_round_trip():
+    writer = SharedRing((64,), slots=2)
+    reader = SharedRing(**writer.spec())
+    try:
+        writer.write_bytes(np.frombuffer(b"jpeg-1", dtype=np.uint8))
+        writer.write_bytes(np.frombuffer(b"jpeg-22", dtype=np.uint8))
+        assert reader.latest_bytes() == (1, b"jpeg-22")
+    finally:
+        reader.close()
+        writer.close()
@@ -0,0 +1,81 @@
+import threading
+
+from backend.inference_server import InferenceServer
+
+
+class EchoModel:
+    """Returns each frame back as its own result and records batch sizes."""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, source, conf, verbose):
+        self.batches.append(len(source))
+        return [(frame, conf) for frame in source]
+
+
+def test_batches_frames_across_cameras_and_routes_results():
+    model = EchoModel()
+    server = InferenceServer(max_batch_size=4, max_wait_ms=200)
+    results = {}
+
+    def camera(cam_id):
+        results[cam_id] = server.predict(model, f"frame-{cam_id}", 0.3)
+
+    threads = [threading.Thread(target=camera, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    server.stop()
+
+    assert results == {i: (f"frame-{i}", 0.3) for i in range(4)}
+    assert sum(model.batches) == 4
+    assert len(model.batches) < 4
+
+
+def test_predict_errors_reach_the_caller():
+    class Broken:
+        def predict(self, source, conf, verbose):
+            raise RuntimeError("boom")
+
+    server = InferenceServer(max_batch_size=2, max_wait_ms=1)
+    try:
+        server.predict(Broken(), "frame", 0.3)
+    except RuntimeError as e:
+        assert str(e) == "boom"
+    else:
+        raise AssertionError("expected RuntimeError")
+    finally:
+        server.stop()
+
+
+def test_stop_fails_pending_requests_and_refuses_new_ones():
+    started, release = threading.Event(), threading.Event()
+
+    class Slow(EchoModel):
+        def predict(self, source, conf, verbose):
+            started.set()
+            release.wait(5)
+            return super().predict(source, conf, verbose)
+
+    server = InferenceServer(max_batch_size=1, max_wait_ms=1)
+    model = Slow()
+    running = server.submit(model, "running", 0.3)
+    assert started.wait(5)
+    pending = server.submit(model, "pending", 0.3)
+
+    stopper = threading.Thread(target=server.stop)
+    stopper.start()
+    assert server._stopped.wait(5)
+    release.set()
+    stopper.join(5)
+
+    assert running.result(5) == ("running", 0.3)
+    assert isinstance(pending.exception(5), RuntimeError)
+    try:
+        server.submit(model, "late", 0.3)
+    except RuntimeError as e:
+        assert str(e) == "inference server stopped"
+    else:
+        raise AssertionError("expected RuntimeError")
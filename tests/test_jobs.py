@@ -0,0 +1,44 @@
+import threading
+
+import pytest
+
+from backend.jobs import JobQueue, QueueFull
+
+
+def test_job_runs_in_background_and_expires_after_ttl():
+    now = [0.0]
+    queue = JobQueue(max_workers=1, result_ttl=60, clock=lambda: now[0])
+    done = threading.Event()
+
+    def work(x):
+        done.set()
+        return x * 2
+
+    job = queue.submit("double", work, 21)
+    done.wait(5)
+    queue._executor.shutdown(wait=True)
+    assert queue.get(job.id).status == "done"
+    assert job.to_dict()["result"] == 42
+
+    now[0] = 61
+    assert queue.get(job.id) is None
+
+
+def test_pending_limit_and_failures():
+    queue = JobQueue(max_workers=1, max_pending=1)
+    release = threading.Event()
+    blocker = queue.submit("wait", release.wait, 5)
+    with pytest.raises(QueueFull):
+        queue.submit("wait", release.wait, 5)
+    release.set()
+
+    def fail():
+        raise RuntimeError("camera offline")
+
+    queue._executor.shutdown(wait=True)
+    assert blocker.status == "done"
+    queue = JobQueue(max_workers=1)
+    job = queue.submit("fail", fail)
+    queue._executor.shutdown(wait=True)
+    assert job.status == "failed"
+    assert job.error == "camera offline"
@@ -0,0 +1,31 @@
+from decimal import Decimal
+
+import pytest
+
+from backend.mrp import CycleError, gross_requirements, net_requirements, unit_requirements
+
+
+def test_multi_level_explosion_memoizes_subassemblies():
+    recipes = {
+        "bike": [("frame", 1), ("wheel", 2)],
+        "wheel": [("rim", 1), ("spoke", 32), ("tyre", "1")],
+        "frame": [("tube", "2.5")],
+    }
+    memo = {}
+    assert unit_requirements("bike", recipes, memo) == {
+        "tube": Decimal("2.5"), "rim": 2, "spoke": 64, "tyre": 2,
+    }
+    assert set(memo) == {"bike", "wheel", "frame"}
+
+    gross = gross_requirements([("bike", 2), ("wheel", 1)], recipes)
+    assert gross["spoke"] == 160
+    net = net_requirements(gross, {"spoke": 100, "rim": 10})
+    assert net["spoke"]["shortfall"] == 60
+    assert net["rim"]["shortfall"] == 0
+
+
+def test_cycles_are_reported_with_their_path():
+    recipes = {"a": [("b", 1)], "b": [("c", 1)], "c": [("a", 1)]}
+    with pytest.raises(CycleError) as e:
+        unit_requirements("a", recipes)
+    assert e.value.path == ["a", "b", "c", "a"]
@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+
+from backend.oee import DOWN, IDLE, RUNNING, bucket_seconds, ceil_bucket, line_metrics, state_intervals
+
+T0 = datetime(2026, 1, 5, 8, 0)
+
+
+def test_intervals_are_split_into_hourly_buckets():
+    events = [(T0 + timedelta(minutes=90), DOWN, "jam"), (T0 + timedelta(minutes=120), RUNNING, "")]
+    intervals = list(state_intervals(RUNNING, "", events, T0, T0 + timedelta(hours=3)))
+    assert [(s, r) for s, r, _, _ in intervals] == [(RUNNING, ""), (DOWN, "jam"), (RUNNING, "")]
+
+    totals = bucket_seconds(intervals + [(IDLE, "", T0, T0 + timedelta(hours=5))])
+    assert totals[(T0 + timedelta(hours=1), RUNNING, "")] == 1800
+    assert totals[(T0 + timedelta(hours=1), DOWN, "jam")] == 1800
+    assert totals[(T0 + timedelta(hours=2), RUNNING, "")] == 3600
+    assert not any(state == IDLE for _, state, _ in totals)
+    assert ceil_bucket(T0) == T0 and ceil_bucket(T0 + timedelta(seconds=1)) == T0 + timedelta(hours=1)
+
+
+def test_line_metrics_and_pareto():
+    seconds = {(RUNNING, ""): 3 * 3600, (DOWN, "jam"): 1800, (DOWN, "changeover"): 1800 * 2}
+    metrics = line_metrics(seconds, units=24, window_seconds=8 * 3600, capacity_per_hour=10)
+    assert metrics["availability"] == 0.6667
+    assert metrics["performance"] == 0.8
+    assert metrics["oee"] == round(2 / 3 * 0.8, 4)
+    assert metrics["idleHours"] == 3.5
+    assert metrics["throughputPerHour"] == 3.0
+    assert [d["reason"] for d in metrics["downtime"]] == ["changeover", "jam"]
+    assert metrics["downtime"][-1]["cumulativeShare"] == 1.0
+
+
+def test_line_metrics_without_activity():
+    metrics = line_metrics({}, units=0, window_seconds=3600, capacity_per_hour=0)
+    assert metrics["availability"] is None and metrics["oee"] is None
+    assert metrics["idleHours"] == 1.0
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from backend.regions import DetectionConfig
+
+
+def test_crops_cover_only_configured_regions():
+    frame = np.full((100, 200, 3), 255, dtype=np.uint8)
+    config = DetectionConfig(regions=[[0.5, 0.5, 1.0, 1.0]])
+    (x, y, crop), = config.crops(frame)
+    assert (x, y) == (100, 50)
+    assert crop.shape == (50, 100, 3)
+
+    # a triangle is cropped to its bounding box and blanked outside
+    config = DetectionConfig(regions=[[[0, 0], [1, 0], [0, 1]]])
+    (_, _, crop), = config.crops(frame)
+    assert crop[5, 5].tolist() == [255, 255, 255]
+    assert crop[95, 195].tolist() == [0, 0, 0]
+
+    assert DetectionConfig().crops(frame)[0][2] is frame
+
+
+def test_accept_filters_by_region_and_box_area():
+    shape = (100, 100, 3)
+    config = DetectionConfig(regions=[[0, 0, 0.5, 0.5]], min_box_area=0.01, max_box_area=0.2)
+    assert config.accept("fire", [10, 10, 20, 20], shape)
+    assert not config.accept("fire", [60, 60, 70, 70], shape)  # outside the region
+    assert not config.accept("box", [10, 10, 12, 12], shape)   # too small
+    assert not config.accept("box", [0, 0, 49, 49], shape)     # too large
+    assert config.accept("fire", [0, 0, 49, 49], shape)        # limits only apply to boxes
+
+
+def test_invalid_regions_are_rejected():
+    with pytest.raises(ValueError):
+        DetectionConfig(regions=[[[0, 0], [2, 0], [0, 1]]])
+    with pytest.raises(ValueError):
+        DetectionConfig(regions=[[[0, 0], [1, 1]]])
+    with pytest.raises(ValueError):
+        DetectionConfig(regions=[[0.2, 0.2, 0.2, 0.8]])  # zero width
+    for settings in ({"inference_size": 300}, {"inference_size": -32}, {"inference_size": "abc"},
+                     {"inference_size": 320.5}, {"min_box_area": "big"}, {"max_box_area": 1.5},
+                     {"min_box_area": 0.4, "max_box_area": 0.2}, {"regions": "abc"}):
+        with pytest.raises(ValueError):
+            DetectionConfig(**settings)
+    config = DetectionConfig(inference_size=320.0, min_box_area=0, max_box_area=1)
+    assert (config.inference_size, config.min_box_area, config.max_box_area) == (320, 0.0, 1.0)
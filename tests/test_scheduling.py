@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+from backend.scheduling import Job, Line, line_summary, schedule
+
+T0 = datetime(2026, 1, 5, 8, 0)
+
+
+def test_jobs_go_to_the_line_finishing_them_first():
+    lines = [Line("slow", 10, T0), Line("fast", 40, T0)]
+    jobs = [Job("a", "p", 40, T0), Job("b", "p", 40, T0), Job("c", "p", 40, T0)]
+    assignments, unscheduled = schedule(lines, jobs)
+
+    assert not unscheduled
+    placed = {a["jobId"]: (a["lineId"], a["start"], a["end"]) for a in assignments}
+    assert placed["a"] == ("fast", T0, T0 + timedelta(hours=1))
+    assert placed["b"] == ("fast", T0 + timedelta(hours=1), T0 + timedelta(hours=2))
+    assert placed["c"] == ("fast", T0 + timedelta(hours=2), T0 + timedelta(hours=3))
+    assert line_summary(lines, assignments)[1]["busyHours"] == 3.0
+
+
+def test_due_dates_dedicated_lines_and_maintenance():
+    window = (T0 + timedelta(hours=1), T0 + timedelta(hours=9))
+    lines = [
+        Line("general", 10, T0, maintenance=[window]),
+        Line("cakes", 100, T0, product_id="cake"),
+        Line("idle", 0, T0),
+    ]
+    jobs = [
+        Job("late-bread", "bread", 20, T0),
+        Job("urgent-bread", "bread", 5, T0, due=T0 + timedelta(hours=2), kind="order"),
+        Job("cake", "cake", 50, T0),
+    ]
+    assignments, unscheduled = schedule(lines, jobs)
+
+    assert not unscheduled
+    assert [a["jobId"] for a in assignments] == ["urgent-bread", "late-bread", "cake"]
+    placed = {a["jobId"]: a for a in assignments}
+    assert placed["urgent-bread"]["end"] == T0 + timedelta(minutes=30)
+    assert not placed["urgent-bread"]["late"]
+    # Two hours of work would overlap the window, so it waits for the end.
+    assert placed["late-bread"]["start"] == window[1]
+    assert placed["cake"]["lineId"] == "cakes"
+
+
+def test_fixed_and_pinned_jobs_keep_their_line():
+    lines = [Line("a", 10, T0), Line("b", 10, T0)]
+    jobs = [
+        Job("fixed", "p", 10, T0, line_id="a", start=T0 + timedelta(hours=1)),
+        Job("pinned", "p", 20, T0, line_id="b"),
+        Job("free-1", "p", 10, T0),
+        Job("free-2", "p", 10, T0),
+        Job("gone", "p", 10, T0, line_id="stopped", start=T0),  # pin to an unscheduled line
+    ]
+    assignments, unscheduled = schedule(lines, jobs)
+
+    assert not unscheduled
+    placed = {a["jobId"]: a for a in assignments}
+    assert placed["fixed"]["fixed"] and placed["fixed"]["start"] == T0 + timedelta(hours=1)
+    assert placed["pinned"]["lineId"] == "b" and not placed["pinned"]["fixed"]
+    # line a is free before the fixed job, then only after it
+    assert (placed["free-1"]["lineId"], placed["free-1"]["start"]) == ("a", T0)
+    assert placed["free-2"]["start"] == T0 + timedelta(hours=2)
+    assert placed["gone"]["lineId"] in ("a", "b") and not placed["gone"]["fixed"]
+
+
+def test_jobs_without_an_eligible_line_are_unscheduled():
+    assignments, unscheduled = schedule([Line("cakes", 10, T0, product_id="cake")],
+                                        [Job("bread", "bread", 10, T0)])
+    assert assignments == []
+    assert [j.id for j in unscheduled] == ["bread"]
+
+
+def test_scales_to_thousands_of_jobs():
+    lines = [Line(f"line-{i}", 50 + i, T0) for i in range(20)]
+    jobs = [Job(str(i), "p", 10 + i % 90, T0, priority=i % 3) for i in range(5000)]
+    assignments, _ = schedule(lines, jobs)
+    assert len(assignments) == 5000
+    ends = [s["freeFrom"] for s in line_summary(lines, assignments)]
+    assert max(ends) - min(ends) < timedelta(hours=3)
@@ -0,0 +1,39 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from backend.app import Columns, Product, app, db, iso, iso_or_text, number, or_default, or_empty
+
+PRODUCT_COLUMNS = Columns(
+    ("id", Product.id),
+    ("name", Product.name, or_empty),
+    ("category", Product.category, or_default("misc")),
+    ("price", Product.price, number),
+)
+
+
+def test_converters():
+    assert iso(date(2026, 3, 1)) == "2026-03-01" and iso(None) is None
+    assert iso_or_text(datetime(2026, 3, 1, 8)) == "2026-03-01T08:00:00"
+    assert iso_or_text("2026-03-01T08:00:00") == "2026-03-01T08:00:00"
+    assert number(Decimal("2.50")) == 2.5 and number(None) == 0.0
+    assert or_empty(None) == "" and or_default("x")(None) == "x" and or_default("x")("y") == "y"
+
+
+def test_columns_build_dicts_from_tuples():
+    assert PRODUCT_COLUMNS.names == ("id", "name", "category", "price")
+    row = ("p1", None, None, Decimal("3.10"), "extra")  # trailing columns are ignored
+    assert PRODUCT_COLUMNS.to_dict(row) == {"id": "p1", "name": "", "category": "misc", "price": 3.1}
+    assert PRODUCT_COLUMNS.from_mapping({"price": 1, "id": "p2", "other": 0}) == ("p2", None, None, 1)
+
+
+def test_columns_select_matches_orm_attributes():
+    with app.app_context():
+        db.session.add(Product(id="ser-p1", name="Serialized", sku="SER-1", price=Decimal("4.20")))
+        db.session.commit()
+        rows = db.session.execute(
+            PRODUCT_COLUMNS.select(Product.sku).where(Product.id == "ser-p1")
+        ).all()
+        assert PRODUCT_COLUMNS.dicts(rows) == [
+            {"id": "ser-p1", "name": "Serialized", "category": "misc", "price": 4.2}
+        ]
+        assert rows[0][-1] == "SER-1"
@@ -0,0 +1,34 @@
+import threading
+
+import numpy as np
+
+from backend.streaming import FrameHub, stream_tier
+
+
+def test_stream_tier_snaps_to_shared_tiers():
+    assert stream_tier() == (1.0, 95)
+    assert stream_tier("0.4", "55") == (0.5, 60)
+    assert stream_tier(0.3, 100) == (0.25, 95)
+
+
+def test_viewers_share_one_encode_per_tier():
+    release = threading.Event()
+
+    def frames():
+        yield np.zeros((40, 40, 3), dtype=np.uint8)
+        release.wait(5)
+
+    hub = FrameHub(frames)
+    full = hub.subscribe((1.0, 95), max_fps=0)
+    half = hub.subscribe((0.5, 60), max_fps=0)
+    full_again = hub.subscribe((1.0, 95), max_fps=0)
+
+    a, b, c = next(full), next(half), next(full_again)
+    assert a is c          # same tier: same encoded bytes object
+    assert len(b) < len(a)
+    assert hub.viewers == 3
+
+    for viewer in (full, half, full_again):
+        viewer.close()
+    release.set()
+    assert hub.viewers == 0
@@ -0,0 +1,19 @@
+import numpy as np
+
+from backend.thumbnails import ThumbnailCache
+
+
+def test_cache_is_bounded_and_keeps_etag_for_unchanged_frames():
+    cache = ThumbnailCache(max_entries=2)
+    black = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    first = cache.put("a", black)
+    assert first.jpeg.startswith(b"\xff\xd8")
+    assert cache.put("a", black.copy()) is first
+    cache.put("b", black)
+    cache.get("a")  # "a" is now the most recently used
+    cache.put("c", np.full((480, 640, 3), 255, dtype=np.uint8))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is first
+    assert cache.get("c").etag != first.etag
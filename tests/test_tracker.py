@@ -0,0 +1,35 @@
+from backend.tracker import IoUTracker
+
+
+def test_tracks_keep_ids_and_propagate_between_keyframes():
+    tracker = IoUTracker(keyframe_interval=3)
+
+    assert tracker.step()
+    (cls, conf, bbox, track_id), = tracker.update([("box", 0.9, [0, 0, 10, 10])])
+    assert (cls, bbox) == ("box", [0, 0, 10, 10])
+
+    assert not tracker.step()
+    assert tracker.predict()[0][2] == [0, 0, 10, 10]  # no velocity yet
+    assert not tracker.step()
+    tracker.predict()
+
+    # the box moved 3px in 3 frames: same id, 1px/frame afterwards
+    assert tracker.step()
+    (_, _, bbox, same_id), = tracker.update([("box", 0.8, [3, 0, 13, 10])])
+    assert same_id == track_id
+    assert not tracker.step()
+    assert tracker.predict()[0][2] == [4, 0, 14, 10]
+
+
+def test_unmatched_tracks_are_dropped_and_classes_never_mix():
+    tracker = IoUTracker(keyframe_interval=1, max_missed=1)
+    tracker.step()
+    (_, _, _, box_id), = tracker.update([("box", 0.9, [0, 0, 10, 10])])
+
+    tracker.step()
+    (cls, _, _, fire_id), = tracker.update([("fire", 0.9, [0, 0, 10, 10])])
+    assert cls == "fire" and fire_id != box_id
+
+    tracker.step()
+    tracker.update([("fire", 0.9, [0, 0, 10, 10])])
+    assert [t.id for t in tracker.tracks] == [fire_id]